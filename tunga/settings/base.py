@@ -70,6 +70,7 @@ INSTALLED_APPS = [
     'tunga_tasks',
     'tunga_messages',
     'tunga_comments',
+    'tunga_activity',
     'tunga_utils',
     'tunga_settings',
 
@@ -93,6 +94,7 @@ MIDDLEWARE_CLASSES = [
     'oauth2_provider.middleware.OAuth2TokenMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'tunga_auth.middleware.UserLastActivityMiddleware',
+    'tunga_utils.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'tunga.urls'
@@ -275,9 +277,10 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'PAGE_SIZE': 15,
+    'DEFAULT_PAGINATION_CLASS': 'tunga_utils.pagination.DefaultPagination',
     'URL_FIELD_NAME': 'api_url',
     'DEFAULT_FILTER_BACKENDS': (
-        'rest_framework.filters.DjangoFilterBackend', 'rest_framework.filters.SearchFilter'
+        'rest_framework.filters.DjangoFilterBackend', 'tunga_utils.search.SearchIndexFilter'
     ),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json'
 }
@@ -302,6 +305,49 @@ SWAGGER_SETTINGS = {
 # Local
 CONTACT_REQUEST_EMAIL_RECIPIENT = 'bart@tunga.io'
 
+# Connection sets are invalidated on change, the timeout only bounds staleness if an invalidation is missed
+TUNGA_CONNECTIONS_CACHE_TIMEOUT = 5*60
+
+# Email outbox, queued emails are drained by a periodic celery task
+TUNGA_EMAIL_OUTBOX_BATCH_SIZE = 50
+TUNGA_EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Base delay in seconds before retrying a failed email, doubled on every attempt
+TUNGA_EMAIL_OUTBOX_RETRY_DELAY = 60
+# Seconds after which emails claimed by a worker that died are picked up again
+TUNGA_EMAIL_OUTBOX_CLAIM_TIMEOUT = 10*60
+
+# Mobbr participation scripts
+MOBBR_API_URL = 'https://api.mobbr.com/api_v1/uris/info'
+# Seconds before a cached script is refreshed in the background
+MOBBR_CACHE_TIMEOUT = 15*60
+# Seconds a stale script is still served while a refresh is pending
+MOBBR_CACHE_STALE_TIMEOUT = 24*60*60
+MOBBR_REQUEST_TIMEOUT = 3
+# Consecutive failures after which requests to Mobbr are suspended for MOBBR_CIRCUIT_BREAKER_TIMEOUT seconds
+MOBBR_CIRCUIT_BREAKER_THRESHOLD = 5
+MOBBR_CIRCUIT_BREAKER_TIMEOUT = 60
+
+# Seconds between writes of a user's last activity, activity in between is buffered in the cache
+TUNGA_LAST_ACTIVITY_GRANULARITY = 5*60
+
+# Notification counters are invalidated by signals, the timeout only bounds staleness
+TUNGA_NOTIFICATIONS_CACHE_TIMEOUT = 60*60
+
+# Skill indexes are held in process memory and reloaded when they're invalidated or after this many seconds
+TUNGA_SKILL_INDEX_TIMEOUT = 10*60
+# Maximum number of matches returned by skill based recommendations
+TUNGA_SKILL_MATCH_LIMIT = 1000
+# Weigh shared skills by their inverse document frequency instead of counting them
+TUNGA_SKILL_MATCH_IDF = False
+
+# Search index used by SearchIndexFilter for registered models
+TUNGA_SEARCH_BACKEND = 'tunga_utils.search.DatabaseSearchBackend'
+# Maximum number of ranked results returned by a search
+TUNGA_SEARCH_RESULT_LIMIT = 1000
+
+# Fraction of requests profiled by ProfilingMiddleware (0 to 1), it's not loaded at all when this is 0
+TUNGA_PROFILING_SAMPLE_RATE = 0
+
 #celery
 
 
@@ -328,6 +374,17 @@ CELERY_RESULT_BACKEND='redis'
 CELERY_TASK_RESULT_EXPIRES =  10
 CELERYBEAT_SCHEDULER="djcelery.schedulers.DatabaseScheduler"
 
+# Cache
+# Process local by default, production.py switches to redis so invalidation from signals reaches web, celery
+# and command processes alike. Set CACHES in local.py to use redis elsewhere.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tunga',
+    }
+}
+
 
 import djcelery
 djcelery.setup_loader()
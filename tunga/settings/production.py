@@ -3,6 +3,18 @@ from .base import *
 
 DEBUG = False
 
+# Shared by web, celery and command processes, cache invalidation from signals has to reach all of them
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://%s:%s/1' % (REDIS_HOST, REDIS_PORT),
+        'KEY_PREFIX': 'tunga',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        }
+    }
+}
+
 try:
     from .local import *
 except ImportError:
@@ -28,10 +28,10 @@ from tunga_profiles.views import ProfileView, EducationViewSet, WorkViewSet, Con
     NotificationView, CountryListView
 from tunga_settings.views import UserSettingsView
 from tunga_tasks.views import TaskViewSet, ApplicationViewSet, ParticipationViewSet, TaskRequestViewSet, \
-    SavedTaskViewSet, task_web_view,task_webscrapers,TaskMilestonesViewSet, MilestoneIndexEndpoint,MilestoneDetailEndpoint,TaskUpdateIndexEndpoint
+    SavedTaskViewSet, task_web_view,TaskMilestonesViewSet, MilestoneIndexEndpoint,MilestoneDetailEndpoint,TaskUpdateIndexEndpoint
 
 from tunga_activity.views import ActionViewSet
-from tunga_utils.views import SkillViewSet, ContactRequestView
+from tunga_utils.views import SkillViewSet, ContactRequestView, ProfilingStatsView
 
 router = DefaultRouter()
 router.register(r'user', UserViewSet)
@@ -72,6 +72,7 @@ urlpatterns = [
     url(r'api/', include('rest_framework.urls', namespace='rest_framework')),
     url(r'^api/countries/', CountryListView.as_view(), name='countries'),
     url(r'^api/contact-request/', ContactRequestView.as_view(), name='contact-request'),
+    url(r'^api/profiling/', ProfilingStatsView.as_view(), name='profiling-stats'),
     url(r'^api/docs/', include('rest_framework_swagger.urls')),
     url(r'^task/(?P<pk>\d+)/$', task_web_view, name="task-web"),
     url(r'^reset-password/confirm/(?P<uidb64>[0-9A-Za-z_\-]+)/(?P<token>[0-9A-Za-z]{1,13}-[0-9A-Za-z]{1,20})/$',
@@ -0,0 +1 @@
+default_app_config = 'tunga_activity.apps.TungaActivityConfig'
\ No newline at end of file
@@ -5,3 +5,7 @@ from django.apps import AppConfig
 
 class TungaActivityConfig(AppConfig):
     name = 'tunga_activity'
+    verbose_name = 'Activity'
+
+    def ready(self):
+        from tunga_activity import signals
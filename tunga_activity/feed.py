@@ -0,0 +1,53 @@
+from actstream.models import Action
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from tunga_activity.models import FeedEntry, TIMELINE_USER, TIMELINE_TASK
+from tunga_tasks.models import Task
+
+
+def get_action_timelines(action):
+    """
+    Returns the (timeline, owner_id) pairs an action belongs to, i.e. its actor's and its target task's timelines
+    """
+    timelines = []
+    if action.actor_content_type_id == ContentType.objects.get_for_model(get_user_model()).id:
+        timelines.append((TIMELINE_USER, int(action.actor_object_id)))
+    if action.target_content_type_id == ContentType.objects.get_for_model(Task).id and action.target_object_id:
+        timelines.append((TIMELINE_TASK, int(action.target_object_id)))
+    return timelines
+
+
+def get_feed_entries(action):
+    return [
+        FeedEntry(timeline=timeline, owner_id=owner_id, action_id=action.id, timestamp=action.timestamp)
+        for timeline, owner_id in get_action_timelines(action)
+    ]
+
+
+def fan_out_action(action):
+    FeedEntry.objects.bulk_create(get_feed_entries(action))
+
+
+def get_timeline_actions(timeline, owner_id):
+    return FeedEntry.objects.filter(timeline=timeline, owner_id=owner_id).values('action_id')
+
+
+def rebuild_feed(batch_size=500):
+    """
+    Rewrites all timelines from the action table, returns the number of entries written
+    """
+    total = 0
+    with transaction.atomic():
+        FeedEntry.objects.all().delete()
+        entries = []
+        for action in Action.objects.all().iterator():
+            entries.extend(get_feed_entries(action))
+            if len(entries) >= batch_size:
+                FeedEntry.objects.bulk_create(entries)
+                total += len(entries)
+                entries = []
+        FeedEntry.objects.bulk_create(entries)
+        total += len(entries)
+    return total
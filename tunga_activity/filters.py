@@ -1,9 +1,8 @@
 import django_filters
 from actstream.models import Action
-from django.contrib.auth import get_user_model
-from django.contrib.contenttypes.models import ContentType
 
-from tunga_tasks.models import Task
+from tunga_activity.feed import get_timeline_actions
+from tunga_activity.models import TIMELINE_USER, TIMELINE_TASK
 from tunga_utils.filters import GenericDateFilterSet
 
 
@@ -19,11 +18,16 @@ class ActionFilter(GenericDateFilterSet):
         )
 
     def filter_user(self, queryset, value):
-        user_content_type = ContentType.objects.get_for_model(get_user_model())
-        return queryset.filter(actor_content_type=user_content_type.id, actor_object_id=value)
+        return self.filter_timeline(queryset, TIMELINE_USER, value)
 
     def filter_task(self, queryset, value):
-        task_content_type = ContentType.objects.get_for_model(Task)
-        return queryset.filter(target_content_type=task_content_type.id, target_object_id=value)
-
-
+        return self.filter_timeline(queryset, TIMELINE_TASK, value)
+
+    def filter_timeline(self, queryset, timeline, value):
+        if not value:
+            return queryset
+        try:
+            owner_id = int(value)
+        except ValueError:
+            return queryset.none()
+        return queryset.filter(id__in=get_timeline_actions(timeline, owner_id))
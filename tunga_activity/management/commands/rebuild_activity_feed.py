@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tunga_activity.feed import rebuild_feed
+
+
+class Command(BaseCommand):
+
+    def handle(self, *args, **options):
+        """
+        Rewrites user and task activity timelines from the action table.
+        """
+        # command to run: python manage.py rebuild_activity_feed
+
+        total = rebuild_feed()
+        self.stdout.write("%s feed entries written" % total)
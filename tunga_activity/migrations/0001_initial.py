@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-23 14:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+TIMELINE_USER = 1
+TIMELINE_TASK = 2
+
+
+def backfill_feed(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Action = apps.get_model('actstream', 'Action')
+    FeedEntry = apps.get_model('tunga_activity', 'FeedEntry')
+
+    user_content_type = ContentType.objects.filter(app_label='tunga_auth', model='tungauser').first()
+    task_content_type = ContentType.objects.filter(app_label='tunga_tasks', model='task').first()
+    entries = []
+    for action_id, timestamp, actor_content_type_id, actor_object_id, target_content_type_id, target_object_id in \
+            Action.objects.values_list(
+                'id', 'timestamp', 'actor_content_type_id', 'actor_object_id', 'target_content_type_id',
+                'target_object_id'
+            ).iterator():
+        if user_content_type and actor_content_type_id == user_content_type.id:
+            entries.append(FeedEntry(
+                timeline=TIMELINE_USER, owner_id=int(actor_object_id), action_id=action_id, timestamp=timestamp
+            ))
+        if task_content_type and target_content_type_id == task_content_type.id and target_object_id:
+            entries.append(FeedEntry(
+                timeline=TIMELINE_TASK, owner_id=int(target_object_id), action_id=action_id, timestamp=timestamp
+            ))
+        if len(entries) >= 500:
+            FeedEntry.objects.bulk_create(entries)
+            entries = []
+    FeedEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('actstream', '0001_initial'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timeline', models.PositiveSmallIntegerField(choices=[(1, 'User'), (2, 'Task')])),
+                ('owner_id', models.PositiveIntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('action', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='actstream.Action')),
+            ],
+            options={
+                'verbose_name_plural': 'feed entries',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='feedentry',
+            unique_together=set([('timeline', 'owner_id', 'action')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='feedentry',
+            index_together=set([('timeline', 'owner_id', 'timestamp')]),
+        ),
+        migrations.RunPython(backfill_feed, migrations.RunPython.noop),
+    ]
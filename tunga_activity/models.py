@@ -1,5 +1,31 @@
 from __future__ import unicode_literals
 
+from actstream.models import Action
 from django.db import models
 
-# Create your models here.
+TIMELINE_USER = 1
+TIMELINE_TASK = 2
+
+TIMELINE_CHOICES = (
+    (TIMELINE_USER, 'User'),
+    (TIMELINE_TASK, 'Task')
+)
+
+
+class FeedEntry(models.Model):
+    """
+    Compact pointer to an action in a user or task timeline, written when the action is created.
+    owner_id is the id of the user or task the timeline belongs to.
+    """
+    timeline = models.PositiveSmallIntegerField(choices=TIMELINE_CHOICES)
+    owner_id = models.PositiveIntegerField()
+    action = models.ForeignKey(Action, on_delete=models.CASCADE)
+    timestamp = models.DateTimeField()
+
+    def __unicode__(self):
+        return '%s %s - %s' % (self.get_timeline_display(), self.owner_id, self.action_id)
+
+    class Meta:
+        unique_together = ('timeline', 'owner_id', 'action')
+        index_together = ('timeline', 'owner_id', 'timestamp')
+        verbose_name_plural = 'feed entries'
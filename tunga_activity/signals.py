@@ -0,0 +1,11 @@
+from actstream.models import Action
+from django.db.models.signals import post_save
+from django.dispatch.dispatcher import receiver
+
+from tunga_activity.feed import fan_out_action
+
+
+@receiver(post_save, sender=Action)
+def feed_handler_new_action(sender, instance, created, **kwargs):
+    if created:
+        fan_out_action(instance)
@@ -1,3 +1,83 @@
-from django.test import TestCase
+from actstream import action
+from actstream.models import Action
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from tunga_activity.feed import rebuild_feed
+from tunga_activity.models import FeedEntry, TIMELINE_USER, TIMELINE_TASK
+from tunga_auth.models import USER_TYPE_PROJECT_OWNER, USER_TYPE_DEVELOPER
+from tunga_tasks.models import Task
+
+
+class APIActivityTestCase(APITestCase):
+
+    def setUp(self):
+        self.project_owner = get_user_model().objects.create_user(
+            'project_owner', 'po@example.com', 'secret', **{'type': USER_TYPE_PROJECT_OWNER})
+        self.developer = get_user_model().objects.create_user(
+            'developer', 'developer@example.com', 'secret', **{'type': USER_TYPE_DEVELOPER})
+        self.task = Task.objects.create(title='Task 1', skills='Django', fee=10, user=self.project_owner)
+        Action.objects.all().delete()
+
+        action.send(self.project_owner, verb='created', target=self.task)
+        action.send(self.developer, verb='applied for', target=self.task)
+        action.send(self.developer, verb='updated a profile')
+
+    def get_action_ids(self, response):
+        return [item['id'] for item in response.data['results']]
+
+    def test_fan_out(self):
+        """
+        Actions are written to their actor's timeline and their target task's timeline
+        """
+        self.assertEqual(FeedEntry.objects.filter(timeline=TIMELINE_USER, owner_id=self.developer.id).count(), 2)
+        self.assertEqual(FeedEntry.objects.filter(timeline=TIMELINE_USER, owner_id=self.project_owner.id).count(), 1)
+        self.assertEqual(FeedEntry.objects.filter(timeline=TIMELINE_TASK, owner_id=self.task.id).count(), 2)
+
+        entries = set(FeedEntry.objects.values_list('timeline', 'owner_id', 'action_id'))
+        self.assertEqual(rebuild_feed(), 5)
+        self.assertEqual(set(FeedEntry.objects.values_list('timeline', 'owner_id', 'action_id')), entries)
+
+    def test_feed(self):
+        """
+        The feed lists the timeline of a task, a user or the current user, latest first
+        """
+        url = reverse('action-feed')
+        self.client.force_authenticate(user=self.developer)
+        task_actions = list(Action.objects.filter(target_object_id=self.task.id).order_by('-timestamp', '-id'))
+        developer_actions = list(Action.objects.filter(actor_object_id=self.developer.id).order_by('-timestamp', '-id'))
+
+        response = self.client.get(url, {'task': self.task.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_action_ids(response), [item.id for item in task_actions])
+
+        response = self.client.get(url, {'user': self.developer.id})
+        self.assertEqual(self.get_action_ids(response), [item.id for item in developer_actions])
+
+        response = self.client.get(url)
+        self.assertEqual(self.get_action_ids(response), [item.id for item in developer_actions])
+
+        response = self.client.get(url, {'task': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'user': '1; DROP'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_actions(self):
+        url = reverse('action-list')
+        self.client.force_authenticate(user=self.developer)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+
+        response = self.client.get(url, {'task': self.task.id})
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self.client.get(url, {'user': self.project_owner.id})
+        self.assertEqual(len(response.data['results']), 1)
+
+        response = self.client.get(url, {'user': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 0)
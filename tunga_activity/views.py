@@ -1,9 +1,13 @@
 from actstream.models import Action
 
 from rest_framework import viewsets
+from rest_framework.decorators import list_route
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from tunga_activity.filters import ActionFilter
+from tunga_activity.models import FeedEntry, TIMELINE_USER, TIMELINE_TASK
 from tunga_activity.serializers import ActionSerializer
 
 
@@ -15,3 +19,35 @@ class ActionViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ActionSerializer
     permission_classes = [IsAuthenticated]
     filter_class = ActionFilter
+    cursor_ordering = ('-timestamp', '-id')
+
+    def get_owner_id(self, request, param):
+        try:
+            return int(request.query_params[param])
+        except ValueError:
+            raise ValidationError({param: ['A valid integer is required.']})
+
+    @list_route(
+        methods=['get'], url_path='feed',
+        permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        """
+        Activity timeline of a task (?task=<id>), a user (?user=<id>) or the current user
+        """
+        if request.query_params.get('task', None):
+            timeline, owner_id = TIMELINE_TASK, self.get_owner_id(request, 'task')
+        elif request.query_params.get('user', None):
+            timeline, owner_id = TIMELINE_USER, self.get_owner_id(request, 'user')
+        else:
+            timeline, owner_id = TIMELINE_USER, request.user.id
+        entries = FeedEntry.objects.filter(
+            timeline=timeline, owner_id=owner_id
+        ).select_related('action').order_by('-timestamp', '-id')
+
+        page = self.paginate_queryset(entries)
+        if page is not None:
+            serializer = self.get_serializer([entry.action for entry in page], many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer([entry.action for entry in entries], many=True)
+        return Response(serializer.data)
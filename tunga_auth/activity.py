@@ -0,0 +1,64 @@
+import datetime
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from tunga.settings.base import TUNGA_LAST_ACTIVITY_GRANULARITY
+
+LAST_ACTIVITY_CACHE_KEY = 'tunga_last_activity_%s'
+LAST_ACTIVITY_WRITTEN_CACHE_KEY = 'tunga_last_activity_written_%s'
+
+# Buffered values must outlive several periodic flushes
+LAST_ACTIVITY_CACHE_TIMEOUT = 60*60
+
+FLUSH_BATCH_SIZE = 500
+
+
+def record_activity(user):
+    """
+    Buffers the user's last activity in the cache, it's written straight away at most once per granularity period
+    """
+    now = timezone.now().replace(microsecond=0)
+    if cache.add(LAST_ACTIVITY_WRITTEN_CACHE_KEY % user.id, True, TUNGA_LAST_ACTIVITY_GRANULARITY):
+        get_user_model().objects.filter(id=user.id).update(last_activity=now)
+        return
+    cache.set(LAST_ACTIVITY_CACHE_KEY % user.id, now, LAST_ACTIVITY_CACHE_TIMEOUT)
+
+
+def flush_activity():
+    """
+    Writes buffered last activity times to the database, returns the number of users updated.
+
+    Activity is only buffered within a granularity period of a direct write, so users with buffered activity
+    are found among recently active users instead of in a shared set of pending ids that concurrent requests
+    would have to update. Buffered values are left to expire, writes skip values that are already stored.
+    """
+    since = timezone.now() - datetime.timedelta(seconds=LAST_ACTIVITY_CACHE_TIMEOUT + TUNGA_LAST_ACTIVITY_GRANULARITY)
+    user_ids = list(
+        get_user_model().objects.filter(last_activity__gte=since).values_list('id', flat=True)
+    )
+
+    total = 0
+    for start in range(0, len(user_ids), FLUSH_BATCH_SIZE):
+        keys = dict([(LAST_ACTIVITY_CACHE_KEY % user_id, user_id) for user_id in user_ids[start:start + FLUSH_BATCH_SIZE]])
+        user_ids_by_time = defaultdict(list)
+        for key, last_activity in cache.get_many(keys.keys()).items():
+            user_ids_by_time[last_activity].append(keys[key])
+
+        for last_activity, batch_user_ids in user_ids_by_time.items():
+            total += get_user_model().objects.filter(
+                id__in=batch_user_ids, last_activity__lt=last_activity
+            ).update(last_activity=last_activity)
+    return total
+
+
+def discard_activity(*user_ids):
+    """
+    Drops buffered activity of users e.g when they were created in a transaction that was rolled back
+    """
+    cache.delete_many(
+        [LAST_ACTIVITY_CACHE_KEY % user_id for user_id in user_ids] +
+        [LAST_ACTIVITY_WRITTEN_CACHE_KEY % user_id for user_id in user_ids]
+    )
@@ -10,6 +10,8 @@ class TungaAuthConfig(AppConfig):
     def ready(self):
         from actstream import registry
         from tunga_auth import signals
+        from tunga_auth.search import get_user_search_document
+        from tunga_utils import search
 
         registry.register(self.get_model('TungaUser'))
-
+        search.register(self.get_model('TungaUser'), get_user_search_document)
@@ -0,0 +1,86 @@
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+
+def get_image_url(user):
+    if user.image:
+        return user.image.url
+    return None
+
+
+def get_social_avatar_url(social_account):
+    try:
+        return social_account.get_avatar_url()
+    except Exception:
+        # Providers can choke on incomplete extra_data
+        return None
+
+
+def load_social_accounts(user_ids):
+    """
+    Reads the first social account of each user in one query
+    """
+    social_accounts = dict()
+    for social_account in SocialAccount.objects.filter(user_id__in=user_ids).order_by('id'):
+        if social_account.user_id not in social_accounts:
+            social_accounts[social_account.user_id] = social_account
+    return social_accounts
+
+
+def compute_avatar_urls(users):
+    """
+    Resolves avatar urls from user images and social accounts in one query for all users.
+    Returns them keyed by user id, an empty string marks users without an avatar.
+    """
+    social_accounts = load_social_accounts([user.id for user in users if not user.image]) if users else dict()
+
+    avatar_urls = dict()
+    for user in users:
+        avatar_url = get_image_url(user)
+        if not avatar_url and user.id in social_accounts:
+            avatar_url = get_social_avatar_url(social_accounts[user.id])
+        avatar_urls[user.id] = avatar_url or ''
+    return avatar_urls
+
+
+def resolve_avatar_urls(users):
+    """
+    Returns the avatar urls of a list of users keyed by user id in a fixed number of queries.
+    Stored urls are used when they're resolved, the others are computed but not stored so that reads never write.
+    """
+    avatar_urls = dict()
+    unresolved = []
+    for user in users:
+        if user.avatar_url is None:
+            unresolved.append(user)
+        else:
+            avatar_urls[user.id] = user.avatar_url or None
+    for user_id, avatar_url in compute_avatar_urls(unresolved).items():
+        avatar_urls[user_id] = avatar_url or None
+    return avatar_urls
+
+
+def store_avatar_urls(users):
+    """
+    Resolves and stores the avatar urls of a list of users, returns them keyed by user id
+    """
+    avatar_urls = compute_avatar_urls(users)
+    changed = [user for user in users if avatar_urls[user.id] != user.avatar_url]
+    if changed:
+        with transaction.atomic():
+            for user in changed:
+                user.avatar_url = avatar_urls[user.id]
+                get_user_model().objects.filter(id=user.id).update(avatar_url=user.avatar_url)
+    return dict([(user_id, avatar_url or None) for user_id, avatar_url in avatar_urls.items()])
+
+
+def refresh_avatar_url(user):
+    return store_avatar_urls([user]).get(user.id, None)
+
+
+def get_avatar_url(user):
+    """
+    Returns the user's stored avatar url, or computes it if it isn't resolved yet
+    """
+    return resolve_avatar_urls([user]).get(user.id, None)
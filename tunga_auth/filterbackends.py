@@ -1,25 +1,15 @@
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.aggregates import Count, Sum
-from django.db.models.expressions import When, Case
-from django.db.models.fields import IntegerField
 from django.db.models.query_utils import Q
 from dry_rest_permissions.generics import DRYPermissionFiltersBase
 
 from tunga_auth.models import USER_TYPE_DEVELOPER, USER_TYPE_PROJECT_OWNER
+from tunga_profiles.connection_graph import connections_of
 from tunga_profiles.models import UserProfile
+from tunga_tasks.skill_index import filter_by_skill_match, get_developer_skill_index
 
 
 def my_connections_q_filter(user):
-    return (
-        (
-            Q(connections_initiated__to_user=user) &
-            Q(connections_initiated__accepted=True)
-        ) |
-        (
-            Q(connection_requests__from_user=user) &
-            Q(connection_requests__accepted=True)
-        )
-    )
+    return Q(id__in=connections_of(user))
 
 
 class UserFilterBackend(DRYPermissionFiltersBase):
@@ -43,24 +33,11 @@ class UserFilterBackend(DRYPermissionFiltersBase):
             queryset = queryset.filter(
                 connections_initiated__to_user=request.user, connections_initiated__responded=False)
         elif user_filter == 'relevant':
-            queryset = queryset.filter(type=USER_TYPE_DEVELOPER)
             try:
-                user_skills = request.user.userprofile.skills.all()
-                queryset = queryset.filter(userprofile__skills__in=user_skills)
-                when = []
-                for skill in user_skills:
-                    new_when = When(
-                            userprofile__skills=skill,
-                            then=1
-                        )
-                    when.append(new_when)
-                queryset = queryset.annotate(matches=Sum(
-                    Case(
-                        *when,
-                        default=0,
-                        output_field=IntegerField()
-                    )
-                )).order_by('-matches', '-created_at')
+                skill_ids = list(request.user.userprofile.skills.values_list('id', flat=True))
             except (ObjectDoesNotExist, UserProfile.DoesNotExist):
                 return queryset.none()
+            queryset = filter_by_skill_match(
+                queryset.filter(type=USER_TYPE_DEVELOPER), get_developer_skill_index(), skill_ids
+            ).order_by('-matches', '-date_joined')
         return queryset
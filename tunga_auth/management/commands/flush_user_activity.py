@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tunga_auth.activity import flush_activity
+
+
+class Command(BaseCommand):
+
+    def handle(self, *args, **options):
+        """
+        Writes last activity times buffered in the cache to the database, run it before shutting down.
+        """
+        # command to run: python manage.py flush_user_activity
+
+        total = flush_activity()
+        self.stdout.write("%s users updated" % total)
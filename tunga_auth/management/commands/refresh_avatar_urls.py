@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from tunga_auth.avatars import store_avatar_urls
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true', dest='all', default=False,
+            help='Re-resolve all users, not just those without a stored avatar url'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Resolves and stores avatar urls from user images and social accounts.
+        """
+        # command to run: python manage.py refresh_avatar_urls
+
+        queryset = get_user_model().objects.order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(avatar_url__isnull=True)
+
+        total = 0
+        last_id = 0
+        while True:
+            users = list(queryset.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not users:
+                break
+            store_avatar_urls(users)
+            total += len(users)
+            last_id = users[-1].id
+        self.stdout.write("%s users resolved" % total)
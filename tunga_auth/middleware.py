@@ -1,4 +1,4 @@
-from django.utils import timezone
+from tunga_auth.activity import record_activity
 
 
 class UserLastActivityMiddleware(object):
@@ -7,8 +7,7 @@ class UserLastActivityMiddleware(object):
         #assert hasattr(request, 'user'), 'No user object defined for this request.'
         try:
             if request.user.is_authenticated():
-                request.user.last_activity = timezone.now()
-                request.user.save()
+                record_activity(request.user)
         except AttributeError:
             pass
         return response
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-24 15:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tunga_auth', '0004_tungauser_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tungauser',
+            name='avatar_url',
+            field=models.URLField(blank=True, editable=False, max_length=500, null=True),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-27 10:05
+from __future__ import unicode_literals
+
+from allauth.socialaccount import providers
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def get_social_avatar_url(social_account):
+    # Historical models don't have SocialAccount's methods, wrap the account with its provider instead
+    try:
+        return providers.registry.by_id(social_account.provider).wrap_account(social_account).get_avatar_url()
+    except Exception:
+        return None
+
+
+def backfill_avatar_urls(apps, schema_editor):
+    TungaUser = apps.get_model('tunga_auth', 'TungaUser')
+    SocialAccount = apps.get_model('socialaccount', 'SocialAccount')
+
+    last_id = 0
+    while True:
+        users = list(TungaUser.objects.filter(id__gt=last_id, avatar_url__isnull=True).order_by('id')[:BATCH_SIZE])
+        if not users:
+            break
+        last_id = users[-1].id
+
+        social_accounts = dict()
+        for social_account in SocialAccount.objects.filter(
+                user_id__in=[user.id for user in users if not user.image]
+        ).order_by('id'):
+            social_accounts.setdefault(social_account.user_id, social_account)
+
+        for user in users:
+            avatar_url = user.image and user.image.url or None
+            if not avatar_url and user.id in social_accounts:
+                avatar_url = get_social_avatar_url(social_accounts[user.id])
+            TungaUser.objects.filter(id=user.id).update(avatar_url=avatar_url or '')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialaccount', '0003_extra_data_default_dict'),
+        ('tunga_auth', '0005_tungauser_avatar_url'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_avatar_urls, migrations.RunPython.noop),
+    ]
@@ -18,10 +18,42 @@ class TungaUser(AbstractUser):
     last_activity = models.DateTimeField(blank=True, null=True)
     verified = models.BooleanField(default=False)
     pending = models.BooleanField(default=True)
+    # Denormalized from image and social accounts, NULL until it's resolved
+    avatar_url = models.URLField(max_length=500, blank=True, null=True, editable=False)
 
     class Meta(AbstractUser.Meta):
         unique_together = ('email',)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(TungaUser, cls).from_db(db, field_names, values)
+        instance._loaded_values = instance._get_field_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super(TungaUser, self).save(*args, **kwargs)
+        self._loaded_values = self._get_field_values()
+
+    def _get_field_values(self):
+        # Read from __dict__ so that deferred fields aren't loaded, files are compared by name
+        values = dict()
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__:
+                value = self.__dict__[field.attname]
+                if isinstance(field, models.FileField):
+                    value = getattr(value, 'name', value) or ''
+                values[field.attname] = value
+        return values
+
+    def has_field_changed(self, field_name):
+        """
+        Compares a field with the value it had when the user was loaded or last saved
+        """
+        loaded_values = getattr(self, '_loaded_values', None)
+        if loaded_values is None or field_name not in loaded_values:
+            return True
+        return loaded_values[field_name] != self._get_field_values().get(field_name, None)
+
     @property
     def display_name(self):
         return self.get_full_name() or self.username
@@ -0,0 +1,13 @@
+from tunga_profiles.models import UserProfile
+
+
+def get_user_search_document(user):
+    through = UserProfile._meta.get_field('skills').rel.through
+    skills = through.objects.filter(userprofile__user_id=user.id).values_list('skill__name', flat=True)
+    return [
+        (user.username, 5),
+        (user.first_name, 5),
+        (user.last_name, 5),
+        (user.email, 3),
+        (' '.join(skills), 2)
+    ]
@@ -1,13 +1,13 @@
 from django.contrib.auth import get_user_model
-from django.db.models.aggregates import Avg
-from django.db.models.query_utils import Q
+from django.core.exceptions import ObjectDoesNotExist
 from rest_auth.registration.serializers import RegisterSerializer
 from rest_auth.serializers import TokenSerializer, PasswordResetSerializer
 from rest_framework import serializers
 
 from tunga_auth.models import USER_TYPE_CHOICES, USER_TYPE_DEVELOPER
+from tunga_auth.viewer_context import UserViewerContext
 from tunga_utils.serializers import SimpleProfileSerializer, SimpleUserSerializer, SimpleWorkSerializer, \
-    SimpleEducationSerializer
+    SimpleEducationSerializer, PreloadedListSerializer
 
 
 class UserSerializer(SimpleUserSerializer):
@@ -30,52 +30,67 @@ class UserSerializer(SimpleUserSerializer):
         read_only_fields = (
             'username', 'email', 'date_joined', 'last_login', 'is_staff'
         )
+        list_serializer_class = PreloadedListSerializer
 
-    def get_can_connect(self, obj):
+    def __get_current_user(self):
         request = self.context.get("request", None)
         if request:
-            user = getattr(request, "user", None)
-            if user:
-                if not user.is_developer and not obj.is_developer:
-                    return False
-                has_requested = obj.connections_initiated.filter(to_user=user).count()
-                if has_requested:
-                    return False
-                has_accepted_or_been_requested = obj.connection_requests.filter(
-                    Q(accepted=True) | Q(responded=False), from_user=user).count() > 0
-                return not has_accepted_or_been_requested
+            return getattr(request, "user", None)
+        return None
+
+    def preload(self, instances):
+        super(UserSerializer, self).preload(instances)
+        self._viewer_context = UserViewerContext(self.__get_current_user(), [user.id for user in instances])
+
+    def __get_viewer_context(self, obj):
+        viewer_context = getattr(self, '_viewer_context', None)
+        if viewer_context and viewer_context.covers(obj):
+            return viewer_context
+        return UserViewerContext(self.__get_current_user(), [obj.id])
+
+    def __get_stats(self, obj):
+        try:
+            return obj.stats
+        except ObjectDoesNotExist:
+            return None
+
+    def get_can_connect(self, obj):
+        user = self.__get_current_user()
+        if user:
+            if not user.is_developer and not obj.is_developer:
+                return False
+            viewer_context = self.__get_viewer_context(obj)
+            if viewer_context.has_requested(obj):
+                return False
+            return not viewer_context.has_accepted_or_been_requested(obj)
         return False
 
     def get_request(self, obj):
-        request = self.context.get("request", None)
-        if request:
-            user = getattr(request, "user", None)
-            if user:
-                try:
-                    connection = obj.connections_initiated.get(to_user=user, responded=False)
-                    return connection.id
-                except:
-                    pass
+        user = self.__get_current_user()
+        if user:
+            connection = self.__get_viewer_context(obj).get_request(obj)
+            if connection:
+                return connection.id
         return None
 
     def get_tasks_created(self, obj):
-        return obj.tasks_created.count()
+        stats = self.__get_stats(obj)
+        return stats.tasks_created if stats else 0
 
     def get_tasks_completed(self, obj):
-        return obj.participation_set.filter(task__closed=True, accepted=True).count()
+        stats = self.__get_stats(obj)
+        return stats.tasks_completed if stats else 0
 
     def get_satisfaction(self, obj):
         score = None
         if obj.type == USER_TYPE_DEVELOPER:
-            score = obj.participation_set.filter(
-                task__closed=True, accepted=True
-            ).aggregate(satisfaction=Avg('task__satisfaction'))['satisfaction']
+            stats = self.__get_stats(obj)
+            score = stats.satisfaction if stats else None
             if score:
                 score = '{:0,.0f}%'.format(score*10)
         return score
 
 
-
 class AccountInfoSerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
@@ -1,9 +1,11 @@
 from allauth.account.models import EmailAddress
 from allauth.account.signals import user_signed_up
+from allauth.socialaccount.models import SocialAccount
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch.dispatcher import receiver
 
+from tunga_auth.avatars import refresh_avatar_url
 from tunga_auth.emails import send_new_user_email
 
 
@@ -21,3 +23,30 @@ def user_add_email_to_all_auth_handler(sender, instance, created, **kwargs):
 @receiver(user_signed_up)
 def new_user_signup_handler(request, user, **kwargs):
     send_new_user_email(user)
+
+
+@receiver(pre_save, sender=get_user_model())
+def avatar_handler_user_image_changed(sender, instance, **kwargs):
+    instance._avatar_changed = instance.has_field_changed('image')
+
+
+@receiver(post_save, sender=get_user_model())
+def avatar_handler_user(sender, instance, created, **kwargs):
+    # The image's final url is only known after it's been saved
+    if getattr(instance, '_avatar_changed', False):
+        instance._avatar_changed = False
+        refresh_avatar_url(instance)
+
+
+@receiver(post_save, sender=SocialAccount)
+def avatar_handler_social_account_saved(sender, instance, created, **kwargs):
+    refresh_avatar_url(instance.user)
+
+
+@receiver(post_delete, sender=SocialAccount)
+def avatar_handler_social_account_deleted(sender, instance, **kwargs):
+    try:
+        refresh_avatar_url(instance.user)
+    except get_user_model().DoesNotExist:
+        # The user is being deleted
+        pass
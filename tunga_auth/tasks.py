@@ -0,0 +1,8 @@
+from celery.decorators import periodic_task
+from celery.task.schedules import crontab
+
+
+@periodic_task(run_every=crontab(minute='*/5'))
+def flush_user_activity():
+    from tunga_auth.activity import flush_activity
+    flush_activity()
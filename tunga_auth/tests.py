@@ -1,3 +1,149 @@
+import datetime
+
+from allauth.socialaccount.models import SocialAccount
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from tunga_auth.activity import record_activity, flush_activity, discard_activity
+from tunga_auth.avatars import resolve_avatar_urls, store_avatar_urls
+from tunga_comments.models import Comment
+from tunga_comments.serializers import CommentSerializer
+
+
+class UserActivityTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('user', 'user@example.com', 'secret')
+        self.other_user = get_user_model().objects.create_user('other_user', 'other_user@example.com', 'secret')
+
+    def get_last_activity(self, user):
+        return get_user_model().objects.get(id=user.id).last_activity
+
+    def test_record_activity(self):
+        """
+        Activity is written once per granularity period and buffered in between until it's flushed
+        """
+        record_activity(self.user)
+        written_at = self.get_last_activity(self.user)
+        self.assertIsNotNone(written_at)
+
+        earlier = written_at - datetime.timedelta(minutes=1)
+        get_user_model().objects.filter(id=self.user.id).update(last_activity=earlier)
+        record_activity(self.user)
+        self.assertEqual(self.get_last_activity(self.user), earlier)
+
+        record_activity(self.other_user)
+        get_user_model().objects.filter(id=self.other_user.id).update(last_activity=earlier)
+        record_activity(self.other_user)
+
+        self.assertEqual(flush_activity(), 2)
+        self.assertGreater(self.get_last_activity(self.user), earlier)
+        self.assertGreater(self.get_last_activity(self.other_user), earlier)
+
+        # Values that are already stored aren't written again
+        self.assertEqual(flush_activity(), 0)
+
+    def test_flush_activity_keeps_newer_writes(self):
+        """
+        Flushing never moves last activity back to an older buffered value
+        """
+        record_activity(self.user)
+        record_activity(self.user)
+        later = self.get_last_activity(self.user) + datetime.timedelta(minutes=1)
+        get_user_model().objects.filter(id=self.user.id).update(last_activity=later)
+
+        self.assertEqual(flush_activity(), 0)
+        self.assertEqual(self.get_last_activity(self.user), later)
+
+    def test_discard_activity(self):
+        record_activity(self.user)
+        earlier = self.get_last_activity(self.user) - datetime.timedelta(minutes=1)
+        get_user_model().objects.filter(id=self.user.id).update(last_activity=earlier)
+        record_activity(self.user)
+
+        discard_activity(self.user.id)
+        self.assertEqual(flush_activity(), 0)
+        self.assertEqual(self.get_last_activity(self.user), earlier)
+
+        # The next activity is written straight away
+        record_activity(self.user)
+        self.assertGreater(self.get_last_activity(self.user), earlier)
+
+
+class AvatarTestCase(TestCase):
+
+    def setUp(self):
+        self.users = [
+            get_user_model().objects.create_user('user%s' % i, 'user%s@example.com' % i, 'secret') for i in range(3)
+        ]
+
+    def get_stored_avatar_url(self, user):
+        return get_user_model().objects.get(id=user.id).avatar_url
+
+    def test_resolve_avatar_urls(self):
+        """
+        Avatar urls of a list of users are resolved in one query and only stored when asked to
+        """
+        image_user, social_user, plain_user = self.users
+        get_user_model().objects.filter(id=image_user.id).update(image='photos/image_user.png')
+        SocialAccount.objects.create(user=social_user, provider='facebook', uid='1234')
+        get_user_model().objects.update(avatar_url=None)
+        users = list(get_user_model().objects.filter(id__in=[user.id for user in self.users]).order_by('id'))
+
+        with self.assertNumQueries(1):
+            avatar_urls = resolve_avatar_urls(users)
+        self.assertEqual(avatar_urls[image_user.id], '/media/photos/image_user.png')
+        self.assertIn('/1234/picture', avatar_urls[social_user.id])
+        self.assertIsNone(avatar_urls[plain_user.id])
+        self.assertEqual([self.get_stored_avatar_url(user) for user in users], [None, None, None])
+
+        self.assertEqual(store_avatar_urls(users), avatar_urls)
+        self.assertEqual(self.get_stored_avatar_url(social_user), avatar_urls[social_user.id])
+        self.assertEqual(self.get_stored_avatar_url(plain_user), '')
+
+        users = list(get_user_model().objects.filter(id__in=[user.id for user in self.users]))
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_avatar_urls(users), avatar_urls)
+
+    def test_nested_avatar_urls(self):
+        """
+        Users nested in a preloaded list get their avatar urls resolved together
+        """
+        social_user = self.users[1]
+        SocialAccount.objects.create(user=social_user, provider='facebook', uid='1234')
+        get_user_model().objects.update(avatar_url=None)
+        content_type = ContentType.objects.get_for_model(get_user_model())
+        for user in self.users:
+            Comment.objects.create(user=user, content_type=content_type, object_id=user.id, body='Comment')
+
+        comments = list(Comment.objects.select_related('user').order_by('id'))
+        data = CommentSerializer(comments, many=True).data
+        self.assertEqual([item['user']['id'] for item in data], [user.id for user in self.users])
+        self.assertIn('/1234/picture', data[1]['user']['avatar_url'])
+        self.assertIsNone(data[2]['user']['avatar_url'])
+
+    def test_avatar_signals(self):
+        """
+        Avatar urls are refreshed when the image or social accounts change, other saves leave them alone
+        """
+        user = get_user_model().objects.get(id=self.users[0].id)
+        self.assertEqual(user.avatar_url, '')
+
+        social_account = SocialAccount.objects.create(user=user, provider='facebook', uid='1234')
+        self.assertIn('/1234/picture', self.get_stored_avatar_url(user))
+        social_account.delete()
+        self.assertEqual(self.get_stored_avatar_url(user), '')
+
+        user = get_user_model().objects.get(id=user.id)
+        user.image = 'photos/user.png'
+        user.save()
+        self.assertEqual(self.get_stored_avatar_url(user), '/media/photos/user.png')
+
+        get_user_model().objects.filter(id=user.id).update(avatar_url='')
+        user = get_user_model().objects.get(id=user.id)
+        user.first_name = 'User'
+        user.save()
+        self.assertEqual(self.get_stored_avatar_url(user), '')
@@ -0,0 +1,61 @@
+from django.db.models.query_utils import Q
+
+from tunga_profiles.models import Connection
+
+
+def _get_user_id(user):
+    return getattr(user, 'id', user)
+
+
+class UserViewerContext(object):
+    """
+    Loads the connections between the current user and a page of users in one query
+    so that UserSerializer doesn't have to query for each row.
+    Methods accept users or user ids.
+    """
+
+    def __init__(self, user, user_ids):
+        self.user_ids = set(user_ids)
+        self.requested_by = dict()
+        self.requested = dict()
+        if self.user_ids and user and user.is_authenticated():
+            self.load(user)
+
+    def load(self, user):
+        connections = Connection.objects.filter(
+            Q(from_user=user, to_user__in=self.user_ids) | Q(to_user=user, from_user__in=self.user_ids)
+        )
+        for connection in connections:
+            if connection.to_user_id == user.id:
+                self.requested_by.setdefault(connection.from_user_id, []).append(connection)
+            else:
+                self.requested.setdefault(connection.to_user_id, []).append(connection)
+
+    def covers(self, user):
+        return _get_user_id(user) in self.user_ids
+
+    def has_requested(self, user):
+        """
+        Whether the user has ever asked to connect with the current user
+        """
+        return bool(self.requested_by.get(_get_user_id(user), None))
+
+    def has_accepted_or_been_requested(self, user):
+        """
+        Whether the current user is connected to or has a pending request to the user
+        """
+        return any(
+            [connection.accepted or not connection.responded for connection in self.requested.get(_get_user_id(user), [])]
+        )
+
+    def get_request(self, user):
+        """
+        The user's pending request to connect with the current user
+        """
+        pending = [
+            connection for connection in self.requested_by.get(_get_user_id(user), []) if not connection.responded
+        ]
+        if len(pending) == 1:
+            return pending[0]
+        # Ambiguous or no request, same as a failed get()
+        return None
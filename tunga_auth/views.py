@@ -7,7 +7,7 @@ from tunga_auth.filterbackends import UserFilterBackend
 from tunga_auth.filters import UserFilter
 from tunga_auth.serializers import UserSerializer, AccountInfoSerializer
 from tunga_utils.serializers import SimpleUserSerializer
-from tunga_utils.filterbackends import DEFAULT_FILTER_BACKENDS
+from tunga_utils.filterbackends import with_search_filter_last
 
 
 class VerifyUserView(views.APIView):
@@ -56,9 +56,12 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     """
     User Resource
     """
-    queryset = get_user_model().objects.all()
+    # Profile skills are loaded by SimpleProfileSerializer.preload
+    queryset = get_user_model().objects.select_related(
+        'stats', 'userprofile', 'userprofile__city'
+    ).prefetch_related('work_set', 'education_set')
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     filter_class = UserFilter
-    filter_backends = DEFAULT_FILTER_BACKENDS + (UserFilterBackend,)
+    filter_backends = with_search_filter_last(UserFilterBackend)
     search_fields = ('username', 'first_name', 'last_name', 'email', 'userprofile__skills__name')
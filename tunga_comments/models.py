@@ -26,6 +26,7 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        index_together = ('created_at', 'id')
 
     @allow_staff_or_superuser
     def has_object_write_permission(self, request):
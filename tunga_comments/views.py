@@ -18,6 +18,7 @@ class CommentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, DRYObjectPermissions]
     filter_class = CommentFilter
     search_fields = ('user__username', )
+    cursor_ordering = ('-created_at', '-id')
 
     def perform_create(self, serializer):
         comment = serializer.save()
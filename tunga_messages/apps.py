@@ -10,5 +10,8 @@ class TungaMessagesConfig(AppConfig):
     def ready(self):
         from actstream import registry
         from tunga_messages import signals
+        from tunga_messages.search import get_message_search_document
+        from tunga_utils import search
 
         registry.register(self.get_model('Message'))
+        search.register(self.get_model('Message'), get_message_search_document)
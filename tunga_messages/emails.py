@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.db.models.query_utils import Q
 
 from tunga.settings import EMAIL_SUBJECT_PREFIX, TUNGA_URL
+from tunga_profiles.connection_graph import connections_of
 from tunga_utils.decorators import catch_all_exceptions
 from tunga_utils.emails import send_mail
 
@@ -10,16 +10,7 @@ from tunga_utils.emails import send_mail
 def send_new_message_email(instance, to=None):
     if not to:
         if instance.is_broadcast:
-            recipients = get_user_model().objects.filter(
-                (
-                    Q(connections_initiated__accepted=True) &
-                    Q(connections_initiated__to_user=instance.user)
-                ) |
-                (
-                    Q(connection_requests__from_user=instance.user) &
-                    Q(connection_requests__accepted=True)
-                )
-            )
+            recipients = get_user_model().objects.filter(id__in=connections_of(instance.user))
         else:
             recipients = instance.recipients.all()
         if recipients:
@@ -1,23 +1,16 @@
-from django.db.models.aggregates import Count
 from django.db.models.query_utils import Q
 from dry_rest_permissions.generics import DRYPermissionFiltersBase
 
+from tunga_messages.models import Reception, Reply
+from tunga_profiles.connection_graph import connections_of
+
 
 def received_messages_q_filter(user):
     return (
-        Q(recipients=user) |
+        Q(id__in=Reception.objects.filter(user=user).values('message_id')) |
         (
             Q(is_broadcast=True) &
-            (
-                (
-                    Q(user__connections_initiated__accepted=True) &
-                    Q(user__connections_initiated__to_user=user)
-                ) |
-                (
-                    Q(user__connection_requests__from_user=user) &
-                    Q(user__connection_requests__accepted=True)
-                )
-            )
+            Q(user__in=connections_of(user))
         )
     )
 
@@ -32,19 +25,10 @@ def received_replies_q_filter(user):
         (
             Q(is_broadcast=True) &
             (
-                Q(message__recipients=user) |
+                Q(message__in=Reception.objects.filter(user=user).values('message_id')) |
                 (
                     Q(message__is_broadcast=True) &
-                    (
-                        (
-                            Q(message__user__connections_initiated__accepted=True) &
-                            Q(message__user__connections_initiated__to_user=user)
-                        ) |
-                        (
-                            Q(message__user__connection_requests__from_user=user) &
-                            Q(message__user__connection_requests__accepted=True)
-                        )
-                    )
+                    Q(message__user__in=connections_of(user))
                 )
             )
         )
@@ -62,13 +46,15 @@ class MessageFilterBackend(DRYPermissionFiltersBase):
         if label_filter == 'sent':
             return queryset.filter(user=request.user)
         elif label_filter == 'inbox':
+            # Own messages only show up once someone replied, checked with a subquery instead of counting replies
+            replied_message_ids = Reply.objects.filter(message__user=request.user).values('message_id')
             return queryset.filter(
-                all_messages_q_filter(request.user)
-            ).annotate(reply_count=Count('replies')).exclude(user=request.user, reply_count=0)
+                all_messages_q_filter(request.user) & (~Q(user=request.user) | Q(id__in=replied_message_ids))
+            )
         return queryset.filter(all_messages_q_filter(request.user))
 
 
 class ReplyFilterBackend(DRYPermissionFiltersBase):
 
     def filter_list_queryset(self, request, queryset, view):
-        return queryset.filter(all_replies_q_filter(request.user)).distinct()
+        return queryset.filter(all_replies_q_filter(request.user))
@@ -0,0 +1,66 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.aggregates import Max
+from django.db.models.expressions import Case, When, F
+from django.db.models.fields import DateTimeField
+
+from tunga_messages.filterbackends import all_messages_q_filter
+from tunga_messages.models import Message
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User whose inbox is queried')
+        parser.add_argument('--page-size', type=int, default=20, dest='page_size')
+        parser.add_argument('--runs', type=int, default=10, dest='runs')
+
+    def handle(self, *args, **options):
+        """
+        Compares the query plans and timings of the inbox ordered by aggregating replies
+        and by the denormalized last_activity_at column.
+        """
+        # command to run: python manage.py benchmark_message_ordering <username>
+
+        try:
+            user = get_user_model().objects.get(username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('User %s does not exist' % options['username'])
+
+        messages = Message.objects.filter(all_messages_q_filter(user))
+        querysets = [
+            ('aggregate', messages.annotate(
+                latest_reply_created_at=Max('replies__created_at')
+            ).annotate(latest_created_at=Case(
+                When(
+                    latest_reply_created_at__isnull=True,
+                    then='created_at'
+                ),
+                When(
+                    latest_reply_created_at__gt=F('created_at'),
+                    then='latest_reply_created_at'
+                ),
+                default='created_at',
+                output_field=DateTimeField()
+            )).order_by('-latest_created_at')),
+            ('last_activity_at', messages.order_by('-last_activity_at'))
+        ]
+
+        for label, queryset in querysets:
+            page = queryset[:options['page_size']]
+            sql, params = page.query.sql_with_params()
+
+            cursor = connection.cursor()
+            cursor.execute('EXPLAIN %s' % sql, params)
+            self.stdout.write('%s plan:' % label)
+            for row in cursor.fetchall():
+                self.stdout.write('  %s' % ' | '.join([unicode(column) for column in row]))
+
+            start = time.time()
+            for i in range(options['runs']):
+                # A fresh slice for every run, a reused one would answer from its result cache
+                list(queryset.all()[:options['page_size']])
+            self.stdout.write('%s: %.2f ms per page\n' % (label, (time.time() - start) * 1000 / options['runs']))
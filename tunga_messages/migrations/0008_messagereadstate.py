@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-22 10:12
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_read_states(apps, schema_editor):
+    Message = apps.get_model('tunga_messages', 'Message')
+    Reception = apps.get_model('tunga_messages', 'Reception')
+    Reply = apps.get_model('tunga_messages', 'Reply')
+    MessageReadState = apps.get_model('tunga_messages', 'MessageReadState')
+
+    replies = dict()
+    for message_id, user_id, created_at in Reply.objects.values_list('message_id', 'user_id', 'created_at').iterator():
+        replies.setdefault(message_id, []).append((user_id, created_at))
+
+    def get_last_activity_at(message_id, message_user_id, message_created_at, user_id):
+        dates = [created_at for reply_user_id, created_at in replies.get(message_id, []) if reply_user_id != user_id]
+        if message_user_id != user_id:
+            dates.append(message_created_at)
+        return dates and max(dates) or None
+
+    states = []
+    messages = dict()
+    for message_id, user_id, created_at, read_at in Message.objects.values_list(
+            'id', 'user_id', 'created_at', 'read_at').iterator():
+        messages[message_id] = (user_id, created_at)
+        states.append(MessageReadState(
+            message_id=message_id, user_id=user_id,
+            last_activity_at=get_last_activity_at(message_id, user_id, created_at, user_id), last_read_at=read_at
+        ))
+    for message_id, user_id, read_at in Reception.objects.values_list('message_id', 'user_id', 'read_at').iterator():
+        message_user_id, created_at = messages[message_id]
+        if user_id != message_user_id:
+            states.append(MessageReadState(
+                message_id=message_id, user_id=user_id,
+                last_activity_at=get_last_activity_at(message_id, message_user_id, created_at, user_id),
+                last_read_at=read_at
+            ))
+    MessageReadState.objects.bulk_create(states, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tunga_messages', '0007_auto_20160501_0549'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageReadState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='tunga_messages.Message')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='messagereadstate',
+            unique_together=set([('user', 'message')]),
+        ),
+        migrations.RunPython(backfill_read_states, migrations.RunPython.noop),
+    ]
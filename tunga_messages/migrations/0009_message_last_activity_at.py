@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-22 15:30
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.aggregates import Max
+from django.db.models.expressions import F
+
+
+def backfill_last_activity_at(apps, schema_editor):
+    Message = apps.get_model('tunga_messages', 'Message')
+    Message.objects.update(last_activity_at=F('created_at'))
+    for message_id, latest_reply_created_at in Message.objects.annotate(
+            latest_reply_created_at=Max('replies__created_at')
+    ).filter(latest_reply_created_at__gt=F('created_at')).values_list('id', 'latest_reply_created_at').iterator():
+        Message.objects.filter(id=message_id).update(last_activity_at=latest_reply_created_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tunga_messages', '0008_messagereadstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='message',
+            index_together=set([('user', 'last_activity_at')]),
+        ),
+        migrations.RunPython(backfill_last_activity_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-23 09:12
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tunga_messages', '0009_message_last_activity_at'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='reply',
+            index_together=set([('created_at', 'id')]),
+        ),
+    ]
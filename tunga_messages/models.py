@@ -3,13 +3,13 @@ from __future__ import unicode_literals
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
-from django.db.models.query_utils import Q
+from django.utils import timezone
 from django.utils.html import strip_tags
 from django.utils.translation import ugettext_lazy as _
 from dry_rest_permissions.generics import allow_staff_or_superuser
 
 from tunga import settings
-from tunga_profiles.models import Connection
+from tunga_profiles.connection_graph import are_connected
 
 
 class Message(models.Model):
@@ -22,24 +22,28 @@ class Message(models.Model):
     body = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(blank=True, null=True)
+    # Time of the latest reply or of the message itself, maintained by tunga_messages.read_state
+    last_activity_at = models.DateTimeField(blank=True, null=True, db_index=True)
 
     def __unicode__(self):
         return '%s - %s' % (self.user.get_short_name() or self.user.username, self.subject)
 
     class Meta:
         ordering = ['-created_at']
+        index_together = ('user', 'last_activity_at')
+
+    def save(self, *args, **kwargs):
+        if not self.last_activity_at:
+            self.last_activity_at = self.created_at or timezone.now()
+        super(Message, self).save(*args, **kwargs)
 
     @allow_staff_or_superuser
     def has_object_read_permission(self, request):
         if self.has_object_write_permission(request):
             return True
         if self.is_broadcast:
-            return bool(
-                Connection.objects.exclude(accepted=False).filter(
-                    Q(from_user=self.user, to_user=request.user) | Q(from_user=request.user, to_user=self.user)
-                ).count()
-            )
-        return request.user in self.recipients.all()
+            return are_connected(self.user_id, request.user)
+        return self.reception_set.filter(user=request.user).exists()
 
     @allow_staff_or_superuser
     def has_object_write_permission(self, request):
@@ -76,6 +80,7 @@ class Reply(models.Model):
     class Meta:
         verbose_name_plural = 'replies'
         ordering = ['-created_at']
+        index_together = ('created_at', 'id')
 
     @allow_staff_or_superuser
     def has_object_read_permission(self, request):
@@ -94,6 +99,29 @@ class Reply(models.Model):
         return strip_tags(self.body)
 
 
+class MessageReadState(models.Model):
+    """
+    Read state of a message thread for one of its participants, maintained by tunga_messages.read_state.
+    last_activity_at is the latest message or reply by someone else, None when there's nothing to read.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='read_states')
+    last_activity_at = models.DateTimeField(blank=True, null=True)
+    last_read_at = models.DateTimeField(blank=True, null=True)
+
+    def __unicode__(self):
+        return '%s - %s' % (self.user.get_short_name() or self.user.username, self.message.subject)
+
+    class Meta:
+        unique_together = ('user', 'message')
+
+    @property
+    def is_read(self):
+        return self.last_activity_at is None or bool(
+            self.last_read_at and self.last_read_at >= self.last_activity_at
+        )
+
+
 class Attachment(models.Model):
     file = models.FileField(verbose_name='Attachment', upload_to='attachments/%Y/%m/%d')
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, verbose_name=_('content type'))
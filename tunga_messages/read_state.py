@@ -0,0 +1,50 @@
+from django.db.models.aggregates import Max
+
+from tunga_messages.models import Message, MessageReadState, Reply
+
+
+def get_last_activity_at(message, user_id):
+    """
+    Returns the time of the latest activity in a thread by users other than this one
+    """
+    latest_reply_at = Reply.objects.filter(message=message).exclude(
+        user_id=user_id
+    ).aggregate(latest=Max('created_at'))['latest']
+    if message.user_id == user_id:
+        return latest_reply_at
+    return max(message.created_at, latest_reply_at or message.created_at)
+
+
+def ensure_read_state(message, user_id):
+    state, created = MessageReadState.objects.get_or_create(
+        message=message, user_id=user_id,
+        defaults={'last_activity_at': get_last_activity_at(message, user_id)}
+    )
+    return state
+
+
+def update_thread_activity(reply):
+    """
+    Marks the thread as having new activity for everyone but the author of the reply
+    """
+    Message.objects.filter(id=reply.message_id, last_activity_at__lt=reply.created_at).update(
+        last_activity_at=reply.created_at
+    )
+    MessageReadState.objects.filter(message_id=reply.message_id).exclude(
+        user_id=reply.user_id
+    ).update(last_activity_at=reply.created_at)
+    ensure_read_state(reply.message, reply.user_id)
+
+
+def mark_read(message, user_id, read_at):
+    state = ensure_read_state(message, user_id)
+    MessageReadState.objects.filter(id=state.id).update(last_read_at=read_at)
+
+
+def load_read_states(user, message_ids):
+    """
+    Returns the read states of a user for a page of messages keyed by message id
+    """
+    return dict(
+        [(state.message_id, state) for state in MessageReadState.objects.filter(user=user, message_id__in=message_ids)]
+    )
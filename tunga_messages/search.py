@@ -0,0 +1,11 @@
+from tunga_messages.models import Reply
+
+
+def get_message_search_document(message):
+    document = [
+        (message.subject, 3),
+        (message.user.username, 3),
+        (message.body, 1)
+    ]
+    document.extend([(body, 1) for body in Reply.objects.filter(message_id=message.id).values_list('body', flat=True)])
+    return document
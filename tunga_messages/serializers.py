@@ -1,15 +1,11 @@
 from django.contrib.auth import get_user_model
-from django.contrib.contenttypes.models import ContentType
-from django.db.models.aggregates import Max
-from django.db.models.expressions import F, Value, Case, When
-from django.db.models.fields import DateTimeField
-from django.db.models.query_utils import Q
 from rest_framework import serializers
 
 from tunga_auth.serializers import SimpleUserSerializer
-from tunga_messages.models import Message, Reply, Reception, Attachment
+from tunga_messages.models import Message, Reply, Reception, Attachment, MessageReadState
+from tunga_messages.read_state import load_read_states
 from tunga_utils.serializers import DetailAnnotatedSerializer, CreateOnlyCurrentUserDefault, SimpleUploadSerializer, \
-    SimpleUserSerializer
+    SimpleUserSerializer, GenericUploadsField, PreloadedListSerializer
 
 
 class SimpleAttachmentSerializer(SimpleUploadSerializer):
@@ -33,12 +29,13 @@ class MessageSerializer(DetailAnnotatedSerializer):
                                                     allow_null=True, allow_empty=True)
     excerpt = serializers.CharField(required=False, read_only=True)
     is_read = serializers.SerializerMethodField(read_only=True, required=False)
-    attachments = serializers.SerializerMethodField(read_only=True, required=False)
+    attachments = GenericUploadsField(Attachment, SimpleAttachmentSerializer, required=False)
 
     class Meta:
         model = Message
         read_only_fields = ('created_at',)
         details_serializer = MessageDetailsSerializer
+        list_serializer_class = PreloadedListSerializer
 
     def create(self, validated_data):
         to_users = None
@@ -65,36 +62,29 @@ class MessageSerializer(DetailAnnotatedSerializer):
                 except:
                     pass
 
-    def get_is_read(self, obj):
+    def __get_current_user(self):
         request = self.context.get("request", None)
         if request:
-            user = getattr(request, "user", None)
-            if user:
-                if obj.user == user:
-                    replies = obj.replies.exclude(user=user)
-                    if obj.read_at:
-                        return replies.filter(created_at__gt=obj.read_at).count() == 0
-                    return replies.count() == 0
-                return obj.reception_set.filter(
-                    user=user, read_at__isnull=False
-                ).annotate(
-                    latest_created_at=Max(
-                        Case(
-                            When(
-                                ~Q(message__replies__user=request.user),
-                                then='message__replies__created_at'
-                            ),
-                            default=Value(obj.created_at),
-                            output_field=DateTimeField()
-                        )
-                    )
-                ).filter(Q(latest_created_at__isnull=True) | Q(read_at__gt=F('latest_created_at')), read_at__gt=obj.created_at).count() >= 1
-        return False
+            return getattr(request, "user", None)
+        return None
+
+    def preload(self, instances):
+        user = self.__get_current_user()
+        if user and user.is_authenticated():
+            self._read_states = (
+                set([message.id for message in instances]), load_read_states(user, [message.id for message in instances])
+            )
 
-    def get_attachments(self, obj):
-        content_type = ContentType.objects.get_for_model(Message)
-        attachments = Attachment.objects.filter(content_type=content_type, object_id=obj.id)
-        return SimpleAttachmentSerializer(attachments, many=True).data
+    def get_is_read(self, obj):
+        user = self.__get_current_user()
+        if user and user.is_authenticated():
+            read_states = getattr(self, '_read_states', None)
+            if read_states and obj.id in read_states[0]:
+                state = read_states[1].get(obj.id, None)
+            else:
+                state = MessageReadState.objects.filter(user=user, message=obj).first()
+            return bool(state and state.is_read)
+        return False
 
 
 class ReplyDetailsSerializer(serializers.ModelSerializer):
@@ -108,14 +98,10 @@ class ReplyDetailsSerializer(serializers.ModelSerializer):
 class ReplySerializer(DetailAnnotatedSerializer):
     user = serializers.PrimaryKeyRelatedField(required=False, read_only=True, default=CreateOnlyCurrentUserDefault())
     excerpt = serializers.CharField(required=False, read_only=True)
-    attachments = serializers.SerializerMethodField(read_only=True, required=False)
+    attachments = GenericUploadsField(Attachment, SimpleAttachmentSerializer, required=False)
 
     class Meta:
         model = Reply
         read_only_fields = ('created_at',)
         details_serializer = ReplyDetailsSerializer
-
-    def get_attachments(self, obj):
-        content_type = ContentType.objects.get_for_model(Reply)
-        attachments = Attachment.objects.filter(content_type=content_type, object_id=obj.id)
-        return SimpleAttachmentSerializer(attachments, many=True).data
+        list_serializer_class = PreloadedListSerializer
@@ -1,13 +1,16 @@
 from django.contrib.auth import get_user_model
 from django.core.mail.message import EmailMessage
 from django.db.models.query_utils import Q
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch.dispatcher import receiver
 from django.template.loader import render_to_string
 
 from tunga.settings import DEFAULT_FROM_EMAIL, EMAIL_SUBJECT_PREFIX
 from tunga_messages.emails import send_new_message_email, send_new_reply_email
 from tunga_messages.models import Message, Reply, Reception
+from tunga_messages.read_state import ensure_read_state, update_thread_activity
+from tunga_profiles.notifications import invalidate_notifications, get_message_audience
+from tunga_utils.search import index_object
 
 
 @receiver(post_save, sender=Message)
@@ -26,3 +29,61 @@ def activity_handler_new_message_recipient(sender, instance, created, **kwargs):
 def activity_handler_new_reply(sender, instance, created, **kwargs):
     if created:
         send_new_reply_email(instance)
+
+
+@receiver(post_save, sender=Message)
+def notification_handler_message(sender, instance, created, **kwargs):
+    if created:
+        invalidate_notifications(*get_message_audience(instance))
+    else:
+        # Only the owner's read_at can change
+        invalidate_notifications(instance.user_id)
+
+
+@receiver(post_delete, sender=Message)
+def notification_handler_deleted_message(sender, instance, **kwargs):
+    # Receptions are deleted first and invalidate their own users
+    invalidate_notifications(*get_message_audience(instance))
+
+
+@receiver(post_save, sender=Reception)
+@receiver(post_delete, sender=Reception)
+def notification_handler_reception(sender, instance, **kwargs):
+    invalidate_notifications(instance.user_id)
+
+
+@receiver(post_save, sender=Reply)
+@receiver(post_delete, sender=Reply)
+def notification_handler_reply(sender, instance, **kwargs):
+    try:
+        invalidate_notifications(*get_message_audience(instance.message))
+    except Message.DoesNotExist:
+        pass
+
+
+@receiver(post_save, sender=Message)
+def read_state_handler_new_message(sender, instance, created, **kwargs):
+    if created:
+        ensure_read_state(instance, instance.user_id)
+
+
+@receiver(post_save, sender=Reception)
+def read_state_handler_new_message_recipient(sender, instance, created, **kwargs):
+    if created:
+        ensure_read_state(instance.message, instance.user_id)
+
+
+@receiver(post_save, sender=Reply)
+def read_state_handler_new_reply(sender, instance, created, **kwargs):
+    if created:
+        update_thread_activity(instance)
+
+
+@receiver(post_save, sender=Reply)
+@receiver(post_delete, sender=Reply)
+def search_handler_reply(sender, instance, **kwargs):
+    try:
+        index_object(instance.message)
+    except Message.DoesNotExist:
+        # Message is being deleted as well
+        pass
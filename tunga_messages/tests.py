@@ -1,3 +1,37 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from tunga_messages.models import Message, Reception, Reply
+
+
+class APIMessageTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('user', 'user@example.com', 'secret')
+        self.other_user = get_user_model().objects.create_user('other_user', 'other_user@example.com', 'secret')
+
+    def test_inbox(self):
+        """
+        The inbox has received messages and own messages that someone replied to
+        """
+        received = Message.objects.create(user=self.other_user, subject='Received', body='Body')
+        Reception.objects.create(message=received, user=self.user)
+        replied = Message.objects.create(user=self.user, subject='Replied', body='Body')
+        Reception.objects.create(message=replied, user=self.other_user)
+        Reply.objects.create(message=replied, user=self.other_user, body='Reply')
+        unanswered = Message.objects.create(user=self.user, subject='Unanswered', body='Body')
+        Reception.objects.create(message=unanswered, user=self.other_user)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('message-list'), {'filter': 'inbox'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted([message['id'] for message in response.data['results']]), sorted([received.id, replied.id])
+        )
+
+        response = self.client.get(reverse('message-list'), {'filter': 'sent'})
+        self.assertEqual(
+            sorted([message['id'] for message in response.data['results']]), sorted([replied.id, unanswered.id])
+        )
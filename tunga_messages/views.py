@@ -1,9 +1,6 @@
 import datetime
 
 from django.contrib.contenttypes.models import ContentType
-from django.db.models.aggregates import Max
-from django.db.models.expressions import Case, When, F
-from django.db.models.fields import DateTimeField
 from django.shortcuts import render
 from dry_rest_permissions.generics import DRYObjectPermissions
 from rest_framework import viewsets, status
@@ -15,33 +12,24 @@ from rest_framework.response import Response
 from tunga_messages.filterbackends import MessageFilterBackend, ReplyFilterBackend
 from tunga_messages.filters import MessageFilter, ReplyFilter
 from tunga_messages.models import Message, Reply, Reception, Attachment
+from tunga_messages.read_state import mark_read
 from tunga_messages.serializers import MessageSerializer, ReplySerializer
-from tunga_utils.filterbackends import DEFAULT_FILTER_BACKENDS
+from tunga_utils.filterbackends import DEFAULT_FILTER_BACKENDS, with_search_filter_last
 
 
 class MessageViewSet(viewsets.ModelViewSet):
     """
     Message Resource
     """
-    queryset = Message.objects.all().annotate(
-        latest_reply_created_at=Max('replies__created_at')
-    ).annotate(latest_created_at=Case(
-        When(
-            latest_reply_created_at__isnull=True,
-            then='created_at'
-        ),
-        When(
-            latest_reply_created_at__gt=F('created_at'),
-            then='latest_reply_created_at'
-        ),
-        default='created_at',
-        output_field=DateTimeField()
-    )).order_by('-latest_created_at')
+    queryset = Message.objects.select_related('user__userprofile').prefetch_related(
+        'recipients__userprofile'
+    ).order_by('-last_activity_at')
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated, DRYObjectPermissions]
     filter_class = MessageFilter
-    filter_backends = DEFAULT_FILTER_BACKENDS + (MessageFilterBackend,)
+    filter_backends = with_search_filter_last(MessageFilterBackend)
     search_fields = ('user__username', 'body', 'replies__body')
+    cursor_ordering = ('-last_activity_at', '-id')
 
     def perform_create(self, serializer):
         message = serializer.save()
@@ -52,6 +40,11 @@ class MessageViewSet(viewsets.ModelViewSet):
                 attachment = Attachment(object_id=message.id, content_type=content_type, file=file)
                 attachment.save()
 
+    def perform_update(self, serializer):
+        serializer.save()
+        # Recipients may have changed, don't serialize the response from the prefetched relations
+        serializer.instance._prefetched_objects_cache = {}
+
     @detail_route(
         methods=['post'], url_path='read',
         permission_classes=[IsAuthenticated]
@@ -70,6 +63,7 @@ class MessageViewSet(viewsets.ModelViewSet):
             else:
                 reception = {'user': request.user, 'message': message, 'read_at': read_at}
                 Reception.objects.update_or_create(user=request.user, message=message, defaults=reception)
+            mark_read(message, request.user.id, read_at)
 
             return Response({'status': 'Read status updated.', 'message': message.id})
         return Response(
@@ -82,12 +76,13 @@ class ReplyViewSet(viewsets.ModelViewSet):
     """
     Reply Resource
     """
-    queryset = Reply.objects.all()
+    queryset = Reply.objects.select_related('user__userprofile')
     serializer_class = ReplySerializer
     permission_classes = [IsAuthenticated, DRYObjectPermissions]
     filter_class = ReplyFilter
     filter_backends = DEFAULT_FILTER_BACKENDS + (ReplyFilterBackend,)
     search_fields = ('user__username', 'body')
+    cursor_ordering = ('-created_at', '-id')
 
     def perform_create(self, serializer):
         reply = serializer.save()
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.db.models.query_utils import Q
+
+from tunga.settings.base import TUNGA_CONNECTIONS_CACHE_TIMEOUT
+from tunga_profiles.models import Connection
+
+CONNECTIONS_CACHE_KEY = 'tunga_connections_%s'
+
+
+def _get_user_id(user):
+    return getattr(user, 'id', user)
+
+
+def load_connections(user):
+    """
+    Reads the ids of users with an accepted connection to this user from the database
+    """
+    user_id = _get_user_id(user)
+    connection_ids = set()
+    connections = Connection.objects.filter(
+        Q(from_user_id=user_id) | Q(to_user_id=user_id), accepted=True
+    ).values_list('from_user_id', 'to_user_id')
+    for from_user_id, to_user_id in connections:
+        connection_ids.add(to_user_id if from_user_id == user_id else from_user_id)
+    return frozenset(connection_ids)
+
+
+def connections_of(user):
+    """
+    Returns the ids of users with an accepted connection to this user, served from the cache when possible
+    """
+    key = CONNECTIONS_CACHE_KEY % _get_user_id(user)
+    connection_ids = cache.get(key)
+    if connection_ids is None:
+        connection_ids = load_connections(user)
+        cache.set(key, connection_ids, TUNGA_CONNECTIONS_CACHE_TIMEOUT)
+    return connection_ids
+
+
+def are_connected(user, other_user):
+    return _get_user_id(other_user) in connections_of(user)
+
+
+def invalidate_connections(*users):
+    cache.delete_many([CONNECTIONS_CACHE_KEY % _get_user_id(user) for user in users])
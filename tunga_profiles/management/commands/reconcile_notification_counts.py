@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from tunga_profiles.notifications import reconcile_notifications
+
+
+class Command(BaseCommand):
+
+    def handle(self, *args, **options):
+        """
+        Recomputes cached notification counters of all users from source tables.
+        """
+        # command to run: python manage.py reconcile_notification_counts
+
+        users = get_user_model().objects.select_related('userprofile').iterator()
+        stale = reconcile_notifications(users)
+        self.stdout.write("%s users had stale notification counters" % stale)
@@ -0,0 +1,150 @@
+from django.core.cache import cache
+from django.db.models.aggregates import Max
+from django.db.models.expressions import F, Case, When
+from django.db.models.fields import DateTimeField
+from django.db.models.query_utils import Q
+
+from tunga.settings.base import TUNGA_NOTIFICATIONS_CACHE_TIMEOUT
+from tunga_auth.models import USER_TYPE_PROJECT_OWNER
+from tunga_messages.filterbackends import received_messages_q_filter, received_replies_q_filter
+from tunga_messages.models import Message, Reply, Reception
+from tunga_profiles.connection_graph import connections_of, _get_user_id
+
+NOTIFICATIONS_CACHE_KEY = 'tunga_notifications_%s'
+
+
+def count_new_messages(user):
+    aggregator_message_read_at = Max(
+        Case(
+            When(
+                Q(reception__user=user) &
+                Q(reception__message__id=F('id')),
+                then='reception__read_at'
+            ),
+            output_field=DateTimeField()
+        )
+    )
+
+    new_messages = Message.objects.filter(
+        received_messages_q_filter(user)
+    ).annotate(
+        my_read_at=aggregator_message_read_at
+    ).filter(
+        Q(my_read_at=None) | Q(created_at__gt=F('my_read_at'))
+    ).count()
+
+    aggregator_reply_read_at = Max(
+        Case(
+            When(
+                Q(message__user=user),
+                then='message__read_at'
+            ),
+            When(
+                Q(is_broadcast=True) &
+                Q(message__reception__user=user) &
+                Q(message__reception__message__id=F('message__id')),
+                then='message__reception__read_at'
+            ),
+            output_field=DateTimeField()
+        )
+    )
+    new_replies = Reply.objects.exclude(user=user).filter(
+        received_replies_q_filter(user)
+    ).annotate(my_read_at=aggregator_reply_read_at).filter(Q(my_read_at=None) | Q(created_at__gt=F('my_read_at'))).count()
+    return new_messages + new_replies
+
+
+def get_profile_notifications(user):
+    profile = None
+    profile_notifications = {'count': 0, 'missing': [], 'improve': [], 'more': [], 'section': None}
+    try:
+        profile = user.userprofile
+    except:
+        profile_notifications['missing'] = ['skills', 'bio', 'country', 'city', 'street', 'plot_number', 'phone_number']
+
+    if not user.image:
+        profile_notifications['missing'].append('image')
+
+    if profile:
+        skills = profile.skills.count()
+        if skills == 0:
+            profile_notifications['missing'].append('skills')
+        elif skills < 3:
+            profile_notifications['more'].append('skills')
+
+        if not profile.bio:
+            profile_notifications['missing'].append('bio')
+
+        if not profile.country:
+            profile_notifications['missing'].append('country')
+        if not profile.city:
+            profile_notifications['missing'].append('city')
+        if not profile.street:
+            profile_notifications['missing'].append('street')
+        if not profile.plot_number:
+            profile_notifications['missing'].append('plot_number')
+        if not profile.phone_number:
+            profile_notifications['missing'].append('phone_number')
+
+        if user.type == USER_TYPE_PROJECT_OWNER and not profile.company:
+            profile_notifications['missing'].append('company')
+
+    profile_notifications['count'] = len(profile_notifications['missing']) + len(profile_notifications['more']) \
+                                     + len(profile_notifications['improve'])
+    return profile_notifications
+
+
+def compute_notifications(user):
+    """
+    Computes the notification counters of a user from source tables
+    """
+    requests = user.connection_requests.filter(responded=False).count()
+    tasks = user.tasks_created.filter(closed=False).count() + user.participation_set.filter(
+        (Q(accepted=True) | Q(responded=False)), user=user
+    ).count()
+    return {
+        'messages': count_new_messages(user), 'requests': requests, 'tasks': tasks,
+        'profile': get_profile_notifications(user)
+    }
+
+
+def get_notifications(user):
+    """
+    Returns the notification counters of a user, served from the cache until a signal invalidates them
+    """
+    key = NOTIFICATIONS_CACHE_KEY % user.id
+    notifications = cache.get(key)
+    if notifications is None:
+        notifications = compute_notifications(user)
+        cache.set(key, notifications, TUNGA_NOTIFICATIONS_CACHE_TIMEOUT)
+    return notifications
+
+
+def invalidate_notifications(*users):
+    cache.delete_many([NOTIFICATIONS_CACHE_KEY % _get_user_id(user) for user in users if user])
+
+
+def get_message_audience(message):
+    """
+    Returns the ids of users whose message counters depend on a message and its replies
+    """
+    user_ids = set([message.user_id])
+    user_ids.update(Reception.objects.filter(message_id=message.id).values_list('user_id', flat=True))
+    if message.is_broadcast:
+        user_ids.update(connections_of(message.user_id))
+    return user_ids
+
+
+def reconcile_notifications(users):
+    """
+    Recomputes the cached counters of users from source tables, returns the number of users with stale counters
+    """
+    stale = 0
+    for user in users:
+        key = NOTIFICATIONS_CACHE_KEY % user.id
+        cached = cache.get(key)
+        notifications = compute_notifications(user)
+        if cached is not None and cached != notifications:
+            stale += 1
+        cache.set(key, notifications, TUNGA_NOTIFICATIONS_CACHE_TIMEOUT)
+    return stale
@@ -1,8 +1,12 @@
 from actstream.signals import action
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch.dispatcher import receiver
 
-from tunga_profiles.models import Connection
+from tunga_profiles.connection_graph import invalidate_connections
+from tunga_profiles.models import Connection, UserProfile
+from tunga_profiles.notifications import invalidate_notifications
+from tunga_utils.search import index_object
 
 
 @receiver(post_save, sender=Connection)
@@ -17,3 +21,32 @@ def activity_handler_new_connection(sender, instance, created, **kwargs):
                 action.send(instance.to_user, verb='accepted a connection request', action_object=instance)
             elif 'responded' in update_fields and not instance.accepted:
                 action.send(instance.to_user, verb='rejected a connection request', action_object=instance)
+
+
+@receiver(post_save, sender=Connection)
+@receiver(post_delete, sender=Connection)
+def connection_graph_handler(sender, instance, **kwargs):
+    invalidate_connections(instance.from_user_id, instance.to_user_id)
+    # Connection requests and broadcast messages of both users change
+    invalidate_notifications(instance.from_user_id, instance.to_user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def notification_handler_profile(sender, instance, **kwargs):
+    invalidate_notifications(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def notification_handler_user(sender, instance, **kwargs):
+    invalidate_notifications(instance.id)
+
+
+@receiver(post_save, sender=UserProfile)
+def search_handler_profile(sender, instance, **kwargs):
+    index_object(instance.user)
+
+
+@receiver(m2m_changed, sender=UserProfile._meta.get_field('skills').rel.through)
+def search_handler_profile_skills(sender, instance, action, reverse, **kwargs):
+    if not reverse and action in ['post_add', 'post_remove', 'post_clear']:
+        index_object(instance.user)
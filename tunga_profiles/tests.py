@@ -1,3 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from tunga_auth.models import USER_TYPE_PROJECT_OWNER, USER_TYPE_DEVELOPER
+from tunga_messages.models import Message, Reception, Reply
+from tunga_profiles.models import Connection, UserProfile
+from tunga_profiles.notifications import get_notifications, compute_notifications, NOTIFICATIONS_CACHE_KEY
+from tunga_tasks.models import Task, Participation
+from tunga_tasks.participation import save_task_participation
+
+
+class NotificationTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.project_owner = get_user_model().objects.create_user(
+            'project_owner', 'po@example.com', 'secret', **{'type': USER_TYPE_PROJECT_OWNER})
+        self.developer = get_user_model().objects.create_user(
+            'developer', 'developer@example.com', 'secret', **{'type': USER_TYPE_DEVELOPER})
+
+    def assertInvalidated(self, user, change):
+        """
+        Runs a change and checks that it drops the user's cached counters and that they match source tables
+        """
+        user = get_user_model().objects.get(id=user.id)
+        get_notifications(user)
+        self.assertIsNotNone(cache.get(NOTIFICATIONS_CACHE_KEY % user.id))
+        change()
+        self.assertIsNone(cache.get(NOTIFICATIONS_CACHE_KEY % user.id))
+        user = get_user_model().objects.get(id=user.id)
+        self.assertEqual(get_notifications(user), compute_notifications(user))
+
+    def test_invalidate_on_connection(self):
+        connection = Connection.objects.create(from_user=self.project_owner, to_user=self.developer)
+        self.assertEqual(get_notifications(self.developer)['requests'], 1)
+
+        def accept():
+            connection.accepted = True
+            connection.responded = True
+            connection.save()
+        self.assertInvalidated(self.developer, accept)
+        self.assertEqual(get_notifications(self.developer)['requests'], 0)
+        self.assertInvalidated(self.project_owner, connection.delete)
+
+    def test_invalidate_on_profile(self):
+        self.assertInvalidated(self.developer, lambda: UserProfile.objects.create(user=self.developer, bio='Bio'))
+
+        def change_user():
+            self.developer.first_name = 'Dev'
+            self.developer.save()
+        self.assertInvalidated(self.developer, change_user)
+
+    def test_invalidate_on_message(self):
+        message = Message.objects.create(user=self.project_owner, subject='Subject', body='Body')
+        self.assertInvalidated(self.developer, lambda: Reception.objects.create(message=message, user=self.developer))
+        self.assertEqual(get_notifications(self.developer)['messages'], 1)
+
+        self.assertInvalidated(
+            self.developer, lambda: Reply.objects.create(message=message, user=self.project_owner, body='Reply')
+        )
+        self.assertEqual(get_notifications(self.developer)['messages'], 2)
+
+        def read():
+            message.read_at = message.created_at
+            message.save()
+        self.assertInvalidated(self.project_owner, read)
+        self.assertInvalidated(self.developer, message.delete)
+        self.assertEqual(get_notifications(self.developer)['messages'], 0)
+
+    def test_invalidate_on_broadcast(self):
+        Connection.objects.create(from_user=self.project_owner, to_user=self.developer, accepted=True, responded=True)
+        self.assertInvalidated(
+            self.developer,
+            lambda: Message.objects.create(user=self.project_owner, subject='Subject', body='Body', is_broadcast=True)
+        )
+        self.assertEqual(get_notifications(self.developer)['messages'], 1)
+
+    def test_invalidate_on_task(self):
+        task = Task.objects.create(title='Task 1', skills='Django', fee=10, user=self.project_owner)
+        self.assertEqual(get_notifications(self.project_owner)['tasks'], 1)
+
+        def close():
+            task.closed = True
+            task.save()
+        self.assertInvalidated(self.project_owner, close)
+        self.assertEqual(get_notifications(self.project_owner)['tasks'], 0)
+
+        self.assertInvalidated(
+            self.developer,
+            lambda: Participation.objects.create(task=task, user=self.developer, created_by=self.project_owner)
+        )
+        self.assertEqual(get_notifications(self.developer)['tasks'], 1)
+        self.assertInvalidated(self.developer, lambda: Participation.objects.filter(task=task).delete())
+
+        self.assertInvalidated(
+            self.developer, lambda: save_task_participation(task, [{'user': self.developer}], self.project_owner)
+        )
+        self.assertEqual(get_notifications(self.developer)['tasks'], 1)
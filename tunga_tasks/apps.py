@@ -10,8 +10,11 @@ class TungaTasksConfig(AppConfig):
     def ready(self):
         from actstream import registry
         from tunga_tasks import signals
+        from tunga_tasks.search import get_task_search_document
+        from tunga_utils import search
 
         registry.register(
                 self.get_model('Task'), self.get_model('Application'), self.get_model('Participation'),
                 self.get_model('TaskRequest'),self.get_model('TaskUpdate')
         )
+        search.register(self.get_model('Task'), get_task_search_document)
@@ -0,0 +1,69 @@
+from collections import defaultdict
+
+from django.utils.html import strip_tags
+
+from tunga_tasks.models import Task, format_fee, format_update_schedule, get_viewer_fee
+from tunga_tasks.viewer_context import TaskViewerContext
+
+TASK_CARD_FIELDS = (
+    'id', 'user', 'title', 'description', 'currency', 'fee', 'deadline', 'visibility', 'apply', 'closed', 'paid',
+    'created_at', 'update_interval', 'update_interval_units'
+)
+
+
+def load_task_skills(task_ids):
+    """
+    Returns the skills of tasks as comma separated names keyed by task id
+    """
+    skills = defaultdict(list)
+    through = Task._meta.get_field('skills').rel.through
+    for task_id, name in through.objects.filter(task_id__in=task_ids).values_list('task_id', 'skill__name'):
+        skills[task_id].append(name)
+    return dict([(task_id, ', '.join(sorted(names))) for task_id, names in skills.items()])
+
+
+def _serialize_participation(participation, **extra):
+    if not participation:
+        return None
+    data = {'user': participation.user_id, 'accepted': participation.accepted, 'responded': participation.responded}
+    data.update(extra)
+    return data
+
+
+def build_task_cards(rows, user):
+    """
+    Builds the compact representation of tasks used by task lists from .values() rows,
+    the viewer fields are loaded for the whole page by TaskViewerContext
+    """
+    task_ids = [row['id'] for row in rows]
+    viewer_context = TaskViewerContext(user, task_ids)
+    skills = load_task_skills(task_ids)
+    is_authenticated = bool(user and user.is_authenticated())
+
+    cards = []
+    for row in rows:
+        task_id = row['id']
+        is_owner = is_authenticated and row['user'] == user.id
+        participation = viewer_context.get_participation(task_id)
+        card = dict(row)
+        card.pop('description')
+        card.update({
+            'skills': skills.get(task_id, ''),
+            'display_fee': format_fee(get_viewer_fee(row['fee'], user), row['currency']),
+            'summary': '%s - Fee: %s' % (row['title'], format_fee(row['fee'], row['currency'])),
+            'excerpt': strip_tags(row['description'] or '').strip() or None,
+            'update_schedule_display': format_update_schedule(row['update_interval'], row['update_interval_units']),
+            'can_apply': bool(
+                is_authenticated and not is_owner and not row['closed'] and row['apply'] and
+                not viewer_context.has_applied(task_id) and not participation
+            ),
+            'can_save': bool(is_authenticated and not is_owner and not viewer_context.has_saved(task_id)),
+            'is_participant': viewer_context.is_participant(task_id),
+            'my_participation': _serialize_participation(
+                participation, id=participation and participation.id, assignee=participation and participation.assignee
+            ),
+            'assignee': _serialize_participation(viewer_context.get_assignee(task_id)),
+            'open_applications': viewer_context.get_open_applications(task_id)
+        })
+        cards.append(card)
+    return cards
@@ -1,62 +1,48 @@
 from django.contrib.auth import get_user_model
-from django.db.models import When, Case, IntegerField
-from django.db.models.aggregates import Sum
-from django.db.models.expressions import F
 
 from tunga.settings import EMAIL_SUBJECT_PREFIX, TUNGA_URL, TUNGA_STAFF_UPDATE_EMAIL_RECIPIENTS
 from tunga_auth.filterbackends import my_connections_q_filter
 from tunga_auth.models import USER_TYPE_DEVELOPER
 from tunga_settings.models import VISIBILITY_DEVELOPER, VISIBILITY_MY_TEAM
+from tunga_tasks.skill_index import filter_by_skill_match, get_developer_skill_index
 from tunga_utils.decorators import catch_all_exceptions
 from tunga_utils.emails import send_mail
 
+NEW_TASK_EMAIL_DEVELOPER_LIMIT = 15
+
+
+def get_new_task_developers(instance, limit=NEW_TASK_EMAIL_DEVELOPER_LIMIT):
+    """
+    Ranks developers by the skills they share with the task and then by completed tasks.
+    Matches come from the developer skill index and completed tasks from precomputed UserStats.
+    """
+    queryset = get_user_model().objects.filter(type=USER_TYPE_DEVELOPER)
+    if instance.visibility == VISIBILITY_MY_TEAM:
+        queryset = queryset.filter(
+            my_connections_q_filter(instance.user)
+        )
+
+    developers = []
+    skill_ids = list(instance.skills.values_list('id', flat=True))
+    if skill_ids:
+        developers = list(
+            filter_by_skill_match(
+                queryset, get_developer_skill_index(), skill_ids
+            ).order_by('-matches', '-stats__tasks_completed')[:limit]
+        )
+    if len(developers) < limit:
+        developers.extend(
+            queryset.exclude(
+                id__in=[developer.id for developer in developers]
+            ).order_by('-stats__tasks_completed')[:limit - len(developers)]
+        )
+    return developers
+
 
 @catch_all_exceptions
 def send_new_task_email(instance):
     if instance.visibility in [VISIBILITY_DEVELOPER, VISIBILITY_MY_TEAM]:
-        queryset = get_user_model().objects.filter(type=USER_TYPE_DEVELOPER)
-        if instance.visibility == VISIBILITY_MY_TEAM:
-            queryset = queryset.filter(
-                my_connections_q_filter(instance.user)
-            )
-        ordering = []
-        task_skills = instance.skills.all()
-        if task_skills:
-            when = []
-            for skill in task_skills:
-                new_when = When(
-                        userprofile__skills=skill,
-                        then=1
-                    )
-                when.append(new_when)
-            queryset = queryset.annotate(matches=Sum(
-                Case(
-                    *when,
-                    default=0,
-                    output_field=IntegerField()
-                )
-            ))
-            ordering.append('-matches')
-        ordering.append('-tasks_completed')
-        queryset = queryset.annotate(
-            tasks_completed=Sum(
-                Case(
-                    When(
-                        participation__task__closed=True,
-                        participation__user__id=F('id'),
-                        participation__accepted=True,
-                        then=1
-                    ),
-                    default=0,
-                    output_field=IntegerField()
-                )
-            )
-        )
-        queryset = queryset.order_by(*ordering)
-
-        developers = None
-        if queryset:
-            developers = queryset[:15]
+        developers = get_new_task_developers(instance)
 
         subject = "%s New task created by %s" % (EMAIL_SUBJECT_PREFIX, instance.user.first_name)
         to = TUNGA_STAFF_UPDATE_EMAIL_RECIPIENTS
@@ -66,7 +52,7 @@ def send_new_task_email(instance):
             'task': instance,
             'task_url': '%s/task/%s/' % (TUNGA_URL, instance.id)
         }
-        send_mail(subject, 'tunga/email/email_new_task.txt', to, ctx, bcc=bcc)
+        send_mail(subject, 'tunga/email/email_new_task', to, ctx, bcc=bcc)
 
 
 @catch_all_exceptions
@@ -134,3 +120,31 @@ def send_task_application_not_accepted_email(instance):
             'task_url': '%s/task/%s/' % (TUNGA_URL, instance.id)
         }
         send_mail(subject, 'tunga/email/email_task_application_not_accepted', to, ctx, bcc=bcc)
+
+
+@catch_all_exceptions
+def send_milestone_update_request_email(milestone):
+    subject = "%s Please send us an update on your task" % EMAIL_SUBJECT_PREFIX
+    for participation in milestone.task.participation_set.filter(accepted=True).select_related('user'):
+        to = [participation.user.email]
+        ctx = {
+            'developer': participation.user,
+            'milestone': milestone,
+            'ms_update_url': '%s/task/%s/%s' % (TUNGA_URL, milestone.task_id, milestone.id)
+        }
+        send_mail(subject, 'tunga/email/email_update', to, ctx)
+
+
+@catch_all_exceptions
+def send_task_update_email(instance):
+    subject = "%s New task update" % EMAIL_SUBJECT_PREFIX
+    task = instance.milestone.task
+    to = [task.user.email]
+    ctx = {
+        'owner': task.user,
+        'task': task,
+        'task_update': instance,
+        'ms_update_url': '%s/task/%s/%s' % (TUNGA_URL, task.id, instance.milestone_id)
+    }
+    send_mail(subject, 'tunga/email/email_task_update', to, ctx)
+
@@ -1,13 +1,13 @@
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models.aggregates import Count, Sum
-from django.db.models.expressions import Case, When
-from django.db.models.fields import IntegerField
 from django.db.models.query_utils import Q
 from dry_rest_permissions.generics import DRYPermissionFiltersBase
 
 from tunga_auth.models import USER_TYPE_DEVELOPER, USER_TYPE_PROJECT_OWNER
+from tunga_profiles.connection_graph import connections_of
 from tunga_profiles.models import UserProfile
-from tunga_settings.models import VISIBILITY_DEVELOPER, VISIBILITY_MY_TEAM, VISIBILITY_CUSTOM
+from tunga_settings.models import VISIBILITY_DEVELOPER, VISIBILITY_CUSTOM
+from tunga_tasks.models import Participation, TaskVisibility
+from tunga_tasks.skill_index import filter_by_skill_match, get_task_skill_index
 from tunga_utils.filterbackends import dont_filter_staff_or_superuser
 
 
@@ -15,81 +15,47 @@ class TaskFilterBackend(DRYPermissionFiltersBase):
 
     #@dont_filter_staff_or_superuser
     def filter_list_queryset(self, request, queryset, view):
+        # Visibility is applied first so skill matches are ranked among the tasks the user can see
+        queryset = self.filter_visible_queryset(request, queryset)
+
         label_filter = request.query_params.get('filter', None)
         if label_filter in ['running', 'my-tasks']:
             if label_filter == 'running':
                 queryset = queryset.filter(closed=False)
             queryset = queryset.filter(
                 Q(user=request.user) |
-                (
-                    Q(participation__user=request.user) &
-                    (
-                        Q(participation__accepted=True) | Q(participation__responded=False)
-                    )
+                Q(
+                    id__in=Participation.objects.filter(
+                        (Q(accepted=True) | Q(responded=False)), user=request.user
+                    ).values('task_id')
                 )
             )
         elif label_filter == 'saved':
             queryset = queryset.filter(savedtask__user=request.user)
         elif label_filter == 'skills':
             try:
-                user_skills = request.user.userprofile.skills.all()
-                queryset = queryset.filter(skills__in=user_skills)
-                when = []
-                for skill in user_skills:
-                    new_when = When(
-                            skills=skill,
-                            then=1
-                        )
-                    when.append(new_when)
-                queryset = queryset.annotate(matches=Sum(
-                    Case(
-                        *when,
-                        default=0,
-                        output_field=IntegerField()
-                    )
-                )).order_by('-matches', '-created_at')
+                skill_ids = list(request.user.userprofile.skills.values_list('id', flat=True))
             except (ObjectDoesNotExist, UserProfile.DoesNotExist):
                 return queryset.none()
+            queryset = filter_by_skill_match(
+                queryset, get_task_skill_index(), skill_ids
+            ).order_by('-matches', '-created_at')
         elif label_filter == 'project-owners':
-            queryset = queryset.filter(
-                (
-                    Q(user__connections_initiated__to_user=request.user) &
-                    Q(user__connections_initiated__accepted=True)
-                ) |
-                (
-                    Q(user__connection_requests__from_user=request.user) &
-                    Q(user__connection_requests__accepted=True)
-                )
-            )
+            queryset = queryset.filter(user__in=connections_of(request.user))
+        return queryset
 
+    def filter_visible_queryset(self, request, queryset):
         if request.user.is_staff or request.user.is_superuser:
             return queryset
         if request.user.type == USER_TYPE_PROJECT_OWNER:
-            queryset = queryset.filter(user=request.user)
+            return queryset.filter(user=request.user)
         elif request.user.type == USER_TYPE_DEVELOPER:
+            # Tasks visible through ownership, participation or team membership are kept in TaskVisibility
             return queryset.filter(
-                Q(user=request.user) |
-                Q(participation__user=request.user) |
-                (
-                    Q(visibility=VISIBILITY_DEVELOPER) |
-                    (
-                        Q(visibility=VISIBILITY_MY_TEAM) &
-                        (
-                            (
-                                Q(user__connections_initiated__to_user=request.user) &
-                                Q(user__connections_initiated__accepted=True)
-                            ) |
-                            (
-                                Q(user__connection_requests__from_user=request.user) &
-                                Q(user__connection_requests__accepted=True)
-                            )
-                        )
-                    )
-                )
-            ).distinct()
-        else:
-            return queryset.none()
-        return queryset
+                Q(visibility=VISIBILITY_DEVELOPER) |
+                Q(id__in=TaskVisibility.objects.filter(user=request.user).values('task_id'))
+            )
+        return queryset.none()
 
 
 class ApplicationFilterBackend(DRYPermissionFiltersBase):
@@ -106,11 +72,10 @@ class ParticipationFilterBackend(DRYPermissionFiltersBase):
         return queryset.filter(
             Q(user=request.user) |
             Q(task__user=request.user) |
-            (
-                Q(task_participation__user=request.user) &
-                (
-                    Q(task_participation__accepted=True) | Q(task_participation__responded=False)
-                )
+            Q(
+                task_id__in=Participation.objects.filter(
+                    (Q(accepted=True) | Q(responded=False)), user=request.user
+                ).values('task_id')
             )
         )
 
@@ -122,11 +87,10 @@ class TaskRequestFilterBackend(DRYPermissionFiltersBase):
         return queryset.filter(
             Q(user=request.user) |
             Q(task__user=request.user) |
-            (
-                Q(task_participation__user=request.user) &
-                (
-                    Q(task_participation__accepted=True) | Q(task_participation__responded=False)
-                )
+            Q(
+                task_id__in=Participation.objects.filter(
+                    (Q(accepted=True) | Q(responded=False)), user=request.user
+                ).values('task_id')
             )
         )
 
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tunga_tasks.visibility import check_task_visibility
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-pairs', action='store_true', dest='verbose_pairs', default=False,
+                            help='List the (task, user) pairs that are out of sync')
+
+    def handle(self, *args, **options):
+        """
+        Checks the task visibility index against tasks, participation and connections.
+        """
+        # command to run: python manage.py check_task_visibility
+
+        missing, stale = check_task_visibility()
+        if options['verbose_pairs']:
+            for task_id, user_id in sorted(missing):
+                self.stdout.write("missing: task %s, user %s" % (task_id, user_id))
+            for task_id, user_id in sorted(stale):
+                self.stdout.write("stale: task %s, user %s" % (task_id, user_id))
+        if missing or stale:
+            raise CommandError(
+                "Task visibility index is out of sync: %s missing, %s stale entries. "
+                "Run rebuild_task_visibility to repair it." % (len(missing), len(stale))
+            )
+        self.stdout.write("Task visibility index is consistent")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tunga_tasks.visibility import rebuild_task_visibility
+
+
+class Command(BaseCommand):
+
+    def handle(self, *args, **options):
+        """
+        Rebuilds the task visibility index from tasks, participation and connections.
+        """
+        # command to run: python manage.py rebuild_task_visibility
+
+        added, removed = rebuild_task_visibility()
+        self.stdout.write("%s visibility entries added, %s removed" % (added, removed))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tunga_tasks.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+
+    def handle(self, *args, **options):
+        """
+        Recomputes precomputed task statistics for all users.
+        """
+        # command to run: python manage.py rebuild_user_stats
+
+        total = rebuild_user_stats()
+        self.stdout.write("%s users updated" % total)
@@ -1,27 +1,16 @@
-#!/usr/bin/python
-# -*- coding: utf-8 -*-
-from django.core.management import BaseCommand
-from django.db import transaction
-from tunga_tasks.tasks import send_update_email
-from tunga_tasks.models import Milestone
-import datetime
-from time import sleep
+from django.core.management.base import BaseCommand
 
-class Command(BaseCommand):
-    help = """ Send out Update
-    """
+from tunga_tasks.milestones import dispatch_due_milestones
 
-    def sendall(self):
 
-        try:
-            now = datetime.datetime.now()
-            tosend = Milestone.objects.filter(due_date__gte=now,type__in=[1,3]).exclude(update_sent=True)
-            send_update_email.delay(tosend)
+class Command(BaseCommand):
 
-        except Exception, exc:
-            print exc
+    def handle(self, *args, **options):
+        """
+        Queues update requests for due milestones.
+        The dispatch_due_milestones celery beat task does the same every 15 minutes.
+        """
+        # command to run: python manage.py send_updates
 
-    def handle(self, **options):
-        while (True):
-            self.sendall()
-            sleep(3600)
\ No newline at end of file
+        total = dispatch_due_milestones()
+        self.stdout.write("%s update requests queued" % total)
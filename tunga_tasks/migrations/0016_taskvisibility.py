@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-20 10:12
+from __future__ import unicode_literals
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from tunga_settings.models import VISIBILITY_MY_TEAM
+
+
+def backfill_task_visibility(apps, schema_editor):
+    Task = apps.get_model('tunga_tasks', 'Task')
+    Participation = apps.get_model('tunga_tasks', 'Participation')
+    TaskVisibility = apps.get_model('tunga_tasks', 'TaskVisibility')
+    Connection = apps.get_model('tunga_profiles', 'Connection')
+
+    team_user_ids = defaultdict(set)
+    for from_user_id, to_user_id in Connection.objects.filter(accepted=True).values_list('from_user_id', 'to_user_id'):
+        team_user_ids[from_user_id].add(to_user_id)
+        team_user_ids[to_user_id].add(from_user_id)
+
+    visible = set()
+    for task_id, user_id, visibility in Task.objects.values_list('id', 'user_id', 'visibility').iterator():
+        visible.add((task_id, user_id))
+        if visibility == VISIBILITY_MY_TEAM:
+            visible.update([(task_id, team_user_id) for team_user_id in team_user_ids[user_id]])
+    visible.update(Participation.objects.values_list('task_id', 'user_id').iterator())
+    TaskVisibility.objects.bulk_create(
+        [TaskVisibility(task_id=task_id, user_id=user_id) for task_id, user_id in visible], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tunga_profiles', '0010_auto_20160611_0938'),
+        ('tunga_tasks', '0015_milestone_update_sent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskVisibility',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tunga_tasks.Task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'task visibility',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='taskvisibility',
+            unique_together=set([('user', 'task')]),
+        ),
+        migrations.RunPython(backfill_task_visibility, migrations.RunPython.noop),
+    ]
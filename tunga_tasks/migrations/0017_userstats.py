@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-21 09:47
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.aggregates import Count
+import django.db.models.deletion
+
+
+def backfill_user_stats(apps, schema_editor):
+    TungaUser = apps.get_model('tunga_auth', 'TungaUser')
+    Participation = apps.get_model('tunga_tasks', 'Participation')
+    UserStats = apps.get_model('tunga_tasks', 'UserStats')
+
+    tasks_completed = dict(
+        Participation.objects.filter(
+            task__closed=True, accepted=True
+        ).values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+    )
+    UserStats.objects.bulk_create([
+        UserStats(user_id=user_id, tasks_completed=tasks_completed.get(user_id, 0))
+        for user_id in TungaUser.objects.values_list('id', flat=True).iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tunga_tasks', '0016_taskvisibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tasks_completed', models.PositiveIntegerField(db_index=True, default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'user stats',
+            },
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
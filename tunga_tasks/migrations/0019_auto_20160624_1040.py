@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-24 10:40
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tunga_tasks', '0018_auto_20160623_0912'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='milestone',
+            index_together=set([('update_sent', 'type', 'due_date')]),
+        ),
+    ]
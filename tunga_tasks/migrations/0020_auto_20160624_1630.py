@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-24 16:30
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.aggregates import Count, Avg
+
+
+def backfill_user_stats(apps, schema_editor):
+    TungaUser = apps.get_model('tunga_auth', 'TungaUser')
+    Task = apps.get_model('tunga_tasks', 'Task')
+    Participation = apps.get_model('tunga_tasks', 'Participation')
+    UserStats = apps.get_model('tunga_tasks', 'UserStats')
+
+    tasks_created = dict(
+        Task.objects.values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+    )
+    satisfaction = dict(
+        Participation.objects.filter(
+            task__closed=True, accepted=True
+        ).values('user_id').annotate(score=Avg('task__satisfaction')).values_list('user_id', 'score')
+    )
+    stats_user_ids = set(UserStats.objects.values_list('user_id', flat=True))
+    UserStats.objects.bulk_create([
+        UserStats(user_id=user_id) for user_id in TungaUser.objects.values_list('id', flat=True).iterator()
+        if user_id not in stats_user_ids
+    ], batch_size=500)
+    for user_id in set(tasks_created.keys()) | set(satisfaction.keys()):
+        UserStats.objects.filter(user_id=user_id).update(
+            tasks_created=tasks_created.get(user_id, 0), satisfaction=satisfaction.get(user_id, None)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tunga_tasks', '0019_auto_20160624_1040'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='satisfaction',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='tasks_created',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
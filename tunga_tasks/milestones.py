@@ -0,0 +1,168 @@
+import datetime
+
+from django.db import transaction
+from django.db.models.query_utils import Q
+
+from tunga_tasks.models import Milestone, TaskMilestone, MILESTONE_TYPE_INTERVAL, MILESTONE_TYPE_START, \
+    MILESTONE_TYPE_UPDATE_REQUEST, \
+    UPDATE_SCHEDULE_HOURLY, UPDATE_SCHEDULE_DAILY, UPDATE_SCHEDULE_WEEKLY, UPDATE_SCHEDULE_MONTHLY, \
+    UPDATE_SCHEDULE_QUATERLY, UPDATE_SCHEDULE_ANNUALLY
+from tunga_tasks.tasks import send_milestone_update_request
+
+UPDATE_SCHEDULE_INTERVALS = {
+    UPDATE_SCHEDULE_HOURLY: datetime.timedelta(hours=1),
+    UPDATE_SCHEDULE_DAILY: datetime.timedelta(days=1),
+    UPDATE_SCHEDULE_WEEKLY: datetime.timedelta(weeks=1),
+    UPDATE_SCHEDULE_MONTHLY: datetime.timedelta(days=30),
+    UPDATE_SCHEDULE_QUATERLY: datetime.timedelta(days=90),
+    UPDATE_SCHEDULE_ANNUALLY: datetime.timedelta(days=365)
+}
+
+# Guards against e.g hourly updates on a task with a deadline years away
+MAX_UPDATE_MILESTONES = 500
+
+SCHEDULE_FIELDS = ('deadline', 'update_interval', 'update_interval_units')
+
+# Milestones for which developers are asked for an update when they're due
+UPDATE_REQUEST_MILESTONE_TYPES = (MILESTONE_TYPE_INTERVAL, MILESTONE_TYPE_UPDATE_REQUEST)
+
+DUE_MILESTONES_BATCH_SIZE = 100
+
+MILESTONE_TITLE_DEADLINE = 'Deadline'
+MILESTONE_TITLE_DEVS_SELECTED = 'Dev(s) Selected'
+MILESTONE_TITLE_UPDATE = 'Update'
+
+
+def get_update_schedule(start, deadline, update_interval, update_interval_units, after=None):
+    """
+    Returns the due dates of updates every update_interval units from start until the deadline,
+    only dates later than after are included
+    """
+    step = UPDATE_SCHEDULE_INTERVALS.get(update_interval_units, None)
+    if not (start and deadline and update_interval and step):
+        return []
+    step *= update_interval
+    due_dates = []
+    due_date = start + step
+    if after and due_date <= after:
+        # Skip ahead to the first date after the cut off
+        due_date += step * int((after - due_date).total_seconds() // step.total_seconds() + 1)
+    while due_date < deadline and len(due_dates) < MAX_UPDATE_MILESTONES:
+        due_dates.append(due_date)
+        due_date += step
+    return due_dates
+
+
+def create_milestones(task, milestones):
+    """
+    Bulk creates milestones and links them to the task
+    """
+    if not milestones:
+        return
+    Milestone.objects.bulk_create(milestones)
+    # bulk_create doesn't set primary keys on all backends
+    milestone_ids = Milestone.objects.filter(
+        task=task, type__in=set([milestone.type for milestone in milestones]),
+        due_date__in=[milestone.due_date for milestone in milestones]
+    ).exclude(taskmilestone__task=task).values_list('id', flat=True)
+    TaskMilestone.objects.bulk_create([TaskMilestone(task=task, milestone_id=milestone_id) for milestone_id in milestone_ids])
+
+
+def create_start_milestone(task):
+    create_milestones(task, [Milestone(
+        title='Task Created', type=MILESTONE_TYPE_START, task=task, order=0, description=str(task.created_at),
+        user_id=task.user_id, due_date=task.created_at
+    )])
+
+
+def create_devs_selected_milestone(task):
+    if Milestone.objects.filter(task=task, title=MILESTONE_TITLE_DEVS_SELECTED).exists():
+        return
+    devs = ' '.join(task.participants.values_list('first_name', flat=True))
+    create_milestones(task, [Milestone(
+        title=MILESTONE_TITLE_DEVS_SELECTED, task=task, order=1, description=devs,
+        user_id=task.user_id, due_date=task.created_at
+    )])
+
+
+def update_task_schedule(task, now=None):
+    """
+    Regenerates the deadline and the upcoming update milestones of a task, past milestones are kept
+    """
+    now = now or datetime.datetime.now()
+    with transaction.atomic():
+        Milestone.objects.filter(task=task, title=MILESTONE_TITLE_DEADLINE).delete()
+        Milestone.objects.filter(
+            task=task, type=MILESTONE_TYPE_INTERVAL, due_date__gt=now
+        ).exclude(update_sent=True).delete()
+
+        # Updates already requested are kept
+        kept_due_dates = set(Milestone.objects.filter(
+            task=task, type=MILESTONE_TYPE_INTERVAL, due_date__gt=now
+        ).values_list('due_date', flat=True))
+
+        milestones = []
+        if task.deadline:
+            milestones.append(Milestone(
+                title=MILESTONE_TITLE_DEADLINE, task=task, description=str(task.deadline),
+                user_id=task.user_id, due_date=task.deadline
+            ))
+        for due_date in get_update_schedule(
+                task.created_at, task.deadline, task.update_interval, task.update_interval_units, after=now
+        ):
+            if due_date in kept_due_dates:
+                continue
+            milestones.append(Milestone(
+                title=MILESTONE_TITLE_UPDATE, type=MILESTONE_TYPE_INTERVAL, task=task,
+                description=str(task.deadline), user_id=task.user_id, due_date=due_date
+            ))
+        create_milestones(task, milestones)
+
+
+def claim_due_milestones(batch_size=DUE_MILESTONES_BATCH_SIZE, now=None):
+    """
+    Locks a batch of due milestones whose update hasn't been requested and marks them as sent,
+    returns their ids. Concurrent schedulers wait on the lock and never claim the same milestone.
+    """
+    now = now or datetime.datetime.now()
+    with transaction.atomic():
+        milestone_ids = list(
+            Milestone.objects.select_for_update().filter(
+                Q(update_sent=False) | Q(update_sent__isnull=True),
+                type__in=UPDATE_REQUEST_MILESTONE_TYPES, due_date__lte=now
+            ).order_by('due_date').values_list('id', flat=True)[:batch_size]
+        )
+        if milestone_ids:
+            Milestone.objects.filter(id__in=milestone_ids).update(update_sent=True)
+    return milestone_ids
+
+
+def queue_update_requests(milestone_ids):
+    """
+    Queues one update request job per milestone, milestones whose job couldn't be queued
+    are released so that the next dispatch claims them again
+    """
+    for index, milestone_id in enumerate(milestone_ids):
+        try:
+            send_milestone_update_request.delay(milestone_id)
+        except Exception:
+            Milestone.objects.filter(id__in=milestone_ids[index:]).update(update_sent=False)
+            raise
+
+
+def dispatch_due_milestones(batch_size=DUE_MILESTONES_BATCH_SIZE, now=None):
+    """
+    Claims all due milestones in batches and queues their update request jobs once each claim is committed,
+    returns the number of milestones dispatched
+    """
+    now = now or datetime.datetime.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            milestone_ids = claim_due_milestones(batch_size=batch_size, now=now)
+            if milestone_ids:
+                transaction.on_commit(lambda milestone_ids=milestone_ids: queue_update_requests(milestone_ids))
+        if not milestone_ids:
+            break
+        total += len(milestone_ids)
+    return total
@@ -0,0 +1,169 @@
+import logging
+import re
+import time
+import urllib
+
+import requests
+from django.core.cache import cache
+
+from tunga.settings.base import MOBBR_API_URL, MOBBR_CACHE_TIMEOUT, MOBBR_CACHE_STALE_TIMEOUT, \
+    MOBBR_REQUEST_TIMEOUT, MOBBR_CIRCUIT_BREAKER_THRESHOLD, MOBBR_CIRCUIT_BREAKER_TIMEOUT
+
+PARTICIPATION_CACHE_KEY = 'tunga_mobbr_participation_%s'
+REFRESH_LOCK_CACHE_KEY = 'tunga_mobbr_refresh_%s'
+FAILURES_CACHE_KEY = 'tunga_mobbr_failures'
+CIRCUIT_OPEN_CACHE_KEY = 'tunga_mobbr_circuit_open'
+
+
+class MobbrUnavailable(Exception):
+    pass
+
+
+def _get_url_key(url):
+    return urllib.quote_plus(url)
+
+
+def is_circuit_open():
+    return bool(cache.get(CIRCUIT_OPEN_CACHE_KEY))
+
+
+def record_failure():
+    cache.add(FAILURES_CACHE_KEY, 0, MOBBR_CIRCUIT_BREAKER_TIMEOUT)
+    try:
+        failures = cache.incr(FAILURES_CACHE_KEY)
+    except ValueError:
+        # Expired between add and incr
+        failures = 1
+    if failures >= MOBBR_CIRCUIT_BREAKER_THRESHOLD:
+        cache.set(CIRCUIT_OPEN_CACHE_KEY, True, MOBBR_CIRCUIT_BREAKER_TIMEOUT)
+        cache.delete(FAILURES_CACHE_KEY)
+
+
+def record_success():
+    cache.delete(FAILURES_CACHE_KEY)
+
+
+def fetch_participation_script(url, api_url=MOBBR_API_URL):
+    """
+    Requests the participation script of a url from Mobbr, returns None if the url has no script.
+    Raises MobbrUnavailable when the API can't be reached or the circuit breaker is open.
+    """
+    if is_circuit_open():
+        raise MobbrUnavailable('Circuit open')
+    try:
+        r = requests.get(
+            '%s?url=%s' % (api_url, urllib.quote_plus(url)),
+            headers={'Accept': 'application/json'}, timeout=MOBBR_REQUEST_TIMEOUT
+        )
+    except requests.RequestException as e:
+        record_failure()
+        raise MobbrUnavailable(str(e))
+    if r.status_code >= 500:
+        record_failure()
+        raise MobbrUnavailable('Mobbr responded with %s' % r.status_code)
+    record_success()
+    if r.status_code == 200:
+        try:
+            return r.json()['result']['script']
+        except (ValueError, KeyError, TypeError):
+            return None
+    return None
+
+
+def refresh_participation_script(url, api_url=MOBBR_API_URL):
+    """
+    Fetches and caches the participation script of a url, a failed fetch keeps the cached script
+    """
+    try:
+        try:
+            script = fetch_participation_script(url, api_url=api_url)
+        except MobbrUnavailable:
+            logging.warning('Mobbr participation script for %s not refreshed' % url)
+            return None
+        cache.set(
+            PARTICIPATION_CACHE_KEY % _get_url_key(url),
+            {'script': script, 'fetched_at': time.time()}, MOBBR_CACHE_STALE_TIMEOUT
+        )
+        return script
+    finally:
+        cache.delete(REFRESH_LOCK_CACHE_KEY % _get_url_key(url))
+
+
+def schedule_refresh(url):
+    if not cache.add(REFRESH_LOCK_CACHE_KEY % _get_url_key(url), True, MOBBR_CACHE_TIMEOUT):
+        # A refresh is already pending
+        return
+    # Imported here because tunga_tasks.tasks imports the models
+    from tunga_tasks.tasks import refresh_mobbr_participation
+    try:
+        refresh_mobbr_participation.delay(url)
+    except Exception:
+        logging.exception('Failed to schedule a Mobbr refresh for %s' % url)
+        cache.delete(REFRESH_LOCK_CACHE_KEY % _get_url_key(url))
+
+
+def get_participation_script(url):
+    """
+    Returns the cached participation script of a url without waiting on Mobbr.
+    Missing and stale entries are refreshed in the background, stale scripts are served until then.
+    """
+    entry = cache.get(PARTICIPATION_CACHE_KEY % _get_url_key(url))
+    if entry is None or time.time() - entry['fetched_at'] > MOBBR_CACHE_TIMEOUT:
+        schedule_refresh(url)
+    return entry and entry['script'] or None
+
+
+def merge_participation_script(participation_meta, task_script):
+    """
+    Merges a Mobbr participation script into the default participation,
+    returns True if the script defines participants
+    """
+    has_script = False
+    for meta_key in participation_meta:
+        if meta_key == 'keywords':
+            if isinstance(task_script.get(meta_key, None), list):
+                participation_meta[meta_key].extend(task_script[meta_key])
+        elif meta_key == 'participants':
+            if isinstance(task_script.get(meta_key, None), list):
+                absolute_shares = []
+                relative_shares = []
+                absolute_participants = []
+                relative_participants = []
+
+                for key, participant in enumerate(task_script[meta_key]):
+                    if re.match(r'\d+%$', participant['share']):
+                        share = int(participant['share'].replace("%", ""))
+                        if share > 0:
+                            absolute_shares.append(share)
+                            new_participant = participant
+                            new_participant['share'] = share
+                            absolute_participants.append(new_participant)
+                    else:
+                        share = int(participant['share'])
+                        if share > 0:
+                            relative_shares.append(share)
+                            new_participant = participant
+                            new_participant['share'] = share
+                            relative_participants.append(new_participant)
+
+                additional_participants = []
+                total_absolutes = sum(absolute_shares)
+                total_relatives = sum(relative_shares)
+                if total_absolutes >= 100 or total_relatives == 0:
+                    additional_participants = absolute_participants
+                elif total_absolutes == 0:
+                    additional_participants = relative_participants
+                else:
+                    additional_participants = absolute_participants
+                    for participant in relative_participants:
+                        share = int(round(((participant['share']*(100-total_absolutes))/total_relatives), 0))
+                        if share > 0:
+                            new_participant = participant
+                            new_participant['share'] = share
+                            additional_participants.append(new_participant)
+                if len(additional_participants):
+                    participation_meta[meta_key].extend(additional_participants)
+                    has_script = True
+        elif meta_key in task_script:
+            participation_meta[meta_key] = task_script[meta_key]
+    return has_script
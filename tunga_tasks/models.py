@@ -1,11 +1,6 @@
 # encoding=utf8
 from __future__ import unicode_literals
 
-import re
-import urllib
-
-import requests
-import datetime
 import tagulous.models
 import tagulous
 from django.db import models
@@ -19,7 +14,9 @@ from django.template.defaultfilters import slugify
 from tunga import settings
 from tunga.settings.base import TUNGA_SHARE_PERCENTAGE, TUNGA_SHARE_EMAIL
 from tunga_auth.models import USER_TYPE_DEVELOPER, USER_TYPE_PROJECT_OWNER
-from tunga_profiles.models import Skill, Connection
+from tunga_profiles.connection_graph import are_connected
+from tunga_profiles.models import Skill
+from tunga_tasks.mobbr import get_participation_script, merge_participation_script
 from tunga_settings.models import VISIBILITY_DEVELOPER, VISIBILITY_MY_TEAM, VISIBILITY_CUSTOM, VISIBILITY_CHOICES
 from tunga_comments.models import Comment
 from django.db.models.signals import post_save
@@ -58,6 +55,19 @@ UPDATE_SCHEDULE_CHOICES = (
 )
 
 
+MILESTONE_TYPE_INTERVAL = 1
+MILESTONE_TYPE_UPDATE = 2
+MILESTONE_TYPE_UPDATE_REQUEST = 3
+MILESTONE_TYPE_START = 4
+
+MILESTONE_TYPE_CHOICES = (
+    (MILESTONE_TYPE_INTERVAL, 'interval'),
+    (MILESTONE_TYPE_UPDATE, 'update'),
+    (MILESTONE_TYPE_UPDATE_REQUEST, 'update_request'),
+    (MILESTONE_TYPE_START, 'start')
+)
+
+
 TASK_REQUEST_CLOSE = 1
 TASK_REQUEST_PAY = 2
 
@@ -67,6 +77,32 @@ TASK_REQUEST_CHOICES = (
 )
 
 
+def format_fee(amount, currency):
+    if currency in CURRENCY_SYMBOLS:
+        return '%s%s' % (CURRENCY_SYMBOLS[currency], floatformat(amount, arg=-2))
+    return amount
+
+
+def get_viewer_fee(fee, user):
+    """
+    Fee of a task as shown to a user, developers see it net of Tunga's share
+    """
+    if user and user.is_authenticated() and user.is_developer:
+        return fee*(1 - TUNGA_SHARE_PERCENTAGE*0.01)
+    return fee
+
+
+def format_update_schedule(update_interval, update_interval_units):
+    if update_interval and update_interval_units:
+        if update_interval == 1 and update_interval_units == UPDATE_SCHEDULE_DAILY:
+            return 'Daily'
+        interval_units = str(dict(UPDATE_SCHEDULE_CHOICES).get(update_interval_units, '')).lower()
+        if update_interval == 1:
+            return 'Every %s' % interval_units
+        return 'Every %s %ss' % (update_interval, interval_units)
+    return None
+
+
 class Task(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='tasks_created', on_delete=models.DO_NOTHING)
     title = models.CharField(max_length=200)
@@ -103,8 +139,34 @@ class Task(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        index_together = ('created_at', 'id')
         unique_together = ('user', 'title', 'fee')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Task, cls).from_db(db, field_names, values)
+        instance._loaded_values = instance._get_field_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super(Task, self).save(*args, **kwargs)
+        self._loaded_values = self._get_field_values()
+
+    def _get_field_values(self):
+        # Read from __dict__ so that deferred fields aren't loaded
+        return dict(
+            [(field.attname, self.__dict__[field.attname]) for field in self._meta.concrete_fields if field.attname in self.__dict__]
+        )
+
+    def has_field_changed(self, field_name):
+        """
+        Compares a field with the value it had when the task was loaded or last saved
+        """
+        loaded_values = getattr(self, '_loaded_values', None)
+        if loaded_values is None or field_name not in loaded_values:
+            return True
+        return loaded_values[field_name] != getattr(self, field_name)
+
     @staticmethod
     @allow_staff_or_superuser
     def has_read_permission(request):
@@ -117,11 +179,7 @@ class Task(models.Model):
         if self.visibility == VISIBILITY_DEVELOPER:
             return request.user.type == USER_TYPE_DEVELOPER
         elif self.visibility == VISIBILITY_MY_TEAM:
-            return bool(
-                Connection.objects.exclude(accepted=False).filter(
-                    Q(from_user=self.user, to_user=request.user) | Q(from_user=request.user, to_user=self.user)
-                ).count()
-            )
+            return are_connected(self.user_id, request.user)
         elif self.visibility == VISIBILITY_CUSTOM:
             return self.participation_set.filter((Q(accepted=True) | Q(responded=False)), user=request.user).count()
         return False
@@ -154,9 +212,7 @@ class Task(models.Model):
     def display_fee(self, amount=None):
         if amount is None:
             amount = self.fee
-        if self.currency in CURRENCY_SYMBOLS:
-            return '%s%s' % (CURRENCY_SYMBOLS[self.currency], floatformat(amount, arg=-2))
-        return amount
+        return format_fee(amount, self.currency)
 
     @property
     def summary(self):
@@ -185,59 +241,10 @@ class Task(models.Model):
         if not self.url:
             return participation_meta, False
 
-        mobbr_info_url = '%s?url=%s' % ('https://api.mobbr.com/api_v1/uris/info', urllib.quote_plus(self.url))
-        r = requests.get(mobbr_info_url, **{'headers': {'Accept': 'application/json'}})
+        task_script = get_participation_script(self.url)
         has_script = False
-        if r.status_code == 200:
-            response = r.json()
-            task_script = response['result']['script']
-            for meta_key in participation_meta:
-                if meta_key == 'keywords':
-                    if isinstance(task_script[meta_key], list):
-                        participation_meta[meta_key].extend(task_script[meta_key])
-                elif meta_key == 'participants':
-                    if isinstance(task_script[meta_key], list):
-                        absolute_shares = []
-                        relative_shares = []
-                        absolute_participants = []
-                        relative_participants = []
-
-                        for key, participant in enumerate(task_script[meta_key]):
-                            if re.match(r'\d+%$', participant['share']):
-                                share = int(participant['share'].replace("%", ""))
-                                if share > 0:
-                                    absolute_shares.append(share)
-                                    new_participant = participant
-                                    new_participant['share'] = share
-                                    absolute_participants.append(new_participant)
-                            else:
-                                share = int(participant['share'])
-                                if share > 0:
-                                    relative_shares.append(share)
-                                    new_participant = participant
-                                    new_participant['share'] = share
-                                    relative_participants.append(new_participant)
-
-                        additional_participants = []
-                        total_absolutes = sum(absolute_shares)
-                        total_relatives = sum(relative_shares)
-                        if total_absolutes >= 100 or total_relatives == 0:
-                            additional_participants = absolute_participants
-                        elif total_absolutes == 0:
-                            additional_participants = relative_participants
-                        else:
-                            additional_participants = absolute_participants
-                            for participant in relative_participants:
-                                share = int(round(((participant['share']*(100-total_absolutes))/total_relatives), 0))
-                                if share > 0:
-                                    new_participant = participant
-                                    new_participant['share'] = share
-                                    additional_participants.append(new_participant)
-                        if len(additional_participants):
-                            participation_meta[meta_key].extend(additional_participants)
-                            has_script = True
-                elif meta_key in task_script:
-                    participation_meta[meta_key] = task_script[meta_key]
+        if task_script:
+            has_script = merge_participation_script(participation_meta, task_script)
         return participation_meta, has_script
 
     @property
@@ -267,6 +274,39 @@ class Task(models.Model):
         return str(self.skills)
 
 
+class TaskVisibility(models.Model):
+    """
+    Index of users who can see a task through ownership, participation or team membership.
+    Maintained by tunga_tasks.visibility, developer visible tasks don't need entries.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+
+    def __unicode__(self):
+        return '%s - %s' % (self.user.get_short_name() or self.user.username, self.task.title)
+
+    class Meta:
+        unique_together = ('user', 'task')
+        verbose_name_plural = 'task visibility'
+
+
+class UserStats(models.Model):
+    """
+    Precomputed task statistics of a user, maintained by tunga_tasks.stats
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='stats')
+    tasks_completed = models.PositiveIntegerField(default=0, db_index=True)
+    tasks_created = models.PositiveIntegerField(default=0)
+    satisfaction = models.FloatField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __unicode__(self):
+        return 'Stats - %s' % (self.user.get_short_name() or self.user.username)
+
+    class Meta:
+        verbose_name_plural = 'user stats'
+
+
 class Application(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
@@ -407,7 +447,7 @@ class Milestone(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     due_date = models.DateTimeField(blank=True, null=True)
     state = models.IntegerField(choices=((COMPLETED,"Completed"),(OVERDUE,"Overdue"),( ACTIVE,"active"),(CLOSED,"closed")),default=2,)
-    type = models.IntegerField(choices=((1,"interval"),(2,"update"),( 3,"update_request"),( 4,"start")),default=2,)
+    type = models.IntegerField(choices=MILESTONE_TYPE_CHOICES, default=MILESTONE_TYPE_UPDATE)
     description = models.TextField()
     percentage_done = models.PositiveIntegerField(validators=[MaxValueValidator(100),MinValueValidator(0)],null=True,blank=True)
     order = models.SmallIntegerField(default=0)
@@ -416,6 +456,8 @@ class Milestone(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        index_together = ('update_sent', 'type', 'due_date')
 
     def overdue(self):
         pass
@@ -458,42 +500,8 @@ class TaskMilestone(models.Model):
 
 
 def handle_task_update(sender, instance, created, **kwargs):
-
-    send_owner_email.delay(instance.pk)
-
-def create_initial_milestones(sender, instance, created, **kwargs):
-    if created:
-
-        milestone = Milestone.objects.create(title="Task Created",type=4,task=instance,order=0,description=str(instance.created_at),user=instance.user,due_date=instance.created_at)
-        TaskMilestone.objects.create(milestone=milestone,task=instance)
-
-    if instance.participants.all().exists():
-        devs =  " ".join(instance.participants.values_list("first_name",flat=True))
-        milestone,_ = Milestone.objects.get_or_create(title="Dev(s) Selected",order=1,task=instance,description=devs,user=instance.user,due_date=instance.created_at)
-        TaskMilestone.objects.get_or_create(milestone=milestone,task=instance)
-
-    if instance.deadline:
-        milestone,_ = Milestone.objects.get_or_create(title="Deadline",task=instance,description=str(instance.deadline),user=instance.user,due_date=instance.deadline)
-        TaskMilestone.objects.create(milestone=milestone,task=instance)
-    if instance.update_interval and instance.deadline and instance.participation.all().exists():
-
-        last_milestone = Milestone.objects.get(order=1)
-        seconds = (instance.deadline - last_milestone.created).total_seconds()
-
-        interval = dict(
-            UPDATE_SCHEDULE_HOURLY = 3600,
-            UPDATE_SCHEDULE_DAILY = 86400,
-            UPDATE_SCHEDULE_WEEKLY = 604800,
-            UPDATE_SCHEDULE_MONTHLY = 2592000,
-            UPDATE_SCHEDULE_QUATERLY = 7776000,
-            UPDATE_SCHEDULE_ANNUALLY = 31536000,
-
-        )
-        update_interval = interval(instance.update_interval_units)*instance.update_interval #seconds
-        for r in range(update_interval,update_interval,seconds):
-            milestone,_ = Milestone.objects.get_or_create(title="Update",task=instance,description=str(instance.deadline),user=instance.user,due_date=(last_milestone.created+datetime.timedelta(seconds=r)))
-            TaskMilestone.objects.get_or_create(milestone=milestone,task=instance)
-
+    if created and instance.milestone_id:
+        send_owner_email.delay(instance.pk)
 
 def create_milestones(sender, instance, created, **kwargs):
     if created:
@@ -502,11 +510,9 @@ def create_milestones(sender, instance, created, **kwargs):
 
 
 
-post_save.connect(create_initial_milestones, sender=Task,weak=False)
-
 post_save.connect(create_milestones, sender=TaskUpdate,weak=False)
 
-post_save.connect(handle_task_update, sender=Task,weak=False)
+post_save.connect(handle_task_update, sender=TaskUpdate,weak=False)
 
 
 
@@ -0,0 +1,80 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.dispatch.dispatcher import Signal
+
+from tunga_tasks.models import Participation
+
+# Sent once per bulk write with the created and updated Participation objects
+participation_bulk_saved = Signal(providing_args=['task', 'created', 'updated', 'created_by'])
+
+PARTICIPATION_FIELDS = ('accepted', 'responded', 'assignee', 'role', 'share', 'satisfaction')
+
+
+def _get_user_id(user):
+    return getattr(user, 'id', user)
+
+
+def save_task_participation(task, items, created_by):
+    """
+    Creates or updates the participation of several users in a task in one transaction.
+    items are dicts with a 'user' and any Participation fields, only fields that changed are written.
+    Returns the created and updated Participation objects.
+    """
+    items_by_user = dict()
+    new_assignee = None
+    for item in items:
+        item = dict(item)
+        user_id = _get_user_id(item.pop('user'))
+        item_created_by = item.pop('created_by', None) or created_by
+        fields = dict([(key, value) for key, value in item.items() if key in PARTICIPATION_FIELDS])
+        items_by_user[user_id] = (fields, item_created_by)
+        if fields.get('assignee', False):
+            new_assignee = user_id
+    if not items_by_user:
+        return [], []
+
+    with transaction.atomic():
+        existing = dict(
+            [(participation.user_id, participation) for participation in Participation.objects.select_for_update().filter(
+                task=task, user_id__in=items_by_user.keys()
+            )]
+        )
+
+        new_participation = []
+        changes = defaultdict(list)
+        for user_id, (fields, item_created_by) in items_by_user.items():
+            participation = existing.get(user_id, None)
+            if participation:
+                changed = dict(
+                    [(key, value) for key, value in fields.items() if getattr(participation, key) != value]
+                )
+                if changed:
+                    changes[tuple(sorted(changed.items()))].append(participation.id)
+                    for key, value in changed.items():
+                        setattr(participation, key, value)
+            else:
+                new_participation.append(
+                    Participation(task=task, user_id=user_id, created_by_id=_get_user_id(item_created_by), **fields)
+                )
+
+        if new_participation:
+            Participation.objects.bulk_create(new_participation)
+        for changed, participation_ids in changes.items():
+            Participation.objects.filter(id__in=participation_ids).update(**dict(changed))
+
+        if new_assignee:
+            Participation.objects.exclude(user_id=new_assignee).filter(task=task).update(assignee=False)
+
+        updated_ids = set()
+        for participation_ids in changes.values():
+            updated_ids.update(participation_ids)
+        created = list(Participation.objects.filter(
+            task=task, user_id__in=[participation.user_id for participation in new_participation]
+        ).select_related('user', 'created_by')) if new_participation else []
+        updated = [participation for participation in existing.values() if participation.id in updated_ids]
+
+    participation_bulk_saved.send(
+        sender=Participation, task=task, created=created, updated=updated, created_by=created_by
+    )
+    return created, updated
@@ -0,0 +1,9 @@
+from django.utils.html import strip_tags
+
+
+def get_task_search_document(task):
+    return [
+        (task.title, 5),
+        (' '.join(task.skills.values_list('name', flat=True)), 3),
+        (strip_tags(task.description or ''), 1)
+    ]
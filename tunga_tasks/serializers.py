@@ -1,13 +1,18 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models.query_utils import Q
 from rest_framework import serializers
 
-from tunga.settings.base import TUNGA_SHARE_PERCENTAGE
 from tunga_auth.serializers import SimpleUserSerializer, UserSerializer
-from tunga_tasks.emails import send_new_task_email, send_task_application_not_accepted_email
-from tunga_tasks.models import Task, Application, Participation, TaskRequest, SavedTask,TaskUpdate,Milestone,TaskMilestone,UPDATE_SCHEDULE_DAILY
+from tunga_tasks.emails import send_task_application_not_accepted_email
+from tunga_tasks.models import Task, Application, Participation, TaskRequest, SavedTask,TaskUpdate,Milestone,TaskMilestone,\
+    format_update_schedule, get_viewer_fee
+from tunga_tasks.participation import save_task_participation
+from tunga_tasks.tasks import send_new_task_email
+from tunga_tasks.viewer_context import TaskViewerContext
 from tunga_utils.serializers import ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer, SkillSerializer, \
-    CreateOnlyCurrentUserDefault, SimpleUserSerializer
+    CreateOnlyCurrentUserDefault, SimpleUserSerializer, PreloadedListSerializer
+from tunga_utils.tags import prefetch_tags
 
 
 class SimpleTaskSerializer(ContentTypeAnnotatedSerializer):
@@ -23,6 +28,13 @@ class MilestoneSerializer(serializers.HyperlinkedModelSerializer):
         model = Milestone
 
 
+class SimpleMilestoneSerializer(ContentTypeAnnotatedSerializer):
+
+    class Meta:
+        model = Milestone
+        exclude = ('task', 'tags')
+
+
 class SimpleApplicationSerializer(ContentTypeAnnotatedSerializer):
     user = SimpleUserSerializer()
 
@@ -53,22 +65,25 @@ class TaskDetailsSerializer(ContentTypeAnnotatedSerializer):
     assignee = serializers.SerializerMethodField(required=False, read_only=True)
     applications = SimpleApplicationSerializer(many=True, source='application_set')
     participation = SimpleParticipationSerializer(many=True, source='participation_set')
-    milestones = SimpleParticipationSerializer(many=True, source='milestone_set')
+    milestones = SimpleMilestoneSerializer(many=True, source='milestone_set')
 
     class Meta:
         model = Task
         fields = ('user', 'skills', 'assignee', 'applications', 'participation','milestones')
 
     def get_assignee(self, obj):
-        try:
-            assignee = obj.participation_set.get((Q(accepted=True) | Q(responded=False)), assignee=True)
-            return {
-                'user': SimpleUserSerializer(assignee.user).data,
-                'accepted': assignee.accepted,
-                'responded': assignee.responded
-            }
-        except:
+        # Filters the participation in memory so a prefetched participation_set is used
+        assignees = [
+            participation for participation in obj.participation_set.all()
+            if participation.assignee and (participation.accepted or not participation.responded)
+        ]
+        if len(assignees) != 1:
             return None
+        return {
+            'user': SimpleUserSerializer(assignees[0].user).data,
+            'accepted': assignees[0].accepted,
+            'responded': assignees[0].responded
+        }
 
 
 class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
@@ -84,7 +99,7 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
     summary = serializers.CharField(read_only=True, required=False)
     assignee = serializers.SerializerMethodField(required=False, read_only=True)
     participants = serializers.PrimaryKeyRelatedField(many=True, queryset=get_user_model().objects.all(), required=False, write_only=True)
-    milestones =  MilestoneSerializer(many=True)
+    milestones = MilestoneSerializer(many=True, required=False, read_only=True)
     open_applications = serializers.SerializerMethodField(required=False, read_only=True)
     update_schedule_display = serializers.SerializerMethodField(required=False, read_only=True)
     participation = NestedTaskParticipationSerializer(required=False, many=True, source='participation_set')
@@ -94,6 +109,7 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
         exclude = ('applicants',)
         read_only_fields = ('created_at',)
         details_serializer = TaskDetailsSerializer
+        list_serializer_class = PreloadedListSerializer
 
     def create(self, validated_data):
         skills = None
@@ -112,8 +128,10 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
 
 
         # Triggered here instead of in the post_save signal to allow skills to be attached first
+        # Developer ranking and sending happen in a celery worker once the task is committed
         # TODO: Consider moving this trigger
-        send_new_task_email(instance)
+        task_id = instance.id
+        transaction.on_commit(lambda: send_new_task_email.delay(task_id))
         return instance
 
     def update(self, instance, validated_data):
@@ -144,16 +162,7 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
 
     def save_participation(self, task, participation):
         if participation:
-            new_assignee = None
-            for item in participation:
-                try:
-                    Participation.objects.update_or_create(task=task, user=item['user'], defaults=item)
-                    if 'assignee' in item and item['assignee']:
-                        new_assignee = item['user']
-                except:
-                    pass
-            if new_assignee:
-                Participation.objects.exclude(user=new_assignee).filter(task=task).update(assignee=False)
+            save_task_participation(task, participation, self.__get_current_user() or task.user)
 
     def save_participants(self, task, participants):
         # TODO: Remove and move existing code to using save_participation
@@ -161,30 +170,20 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
             assignee = self.initial_data.get('assignee', None)
             confirmed_participants = self.initial_data.get('confirmed_participants', None)
             rejected_participants = self.initial_data.get('rejected_participants', None)
-            created_by = self.__get_current_user()
-            if not created_by:
-                created_by = task.user
 
-            changed_assignee = False
+            items = []
             for user in participants:
-                try:
-                    defaults = {'created_by': created_by}
-                    if assignee:
-                        defaults['assignee'] = bool(user.id == assignee)
-                    if rejected_participants and user.id in rejected_participants:
-                        defaults['accepted'] = False
-                        defaults['responded'] = True
-                    if confirmed_participants and user.id in confirmed_participants:
-                        defaults['accepted'] = True
-                        defaults['responded'] = True
-
-                    Participation.objects.update_or_create(task=task, user=user, defaults=defaults)
-                    if user.id == assignee:
-                        changed_assignee = True
-                except:
-                    pass
-            if assignee and changed_assignee:
-                Participation.objects.exclude(user__id=assignee).filter(task=task).update(assignee=False)
+                item = {'user': user}
+                if assignee:
+                    item['assignee'] = bool(user.id == assignee)
+                if rejected_participants and user.id in rejected_participants:
+                    item['accepted'] = False
+                    item['responded'] = True
+                if confirmed_participants and user.id in confirmed_participants:
+                    item['accepted'] = True
+                    item['responded'] = True
+                items.append(item)
+            save_task_participation(task, items, self.__get_current_user() or task.user)
 
     def __get_current_user(self):
         request = self.context.get("request", None)
@@ -192,12 +191,23 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
             return getattr(request, "user", None)
         return None
 
+    def preload(self, instances):
+        self._viewer_context = TaskViewerContext(self.__get_current_user(), [task.id for task in instances])
+        prefetch_tags(instances, 'skills')
+        milestones = [
+            milestone for task in instances if 'milestones' in getattr(task, '_prefetched_objects_cache', {})
+            for milestone in task.milestones.all()
+        ]
+        prefetch_tags(milestones, 'tags')
+
+    def __get_viewer_context(self, obj):
+        viewer_context = getattr(self, '_viewer_context', None)
+        if viewer_context and viewer_context.covers(obj):
+            return viewer_context
+        return None
+
     def get_display_fee(self, obj):
-        user = self.__get_current_user()
-        amount = None
-        if user and user.is_developer:
-            amount = obj.fee*(1 - TUNGA_SHARE_PERCENTAGE*0.01)
-        return obj.display_fee(amount=amount)
+        return obj.display_fee(amount=get_viewer_fee(obj.fee, self.__get_current_user()))
 
 
     def get_can_apply(self, obj):
@@ -207,8 +217,11 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
         if request:
             user = getattr(request, "user", None)
             if user:
-                if obj.user == user:
+                if obj.user_id == user.id:
                     return False
+                viewer_context = self.__get_viewer_context(obj)
+                if viewer_context:
+                    return not viewer_context.has_applied(obj) and not viewer_context.get_participation(obj)
                 return obj.applicants.filter(id=user.id).count() == 0 and \
                        obj.participation_set.filter(user=user).count() == 0
         return False
@@ -218,8 +231,11 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
         if request:
             user = getattr(request, "user", None)
             if user:
-                if obj.user == user:
+                if obj.user_id == user.id:
                     return False
+                viewer_context = self.__get_viewer_context(obj)
+                if viewer_context:
+                    return not viewer_context.has_saved(obj)
                 return obj.savedtask_set.filter(user=user).count() == 0
         return False
 
@@ -228,6 +244,9 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
         if request:
             user = getattr(request, "user", None)
             if user:
+                viewer_context = self.__get_viewer_context(obj)
+                if viewer_context:
+                    return viewer_context.is_participant(obj)
                 return obj.participation_set.filter((Q(accepted=True) | Q(responded=False)), user=user).count() == 1
         return False
 
@@ -237,10 +256,16 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
             user = getattr(request, "user", None)
             if user:
                 try:
-                    participation = obj.participation_set.get(user=user)
+                    viewer_context = self.__get_viewer_context(obj)
+                    if viewer_context:
+                        participation = viewer_context.get_participation(obj)
+                        if not participation:
+                            return None
+                    else:
+                        participation = obj.participation_set.get(user=user)
                     return {
                         'id': participation.id,
-                        'user': participation.user.id,
+                        'user': participation.user_id,
                         'assignee': participation.assignee,
                         'accepted': participation.accepted,
                         'responded': participation.responded
@@ -251,9 +276,15 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
 
     def get_assignee(self, obj):
         try:
-            assignee = obj.participation_set.get((Q(accepted=True) | Q(responded=False)), assignee=True)
+            viewer_context = self.__get_viewer_context(obj)
+            if viewer_context:
+                assignee = viewer_context.get_assignee(obj)
+                if not assignee:
+                    return None
+            else:
+                assignee = obj.participation_set.get((Q(accepted=True) | Q(responded=False)), assignee=True)
             return {
-                'user': assignee.user.id,
+                'user': assignee.user_id,
                 'accepted': assignee.accepted,
                 'responded': assignee.responded
             }
@@ -261,17 +292,13 @@ class TaskSerializer(ContentTypeAnnotatedSerializer, DetailAnnotatedSerializer):
             return None
 
     def get_open_applications(self, obj):
+        viewer_context = self.__get_viewer_context(obj)
+        if viewer_context:
+            return viewer_context.get_open_applications(obj)
         return obj.application_set.filter(responded=False).count()
 
     def get_update_schedule_display(self, obj):
-        if obj.update_interval and obj.update_interval_units:
-            if obj.update_interval == 1 and obj.update_interval_units == UPDATE_SCHEDULE_DAILY:
-                return 'Daily'
-            interval_units = str(obj.get_update_interval_units_display()).lower()
-            if obj.update_interval == 1:
-                return 'Every %s' % interval_units
-            return 'Every %s %ss' % (obj.update_interval, interval_units)
-        return None
+        return format_update_schedule(obj.update_interval, obj.update_interval_units)
 
 
 class ApplicationDetailsSerializer(SimpleApplicationSerializer):
@@ -1,12 +1,21 @@
 import datetime
 
 from actstream.signals import action
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch.dispatcher import receiver
 
+from tunga_profiles.models import Connection, UserProfile
+from tunga_profiles.notifications import invalidate_notifications
 from tunga_tasks.emails import send_new_task_application_email, send_new_task_application_applicant_email, \
     send_new_task_invitation_email, send_new_task_application_response_email
-from tunga_tasks.models import Task, Application, Participation, TaskRequest
+from tunga_tasks.milestones import create_start_milestone, update_task_schedule, create_devs_selected_milestone, \
+    SCHEDULE_FIELDS
+from tunga_tasks.models import Task, Application, Participation, TaskRequest, TaskVisibility
+from tunga_tasks.participation import participation_bulk_saved
+from tunga_tasks.skill_index import invalidate_skill_index, TASK_SKILL_INDEX, DEVELOPER_SKILL_INDEX
+from tunga_tasks.stats import update_user_stats
+from tunga_tasks.visibility import update_task_visibility, update_user_task_visibility
+from tunga_utils.search import index_object
 
 
 @receiver(post_save, sender=Task)
@@ -81,3 +90,140 @@ def activity_handler_task_request(sender, instance, created, **kwargs):
             instance.user, verb='created a %s' % instance.get_type_display().lower(),
             action_object=instance, target=instance.task
         )
+
+
+@receiver(post_save, sender=Task)
+def visibility_handler_task(sender, instance, created, **kwargs):
+    if created or instance.has_field_changed('visibility') or instance.has_field_changed('user_id'):
+        update_task_visibility(instance)
+
+
+@receiver(post_save, sender=Participation)
+def visibility_handler_new_participant(sender, instance, created, **kwargs):
+    if created:
+        TaskVisibility.objects.get_or_create(task_id=instance.task_id, user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Participation)
+def visibility_handler_deleted_participant(sender, instance, **kwargs):
+    try:
+        update_task_visibility(instance.task)
+    except Task.DoesNotExist:
+        # Task is being deleted as well
+        pass
+
+
+@receiver(post_save, sender=Connection)
+@receiver(post_delete, sender=Connection)
+def visibility_handler_connection(sender, instance, **kwargs):
+    update_user_task_visibility(instance.from_user_id, instance.to_user_id)
+
+
+@receiver(post_save, sender=Task)
+def stats_handler_task(sender, instance, created, **kwargs):
+    if created:
+        update_user_stats(instance.user_id)
+    elif instance.has_field_changed('closed') or instance.has_field_changed('satisfaction'):
+        update_user_stats(*instance.participation_set.filter(accepted=True).values_list('user_id', flat=True))
+
+
+@receiver(post_delete, sender=Task)
+def stats_handler_deleted_task(sender, instance, **kwargs):
+    update_user_stats(instance.user_id, create=False)
+
+
+@receiver(post_save, sender=Participation)
+def stats_handler_participant(sender, instance, **kwargs):
+    update_user_stats(instance.user_id)
+
+
+@receiver(post_delete, sender=Participation)
+def stats_handler_deleted_participant(sender, instance, **kwargs):
+    update_user_stats(instance.user_id, create=False)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def notification_handler_task(sender, instance, **kwargs):
+    invalidate_notifications(instance.user_id)
+
+
+@receiver(post_save, sender=Participation)
+@receiver(post_delete, sender=Participation)
+def notification_handler_participation(sender, instance, **kwargs):
+    invalidate_notifications(instance.user_id)
+
+
+@receiver(participation_bulk_saved, sender=Participation)
+def activity_handler_bulk_participation(sender, task, created, updated, created_by, **kwargs):
+    if created:
+        action.send(created_by, verb='invited participants', target=task)
+
+    for participation in created:
+        if participation.responded:
+            if participation.accepted:
+                send_new_task_application_response_email(participation, accepted=True)
+        else:
+            send_new_task_invitation_email(participation)
+
+
+@receiver(participation_bulk_saved, sender=Participation)
+def visibility_handler_bulk_participation(sender, task, created, **kwargs):
+    if created:
+        update_task_visibility(task)
+
+
+@receiver(participation_bulk_saved, sender=Participation)
+def stats_handler_bulk_participation(sender, created, updated, **kwargs):
+    user_ids = [participation.user_id for participation in created + updated]
+    update_user_stats(*user_ids)
+    invalidate_notifications(*user_ids)
+
+
+@receiver(post_save, sender=Task)
+def milestone_handler_task(sender, instance, created, **kwargs):
+    if created:
+        create_start_milestone(instance)
+    if created or any([instance.has_field_changed(field) for field in SCHEDULE_FIELDS]):
+        update_task_schedule(instance)
+
+
+@receiver(post_save, sender=Participation)
+def milestone_handler_new_participant(sender, instance, created, **kwargs):
+    if created:
+        create_devs_selected_milestone(instance.task)
+
+
+@receiver(participation_bulk_saved, sender=Participation)
+def milestone_handler_bulk_participation(sender, task, created, **kwargs):
+    if created:
+        create_devs_selected_milestone(task)
+
+
+
+@receiver(m2m_changed, sender=Task._meta.get_field('skills').rel.through)
+def skill_index_handler_task_skills(sender, action, **kwargs):
+    if action in ['post_add', 'post_remove', 'post_clear']:
+        invalidate_skill_index(TASK_SKILL_INDEX)
+
+
+@receiver(post_delete, sender=Task)
+def skill_index_handler_deleted_task(sender, instance, **kwargs):
+    invalidate_skill_index(TASK_SKILL_INDEX)
+
+
+@receiver(m2m_changed, sender=UserProfile._meta.get_field('skills').rel.through)
+def skill_index_handler_profile_skills(sender, action, **kwargs):
+    if action in ['post_add', 'post_remove', 'post_clear']:
+        invalidate_skill_index(DEVELOPER_SKILL_INDEX)
+
+
+@receiver(post_delete, sender=UserProfile)
+def skill_index_handler_deleted_profile(sender, instance, **kwargs):
+    invalidate_skill_index(DEVELOPER_SKILL_INDEX)
+
+
+@receiver(m2m_changed, sender=Task._meta.get_field('skills').rel.through)
+def search_handler_task_skills(sender, instance, action, reverse, **kwargs):
+    if not reverse and action in ['post_add', 'post_remove', 'post_clear']:
+        index_object(instance)
@@ -0,0 +1,146 @@
+import math
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.cache import cache
+
+from tunga.settings.base import TUNGA_SKILL_INDEX_TIMEOUT, TUNGA_SKILL_MATCH_LIMIT, TUNGA_SKILL_MATCH_IDF
+from tunga_utils.ranking import filter_by_rank
+
+TASK_SKILL_INDEX = 'tasks'
+DEVELOPER_SKILL_INDEX = 'developers'
+
+SKILL_INDEX_VERSION_CACHE_KEY = 'tunga_skill_index_version_%s'
+
+# Number of ranked ids checked against a queryset per query
+SKILL_MATCH_BATCH_SIZE = 1000
+
+# Process local indexes keyed by name as (version, loaded_at, index)
+_indexes = dict()
+
+
+class SkillIndex(object):
+    """
+    Inverted index from skill ids to the ids of objects (tasks or users) tagged with them
+    """
+
+    def __init__(self, pairs):
+        postings = defaultdict(set)
+        for object_id, skill_id in pairs:
+            postings[skill_id].add(object_id)
+        self.postings = dict([(skill_id, frozenset(object_ids)) for skill_id, object_ids in postings.items()])
+        self.size = len(set().union(*self.postings.values())) if self.postings else 0
+
+    def get_idf(self, skill_id):
+        """
+        Smoothed inverse document frequency, rare skills weigh more than common ones
+        """
+        frequency = len(self.postings.get(skill_id, ()))
+        if not frequency:
+            return 0
+        return math.log(1 + float(self.size) / frequency)
+
+    def score(self, skill_ids, weighted=False):
+        """
+        Returns the overlap between the skills and each tagged object keyed by object id,
+        as the number of shared skills or the sum of their idf weights
+        """
+        scores = defaultdict(float)
+        for skill_id in set(skill_ids):
+            object_ids = self.postings.get(skill_id, None)
+            if not object_ids:
+                continue
+            weight = self.get_idf(skill_id) if weighted else 1
+            for object_id in object_ids:
+                scores[object_id] += weight
+        return scores
+
+    def rank(self, skill_ids, weighted=False, limit=TUNGA_SKILL_MATCH_LIMIT):
+        """
+        Returns (object_id, score) pairs of the best matches, best first
+        """
+        scores = self.score(skill_ids, weighted=weighted)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        if limit:
+            ranked = ranked[:limit]
+        return ranked
+
+
+def load_task_skill_index():
+    # Models are looked up lazily since tunga_tasks.models indirectly imports the filters that use this module
+    through = apps.get_model('tunga_tasks', 'Task')._meta.get_field('skills').rel.through
+    return SkillIndex(through.objects.values_list('task_id', 'skill_id').iterator())
+
+
+def load_developer_skill_index():
+    through = apps.get_model('tunga_profiles', 'UserProfile')._meta.get_field('skills').rel.through
+    return SkillIndex(through.objects.values_list('userprofile__user_id', 'skill_id').iterator())
+
+
+INDEX_LOADERS = {
+    TASK_SKILL_INDEX: load_task_skill_index,
+    DEVELOPER_SKILL_INDEX: load_developer_skill_index
+}
+
+
+def get_index_version(name):
+    key = SKILL_INDEX_VERSION_CACHE_KEY % name
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def get_skill_index(name):
+    """
+    Returns the named index from process memory, it's reloaded when another process invalidated it
+    or after TUNGA_SKILL_INDEX_TIMEOUT seconds
+    """
+    version = get_index_version(name)
+    loaded = _indexes.get(name, None)
+    if loaded and loaded[0] == version and time.time() - loaded[1] < TUNGA_SKILL_INDEX_TIMEOUT:
+        return loaded[2]
+    index = INDEX_LOADERS[name]()
+    _indexes[name] = (version, time.time(), index)
+    return index
+
+
+def get_task_skill_index():
+    return get_skill_index(TASK_SKILL_INDEX)
+
+
+def get_developer_skill_index():
+    return get_skill_index(DEVELOPER_SKILL_INDEX)
+
+
+def invalidate_skill_index(*names):
+    for name in names:
+        _indexes.pop(name, None)
+        key = SKILL_INDEX_VERSION_CACHE_KEY % name
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), None)
+
+
+def filter_by_skill_match(
+        queryset, index, skill_ids, weighted=TUNGA_SKILL_MATCH_IDF, limit=TUNGA_SKILL_MATCH_LIMIT):
+    """
+    Restricts the queryset to the objects that share skills with skill_ids and annotates their score as `matches`.
+    Matches are checked against the queryset in rank order, so the limit only counts objects the queryset allows
+    and rows it filters out can't push allowed ones out of the result.
+    """
+    ranked = index.rank(skill_ids, weighted=weighted, limit=None)
+    allowed = []
+    for start in range(0, len(ranked), SKILL_MATCH_BATCH_SIZE):
+        batch = ranked[start:start + SKILL_MATCH_BATCH_SIZE]
+        allowed_ids = set(
+            queryset.filter(id__in=[object_id for object_id, score in batch]).values_list('id', flat=True)
+        )
+        allowed.extend([(object_id, score) for object_id, score in batch if object_id in allowed_ids])
+        if limit and len(allowed) >= limit:
+            allowed = allowed[:limit]
+            break
+    return filter_by_rank(queryset, allowed, 'matches')
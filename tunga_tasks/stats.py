@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.db.models.aggregates import Count, Avg
+
+from tunga_tasks.models import Participation, UserStats, Task
+
+
+def update_user_stats(*user_ids, **kwargs):
+    """
+    Recomputes the task statistics of the given users.
+    Pass create=False to only update existing stats e.g while users are being deleted.
+    """
+    create = kwargs.get('create', True)
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    tasks_created = dict(
+        Task.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            count=Count('id')
+        ).values_list('user_id', 'count')
+    )
+    tasks_completed = dict()
+    satisfaction = dict()
+    for user_id, count, score in Participation.objects.filter(
+        user_id__in=user_ids, task__closed=True, accepted=True
+    ).values('user_id').annotate(
+        count=Count('id'), score=Avg('task__satisfaction')
+    ).values_list('user_id', 'count', 'score'):
+        tasks_completed[user_id] = count
+        satisfaction[user_id] = score
+    for user_id in user_ids:
+        stats = {
+            'tasks_created': tasks_created.get(user_id, 0),
+            'tasks_completed': tasks_completed.get(user_id, 0),
+            'satisfaction': satisfaction.get(user_id, None)
+        }
+        if create:
+            UserStats.objects.update_or_create(user_id=user_id, defaults=stats)
+        else:
+            UserStats.objects.filter(user_id=user_id).update(**stats)
+
+
+def rebuild_user_stats(batch_size=500):
+    """
+    Recomputes the task statistics of all users, returns the number of users updated
+    """
+    user_ids = list(get_user_model().objects.values_list('id', flat=True))
+    for offset in range(0, len(user_ids), batch_size):
+        update_user_stats(*user_ids[offset:offset + batch_size])
+    return len(user_ids)
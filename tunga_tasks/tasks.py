@@ -1,43 +1,52 @@
-from celery.task import Task, task
-from celery.registry import tasks
+from celery.task import task
 from celery.task.schedules import crontab
 from celery.decorators import periodic_task
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
 
 
 @task
-def send_owner_email(task):
-    to = task.user.email
+def send_new_task_email(task_id):
+    # Imported here because tunga_tasks.models imports this module
+    from tunga_tasks import emails
+    from tunga_tasks.models import Task
 
-    subject="New Task Update"
-    message = render_to_string(
-                'tunga_tasks/email/email_update.txt',
-                {
-                    'milestone': ms,
+    try:
+        instance = Task.objects.get(id=task_id)
+    except Task.DoesNotExist:
+        return
+    emails.send_new_task_email(instance)
 
-                    'ms_update_url': 'http://tunga.io/task/%s/%s' % (ms.task.id,ms.id)
-                }
-            )
-    EmailMessage(subject, message, to=to).send()
+
+@task
+def refresh_mobbr_participation(url):
+    from tunga_tasks.mobbr import refresh_participation_script
+    refresh_participation_script(url)
+
+
+@periodic_task(run_every=crontab(minute='*/15'))
+def dispatch_due_milestones():
+    from tunga_tasks import milestones
+    milestones.dispatch_due_milestones()
 
 
 @task
-def send_email(ms):
+def send_milestone_update_request(milestone_id):
+    from tunga_tasks import emails
+    from tunga_tasks.models import Milestone
 
-    subject="Please Send Us An Update On Your Task"
-    to = ms.user.email
-    message = render_to_string(
-                'tunga_tasks/email/email_update.txt',
-                {
-                    'milestone': ms,
+    try:
+        milestone = Milestone.objects.select_related('task').get(id=milestone_id)
+    except Milestone.DoesNotExist:
+        return
+    emails.send_milestone_update_request_email(milestone)
 
-                    'ms_update_url': 'http://tunga.io/task/%s/%s' % (ms.task.id,ms.id)
-                }
-            )
-    EmailMessage(subject, message, to=to).send()
 
 @task
-def send_update_email(update_list):
-    for ms in update_list:
-        send_email(ms)
+def send_owner_email(task_update_id):
+    from tunga_tasks import emails
+    from tunga_tasks.models import TaskUpdate
+
+    try:
+        instance = TaskUpdate.objects.select_related('milestone__task__user').get(id=task_update_id)
+    except TaskUpdate.DoesNotExist:
+        return
+    emails.send_task_update_email(instance)
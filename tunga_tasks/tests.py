@@ -1,11 +1,31 @@
 
+import datetime
+import json
+import threading
+
+from actstream.models import Action
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.test.client import RequestFactory
 from rest_framework import status
 from rest_framework.reverse import reverse
+from django.utils.six.moves import BaseHTTPServer
 from rest_framework.test import APITestCase, APIClient
 from tunga_auth.models import USER_TYPE_PROJECT_OWNER, USER_TYPE_DEVELOPER
-from tunga_tasks.models import Task, Participation
+from tunga_profiles.models import Connection, UserProfile
+from tunga_settings.models import VISIBILITY_MY_TEAM
+from tunga_tasks.mobbr import refresh_participation_script, get_participation_script, \
+    fetch_participation_script, merge_participation_script, MobbrUnavailable
+from tunga_tasks import milestones
+from tunga_tasks.milestones import get_update_schedule, claim_due_milestones
+from tunga_tasks.models import Task, Participation, Milestone, Application, TaskMilestone, MILESTONE_TYPE_INTERVAL, UPDATE_SCHEDULE_DAILY, \
+    UPDATE_SCHEDULE_HOURLY, UserStats, TaskRequest, TASK_REQUEST_CLOSE
+from tunga_tasks.skill_index import get_task_skill_index, filter_by_skill_match
+from tunga_tasks.visibility import check_task_visibility
+from tunga_utils.search import search
 
 
 class APITaskTestCase(APITestCase):
@@ -115,3 +135,476 @@ class APITaskTestCase(APITestCase):
         response = self.client.patch(url, data)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+
+    def create_listed_tasks(self, count):
+        """
+        Creates tasks with an assigned participant, an open application and a milestone
+        """
+        offset = Task.objects.count()
+        developers = [
+            get_user_model().objects.create_user(
+                'listed_developer%s' % i, 'listed_developer%s@example.com' % i, 'secret',
+                **{'type': USER_TYPE_DEVELOPER}
+            ) for i in range(offset, offset + count)
+        ]
+        tasks = []
+        for developer in developers:
+            task = Task.objects.create(**{
+                'title': 'Task %s' % developer.id, 'skills': 'Django, React.js', 'fee': 10, 'user': self.project_owner
+            })
+            Participation.objects.create(
+                task=task, user=developer, assignee=True, accepted=True, responded=True, created_by=self.project_owner
+            )
+            Application.objects.create(
+                task=task, user=self.developer, pitch='Pitch', hours_needed=10, hours_available=20,
+                deliver_at=task.created_at
+            )
+            milestone = Milestone.objects.create(
+                task=task, user=self.project_owner, title='Milestone', description='Milestone'
+            )
+            TaskMilestone.objects.create(task=task, milestone=milestone)
+            tasks.append(task)
+        return tasks
+
+    def test_list_tasks_viewer_context(self):
+        """
+        Viewer specific fields on the task list are resolved for the whole page
+        """
+        task = Task.objects.create(**{'title': 'Task 1', 'skills': 'Django', 'fee': 10, 'user': self.project_owner})
+        Task.objects.create(**{'title': 'Task 2', 'skills': 'Django', 'fee': 10, 'user': self.project_owner})
+        Participation.objects.create(
+            task=task, user=self.developer, assignee=True, accepted=True, responded=True, created_by=self.project_owner)
+
+        url = reverse('task-list')
+        self.client.force_authenticate(user=self.developer)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        tasks = dict([(item['id'], item) for item in response.data['results']])
+        self.assertEqual(len(tasks), 2)
+        self.assertTrue(tasks[task.id]['is_participant'])
+        self.assertFalse(tasks[task.id]['can_apply'])
+        self.assertEqual(tasks[task.id]['my_participation']['user'], self.developer.id)
+        self.assertEqual(tasks[task.id]['assignee']['user'], self.developer.id)
+        self.assertEqual(tasks[task.id]['details']['assignee']['user']['id'], self.developer.id)
+        self.assertEqual(tasks[task.id]['open_applications'], 0)
+        for task_id, item in tasks.items():
+            if task_id != task.id:
+                self.assertFalse(item['is_participant'])
+                self.assertTrue(item['can_apply'])
+                self.assertTrue(item['can_save'])
+                self.assertIsNone(item['my_participation'])
+                self.assertIsNone(item['assignee'])
+
+    def test_list_tasks_queries(self):
+        """
+        Listing tasks takes the same number of queries whatever the number of tasks on the page
+        """
+        url = reverse('task-list')
+        self.client.force_authenticate(user=self.admin)
+        self.create_listed_tasks(2)
+
+        # Warm up per process caches e.g content types
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as small_page:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.create_listed_tasks(4)
+        with self.assertNumQueries(len(small_page)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 6)
+        for item in response.data['results']:
+            self.assertEqual(len(item['participation']), 1)
+            self.assertEqual(len(item['milestones']), TaskMilestone.objects.filter(task_id=item['id']).count())
+            self.assertEqual(len(item['details']['applications']), 1)
+            self.assertEqual(item['details']['assignee']['user']['id'], item['participation'][0]['user'])
+
+    def test_bulk_participation(self):
+        """
+        Adding several participants writes them in bulk with a single activity
+        """
+        developers = [
+            get_user_model().objects.create_user(
+                'developer%s' % i, 'developer%s@example.com' % i, 'secret', **{'type': USER_TYPE_DEVELOPER})
+            for i in range(3)
+        ]
+        task = Task.objects.create(**{'title': 'Task 1', 'skills': 'Django', 'fee': 10, 'user': self.project_owner})
+
+        url = reverse('task-detail', args=[task.id])
+        self.client.force_authenticate(user=self.project_owner)
+        response = self.client.patch(url, {
+            'participants': [developer.id for developer in developers], 'assignee': developers[0].id
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['participation']), 3)
+        self.assertEqual(Participation.objects.filter(task=task, assignee=True).count(), 1)
+        self.assertEqual(Action.objects.filter(verb='invited participants').count(), 1)
+        self.assertEqual(check_task_visibility(), (set(), set()))
+
+    def test_list_participation_once(self):
+        """
+        Participations and task requests of tasks with several participants are listed once to each participant
+        """
+        other_developer = get_user_model().objects.create_user(
+            'other_developer', 'other_developer@example.com', 'secret', **{'type': USER_TYPE_DEVELOPER})
+        task = Task.objects.create(**{'title': 'Task 1', 'skills': 'Django', 'fee': 10, 'user': self.project_owner})
+        for developer in [self.developer, other_developer]:
+            Participation.objects.create(
+                task=task, user=developer, accepted=True, responded=True, created_by=self.project_owner
+            )
+            TaskRequest.objects.create(task=task, user=developer, type=TASK_REQUEST_CLOSE)
+
+        self.client.force_authenticate(user=self.developer)
+        for url in [reverse('participation-list'), reverse('taskrequest-list')]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids = [item['id'] for item in response.data['results']]
+            self.assertEqual(len(ids), 2)
+            self.assertEqual(len(set(ids)), 2)
+
+    def test_task_update_schedule(self):
+        """
+        Update milestones are generated up to the deadline and regenerated when the schedule changes
+        """
+        deadline = datetime.datetime.now() + datetime.timedelta(days=10, hours=1)
+        task = Task.objects.create(**{
+            'title': 'Task 1', 'skills': 'Django', 'fee': 10, 'user': self.project_owner,
+            'deadline': deadline, 'update_interval': 1, 'update_interval_units': UPDATE_SCHEDULE_DAILY
+        })
+        updates = Milestone.objects.filter(task=task, type=MILESTONE_TYPE_INTERVAL)
+        self.assertEqual(updates.count(), 10)
+        self.assertEqual(task.milestones.count(), 12)
+
+        task.update_interval = 2
+        task.save()
+        self.assertEqual(updates.count(), 5)
+
+        task.title = 'Task 1 Edit'
+        task.save()
+        self.assertEqual(updates.count(), 5)
+
+        self.assertEqual(get_update_schedule(
+            datetime.datetime(2016, 1, 1), datetime.datetime(2016, 1, 1, 3), 1, UPDATE_SCHEDULE_HOURLY
+        ), [datetime.datetime(2016, 1, 1, 1), datetime.datetime(2016, 1, 1, 2)])
+
+    def test_claim_due_milestones(self):
+        """
+        Due milestones are claimed once
+        """
+        task = Task.objects.create(**{'title': 'Task 1', 'skills': 'Django', 'fee': 10, 'user': self.project_owner})
+        now = datetime.datetime.now()
+        due = Milestone.objects.create(
+            title='Update', type=MILESTONE_TYPE_INTERVAL, task=task, user=self.project_owner,
+            due_date=now - datetime.timedelta(hours=1)
+        )
+        Milestone.objects.create(
+            title='Update', type=MILESTONE_TYPE_INTERVAL, task=task, user=self.project_owner,
+            due_date=now + datetime.timedelta(hours=1)
+        )
+
+        self.assertEqual(claim_due_milestones(now=now), [due.id])
+        self.assertEqual(claim_due_milestones(now=now), [])
+        self.assertTrue(Milestone.objects.get(id=due.id).update_sent)
+
+    def test_queue_update_requests(self):
+        """
+        Milestones whose update request couldn't be queued are claimed again by the next dispatch
+        """
+        task = Task.objects.create(**{'title': 'Task 1', 'skills': 'Django', 'fee': 10, 'user': self.project_owner})
+        now = datetime.datetime.now()
+        for i in range(3):
+            Milestone.objects.create(
+                title='Update', type=MILESTONE_TYPE_INTERVAL, task=task, user=self.project_owner,
+                due_date=now - datetime.timedelta(hours=i + 1)
+            )
+        milestone_ids = claim_due_milestones(now=now)
+        self.assertEqual(len(milestone_ids), 3)
+
+        queued = []
+
+        class UnavailableBroker(object):
+            def delay(self, milestone_id):
+                if queued:
+                    raise IOError('Broker unavailable')
+                queued.append(milestone_id)
+
+        send_milestone_update_request = milestones.send_milestone_update_request
+        milestones.send_milestone_update_request = UnavailableBroker()
+        try:
+            self.assertRaises(IOError, milestones.queue_update_requests, milestone_ids)
+        finally:
+            milestones.send_milestone_update_request = send_milestone_update_request
+
+        self.assertEqual(queued, milestone_ids[:1])
+        self.assertEqual(sorted(claim_due_milestones(now=now)), sorted(milestone_ids[1:]))
+
+    def test_list_task_cards(self):
+        """
+        Task cards carry the list fields without nested serializers
+        """
+        task = Task.objects.create(**{'title': 'Task 1', 'skills': 'Django, React.js', 'fee': 10, 'user': self.project_owner})
+        Participation.objects.create(task=task, user=self.developer, created_by=self.project_owner, assignee=True)
+
+        url = reverse('task-list')
+        self.client.force_authenticate(user=self.developer)
+        response = self.client.get(url, {'view': 'card'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        card = response.data['results'][0]
+        self.assertEqual(card['id'], task.id)
+        self.assertEqual(card['skills'], 'Django, React.js')
+        self.assertNotIn('details', card)
+        self.assertTrue(card['is_participant'])
+        self.assertFalse(card['can_apply'])
+        self.assertEqual(card['assignee']['user'], self.developer.id)
+
+        # Developers see the fee net of Tunga's share, like on the full task
+        response = self.client.get(reverse('task-detail', args=[task.id]))
+        self.assertEqual(card['display_fee'], response.data['display_fee'])
+        self.assertNotEqual(card['display_fee'], task.display_fee())
+
+        self.client.force_authenticate(user=self.project_owner)
+        response = self.client.get(url, {'view': 'card'})
+        self.assertEqual(response.data['results'][0]['display_fee'], task.display_fee())
+        self.client.force_authenticate(user=self.developer)
+
+        response = self.client.get(url, {'view': 'card', 'pagination': 'cursor'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_list_tasks_cursor_pagination(self):
+        """
+        Clients can page through tasks with a cursor instead of page numbers
+        """
+        for i in range(20):
+            Task.objects.create(**{'title': 'Task %s' % i, 'skills': 'Django', 'fee': 10, 'user': self.project_owner})
+
+        url = reverse('task-list')
+        self.client.force_authenticate(user=self.developer)
+        response = self.client.get(url, {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 15)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_list_team_tasks(self):
+        """
+        Developers only see team tasks of project owners they're connected to
+        """
+        task = Task.objects.create(**{
+            'title': 'Task 1', 'skills': 'Django', 'fee': 10, 'user': self.project_owner, 'visibility': VISIBILITY_MY_TEAM
+        })
+
+        url = reverse('task-list')
+        self.client.force_authenticate(user=self.developer)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+
+        connection = Connection.objects.create(from_user=self.project_owner, to_user=self.developer, accepted=True)
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['id'], task.id)
+
+        connection.delete()
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(check_task_visibility(), (set(), set()))
+
+    def test_list_tasks_matching_skills(self):
+        """
+        Tasks are ranked by the number of skills they share with the developer
+        """
+        UserProfile.objects.create(user=self.developer, skills='Django, React.js')
+        best_match = Task.objects.create(**{
+            'title': 'Task 1', 'skills': 'Django, React.js', 'fee': 10, 'user': self.project_owner
+        })
+        match = Task.objects.create(**{'title': 'Task 2', 'skills': 'Django, PHP', 'fee': 10, 'user': self.project_owner})
+        Task.objects.create(**{'title': 'Task 3', 'skills': 'PHP', 'fee': 10, 'user': self.project_owner})
+
+        url = reverse('task-list')
+        self.client.force_authenticate(user=self.developer)
+        response = self.client.get(url, {'filter': 'skills'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], [best_match.id, match.id])
+
+        match.skills = 'Django, React.js, PHP'
+        match.save()
+        index = get_task_skill_index()
+        self.assertEqual(set(index.score(index.postings.keys()).values()), {1, 2, 3})
+
+    def test_match_limit_counts_allowed_tasks(self):
+        """
+        Tasks the queryset excludes don't use up the match limit, even when they rank higher
+        """
+        UserProfile.objects.create(user=self.developer, skills='Django, React.js')
+        hidden = Task.objects.create(**{
+            'title': 'Task 1', 'skills': 'Django, React.js', 'fee': 10, 'user': self.project_owner,
+            'visibility': VISIBILITY_MY_TEAM
+        })
+        closed = Task.objects.create(**{
+            'title': 'Task 2', 'skills': 'Django, React.js', 'fee': 10, 'user': self.project_owner, 'closed': True
+        })
+        match = Task.objects.create(**{'title': 'Task 3', 'skills': 'Django', 'fee': 10, 'user': self.project_owner})
+        skill_ids = list(self.developer.userprofile.skills.values_list('id', flat=True))
+
+        queryset = Task.objects.exclude(id__in=[hidden.id, closed.id])
+        ranked = filter_by_skill_match(queryset, get_task_skill_index(), skill_ids, limit=1)
+        self.assertEqual(list(ranked.values_list('id', flat=True)), [match.id])
+
+        url = reverse('task-list')
+        self.client.force_authenticate(user=self.developer)
+        response = self.client.get(url, {'filter': 'skills'})
+        self.assertEqual([item['id'] for item in response.data['results']], [closed.id, match.id])
+
+        profile = UserProfile.objects.get(user=self.developer)
+        profile.skills = 'Rust'
+        profile.save()
+        response = self.client.get(url, {'filter': 'skills'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+    def test_search_tasks(self):
+        """
+        Searches go through the search index and rank title matches above description matches
+        """
+        description_match = Task.objects.create(**{
+            'title': 'Task 1', 'description': '<p>Build an API</p>', 'skills': 'Django', 'fee': 10,
+            'user': self.project_owner
+        })
+        title_match = Task.objects.create(**{
+            'title': 'API for task 2', 'skills': 'React.js', 'fee': 10, 'user': self.project_owner
+        })
+
+        url = reverse('task-list')
+        self.client.force_authenticate(user=self.project_owner)
+        response = self.client.get(url, {'search': 'api'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['results']], [title_match.id, description_match.id])
+
+        response = self.client.get(url, {'search': 'djan api'})
+        self.assertEqual([item['id'] for item in response.data['results']], [description_match.id])
+
+        description_match.delete()
+        response = self.client.get(url, {'search': 'api'})
+        self.assertEqual([item['id'] for item in response.data['results']], [title_match.id])
+
+    def test_search_within_queryset(self):
+        """
+        Search results are limited among the tasks the queryset allows and short terms only match whole tokens
+        """
+        hidden = Task.objects.create(**{
+            'title': 'API API', 'skills': 'Django', 'fee': 10, 'user': self.project_owner,
+            'visibility': VISIBILITY_MY_TEAM
+        })
+        match = Task.objects.create(**{'title': 'API', 'skills': 'Go', 'fee': 10, 'user': self.project_owner})
+
+        queryset = Task.objects.exclude(id=hidden.id)
+        self.assertEqual(search(Task, 'api', limit=1), [(hidden.id, 10)])
+        self.assertEqual(search(Task, 'api', limit=1, object_ids=queryset.values('id')), [(match.id, 5)])
+        self.assertEqual(search(Task, 'go'), [(match.id, 3)])
+        self.assertEqual(search(Task, 'dj'), [])
+
+        url = reverse('task-list')
+        self.client.force_authenticate(user=self.developer)
+        response = self.client.get(url, {'search': 'api'})
+        self.assertEqual([item['id'] for item in response.data['results']], [match.id])
+
+        response = self.client.get(url, {'search': 'nothing'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+    def test_user_stats(self):
+        """
+        Task and participation changes keep the stats UserSerializer reads from up to date
+        """
+        task = Task.objects.create(**{'title': 'Task 1', 'skills': 'Django', 'fee': 10, 'user': self.project_owner})
+        Participation.objects.create(task=task, user=self.developer, accepted=True, responded=True, created_by=self.project_owner)
+        Connection.objects.create(from_user=self.developer, to_user=self.project_owner)
+        self.assertEqual(UserStats.objects.get(user=self.project_owner).tasks_created, 1)
+
+        task.closed = True
+        task.satisfaction = 8
+        task.save()
+        stats = UserStats.objects.get(user=self.developer)
+        self.assertEqual(stats.tasks_completed, 1)
+        self.assertEqual(stats.satisfaction, 8)
+
+        url = reverse('tungauser-list')
+        self.client.force_authenticate(user=self.project_owner)
+        response = self.client.get(url, {'filter': 'developers'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = response.data['results'][0]
+        self.assertEqual(item['tasks_completed'], 1)
+        self.assertEqual(item['satisfaction'], '80%')
+        self.assertFalse(item['can_connect'])
+        self.assertIsNotNone(item['request'])
+
+
+class MobbrStubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if 'failing' in self.path:
+            self.send_response(500)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps({'result': {'script': {
+            'keywords': ['mobbr'], 'participants': [{'id': 'mailto:dev@example.com', 'role': 'developer', 'share': '50%'}]
+        }}}).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+class MobbrParticipationTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), MobbrStubHandler)
+        self.api_url = 'http://127.0.0.1:%s/info' % self.server.server_port
+        threading.Thread(target=self.server.serve_forever).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        cache.clear()
+
+    def test_cached_participation_script(self):
+        """
+        Refreshed scripts are served from the cache
+        """
+        url = 'https://example.com/task'
+        script = refresh_participation_script(url, api_url=self.api_url)
+        self.assertEqual(script['keywords'], ['mobbr'])
+        self.assertEqual(get_participation_script(url), script)
+
+        participation_meta = {'keywords': ['tunga'], 'participants': []}
+        self.assertTrue(merge_participation_script(participation_meta, script))
+        self.assertEqual(participation_meta['keywords'], ['tunga', 'mobbr'])
+        self.assertEqual(participation_meta['participants'][0]['share'], 50)
+
+    def test_circuit_breaker(self):
+        """
+        Repeated failures suspend requests to the API and keep cached scripts
+        """
+        url = 'https://example.com/task'
+        refresh_participation_script(url, api_url=self.api_url)
+
+        failing_url = '%s/failing' % self.api_url
+        for i in range(5):
+            self.assertIsNone(refresh_participation_script(url, api_url=failing_url))
+        self.assertIsNotNone(get_participation_script(url))
+
+        with self.assertRaises(MobbrUnavailable):
+            fetch_participation_script(url, api_url=self.api_url)
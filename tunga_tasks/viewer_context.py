@@ -0,0 +1,74 @@
+from django.db.models.aggregates import Count
+from django.db.models.query_utils import Q
+
+from tunga_tasks.models import Application, Participation, SavedTask
+
+
+def _get_task_id(task):
+    return getattr(task, 'id', task)
+
+
+class TaskViewerContext(object):
+    """
+    Loads the current user's relation to a page of tasks in a fixed number of queries
+    so that TaskSerializer doesn't have to query for each row.
+    Methods accept tasks or task ids.
+    """
+
+    def __init__(self, user, task_ids):
+        self.task_ids = set(task_ids)
+        self.applied = set()
+        self.saved = set()
+        self.participation = dict()
+        self.assignees = dict()
+        self.open_applications = dict()
+        if self.task_ids:
+            self.load(user)
+
+    def load(self, user):
+        if user and user.is_authenticated():
+            self.applied = set(
+                Application.objects.filter(user=user, task__in=self.task_ids).values_list('task_id', flat=True)
+            )
+            self.saved = set(
+                SavedTask.objects.filter(user=user, task__in=self.task_ids).values_list('task_id', flat=True)
+            )
+            for participation in Participation.objects.filter(user=user, task__in=self.task_ids):
+                self.participation[participation.task_id] = participation
+
+        for assignee in Participation.objects.filter(
+                (Q(accepted=True) | Q(responded=False)), task__in=self.task_ids, assignee=True
+        ):
+            if assignee.task_id in self.assignees:
+                # Ambiguous assignee, same as a failed get() on the task's participation
+                self.assignees[assignee.task_id] = None
+            else:
+                self.assignees[assignee.task_id] = assignee
+
+        self.open_applications = dict(
+            Application.objects.filter(
+                task__in=self.task_ids, responded=False
+            ).values('task').annotate(count=Count('id')).values_list('task', 'count')
+        )
+
+    def covers(self, task):
+        return _get_task_id(task) in self.task_ids
+
+    def has_applied(self, task):
+        return _get_task_id(task) in self.applied
+
+    def has_saved(self, task):
+        return _get_task_id(task) in self.saved
+
+    def get_participation(self, task):
+        return self.participation.get(_get_task_id(task), None)
+
+    def is_participant(self, task):
+        participation = self.get_participation(task)
+        return bool(participation and (participation.accepted or not participation.responded))
+
+    def get_assignee(self, task):
+        return self.assignees.get(_get_task_id(task), None)
+
+    def get_open_applications(self, task):
+        return self.open_applications.get(_get_task_id(task), 0)
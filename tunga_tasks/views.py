@@ -14,13 +14,14 @@ from rest_framework.exceptions import APIException
 from rest_framework import status
 from django.http import Http404
 
+from tunga_tasks.cards import TASK_CARD_FIELDS, build_task_cards
 from tunga_tasks.filterbackends import TaskFilterBackend, ApplicationFilterBackend, ParticipationFilterBackend, \
     TaskRequestFilterBackend, SavedTaskFilterBackend
 from tunga_tasks.filters import TaskFilter, ApplicationFilter, ParticipationFilter, TaskRequestFilter, SavedTaskFilter
 from tunga_tasks.models import Task, Application, Participation, TaskRequest, SavedTask,Milestone,TaskUpdate,TaskMilestone
 from tunga_tasks.serializers import TaskSerializer, ApplicationSerializer, ParticipationSerializer, \
     TaskRequestSerializer, SavedTaskSerializer,MilestoneSerializer,TaskMilestoneSerializer,TaskUpdateSerializer
-from tunga_utils.filterbackends import DEFAULT_FILTER_BACKENDS
+from tunga_utils.filterbackends import DEFAULT_FILTER_BACKENDS, with_search_filter_last
 from tunga_utils.models import Upload
 
 
@@ -28,12 +29,27 @@ class TaskViewSet(viewsets.ModelViewSet):
     """
     Task Resource
     """
-    queryset = Task.objects.all()
+    # Skill and milestone tags are loaded by TaskSerializer.preload
+    queryset = Task.objects.select_related('user__userprofile').prefetch_related(
+        'participation_set__user__userprofile', 'application_set__user__userprofile', 'milestone_set',
+        'milestones__task__user__userprofile'
+    )
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated, DRYPermissions]
     filter_class = TaskFilter
-    filter_backends = DEFAULT_FILTER_BACKENDS + (TaskFilterBackend,)
+    filter_backends = with_search_filter_last(TaskFilterBackend)
     search_fields = ('title', 'description', 'skills__name')
+    cursor_ordering = ('-created_at', '-id')
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('view', None) == 'card':
+            # Compact projection for task lists, skips nested serializers
+            queryset = self.filter_queryset(self.get_queryset()).values(*TASK_CARD_FIELDS)
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(build_task_cards(list(page), request.user))
+            return Response(build_task_cards(list(queryset), request.user))
+        return super(TaskViewSet, self).list(request, *args, **kwargs)
 
     @detail_route(
         methods=['get'], url_path='meta',
@@ -57,6 +73,8 @@ class TaskViewSet(viewsets.ModelViewSet):
 
     def perform_update(self, serializer):
         self.save_uploads(serializer)
+        # Participation may have changed, don't serialize the response from the prefetched relations
+        serializer.instance._prefetched_objects_cache = {}
 
     def save_uploads(self, serializer):
         task = serializer.save()
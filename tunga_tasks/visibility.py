@@ -0,0 +1,95 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from tunga_profiles.connection_graph import load_connections
+from tunga_profiles.models import Connection
+from tunga_settings.models import VISIBILITY_MY_TEAM
+from tunga_tasks.models import Task, Participation, TaskVisibility
+
+
+def get_team_user_ids(user_id):
+    # Read from the database since the connection graph cache may not be invalidated yet
+    return load_connections(user_id)
+
+
+def get_task_visible_user_ids(task, team_user_ids=None):
+    user_ids = set([task.user_id])
+    user_ids.update(Participation.objects.filter(task=task).values_list('user_id', flat=True))
+    if task.visibility == VISIBILITY_MY_TEAM:
+        if team_user_ids is None:
+            team_user_ids = get_team_user_ids(task.user_id)
+        user_ids.update(team_user_ids)
+    return user_ids
+
+
+def update_task_visibility(task, team_user_ids=None):
+    """
+    Brings the visibility index of a task in line with its owner, participants and visibility
+    """
+    user_ids = get_task_visible_user_ids(task, team_user_ids=team_user_ids)
+    with transaction.atomic():
+        indexed_user_ids = set(TaskVisibility.objects.filter(task=task).values_list('user_id', flat=True))
+        stale_user_ids = indexed_user_ids - user_ids
+        if stale_user_ids:
+            TaskVisibility.objects.filter(task=task, user_id__in=stale_user_ids).delete()
+        new_user_ids = user_ids - indexed_user_ids
+        if new_user_ids:
+            TaskVisibility.objects.bulk_create(
+                [TaskVisibility(task_id=task.id, user_id=user_id) for user_id in new_user_ids]
+            )
+
+
+def update_user_task_visibility(*user_ids):
+    """
+    Re-indexes team visible tasks owned by users whose connections changed
+    """
+    team_user_ids = dict()
+    for task in Task.objects.filter(user_id__in=user_ids, visibility=VISIBILITY_MY_TEAM):
+        if task.user_id not in team_user_ids:
+            team_user_ids[task.user_id] = get_team_user_ids(task.user_id)
+        update_task_visibility(task, team_user_ids=team_user_ids[task.user_id])
+
+
+def get_expected_task_visibility():
+    """
+    Computes the full visibility index from source tables as a set of (task_id, user_id) pairs
+    """
+    team_user_ids = defaultdict(set)
+    for from_user_id, to_user_id in Connection.objects.filter(accepted=True).values_list('from_user_id', 'to_user_id'):
+        team_user_ids[from_user_id].add(to_user_id)
+        team_user_ids[to_user_id].add(from_user_id)
+
+    expected = set()
+    for task_id, user_id, visibility in Task.objects.values_list('id', 'user_id', 'visibility').iterator():
+        expected.add((task_id, user_id))
+        if visibility == VISIBILITY_MY_TEAM:
+            expected.update([(task_id, team_user_id) for team_user_id in team_user_ids[user_id]])
+    expected.update(Participation.objects.values_list('task_id', 'user_id').iterator())
+    return expected
+
+
+def check_task_visibility():
+    """
+    Returns the (task_id, user_id) pairs missing from the index and the stale pairs in it
+    """
+    expected = get_expected_task_visibility()
+    indexed = set(TaskVisibility.objects.values_list('task_id', 'user_id').iterator())
+    return expected - indexed, indexed - expected
+
+
+def rebuild_task_visibility():
+    """
+    Repairs the whole visibility index, returns the number of added and removed entries
+    """
+    missing, stale = check_task_visibility()
+    with transaction.atomic():
+        stale_by_task = defaultdict(list)
+        for task_id, user_id in stale:
+            stale_by_task[task_id].append(user_id)
+        for task_id, user_ids in stale_by_task.items():
+            TaskVisibility.objects.filter(task_id=task_id, user_id__in=user_ids).delete()
+        TaskVisibility.objects.bulk_create(
+            [TaskVisibility(task_id=task_id, user_id=user_id) for task_id, user_id in missing], batch_size=500
+        )
+    return len(missing), len(stale)
@@ -1,5 +1,7 @@
 from django.contrib import admin
 
+from tunga_utils.models import EmailOutbox
+
 
 class AdminAutoCreatedBy(admin.ModelAdmin):
     exclude = ('created_by',)
@@ -7,3 +9,10 @@ class AdminAutoCreatedBy(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         obj.created_by = request.user
         obj.save()
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'template', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('status', 'template')
+    readonly_fields = ('created_at', 'sent_at')
@@ -1,3 +1,4 @@
+import logging
 from functools import wraps
 
 
@@ -11,6 +12,6 @@ def catch_all_exceptions(func):
         try:
             func(*args, **kwargs)
         except:
-            pass
+            logging.exception('%s failed' % func.__name__)
 
     return func_wrapper
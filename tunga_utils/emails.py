@@ -5,6 +5,7 @@ from django.template.loader import render_to_string
 from tunga.settings import DEFAULT_FROM_EMAIL
 from tunga.settings.base import EMAIL_SUBJECT_PREFIX, CONTACT_REQUEST_EMAIL_RECIPIENT
 from tunga_utils.decorators import catch_all_exceptions
+from tunga_utils.outbox import enqueue_email
 
 
 def render_mail(subject, template_prefix, to_emails, context, bcc=None, cc=None, **kwargs):
@@ -31,8 +32,11 @@ def render_mail(subject, template_prefix, to_emails, context, bcc=None, cc=None,
 
 
 def send_mail(subject, template_prefix, to_emails, context, bcc=None, cc=None, **kwargs):
+    """
+    Renders the email and queues it in the outbox, it's delivered by the send_queued_emails worker
+    """
     msg = render_mail(subject, template_prefix, to_emails, context, bcc=bcc, cc=cc, **kwargs)
-    msg.send()
+    return enqueue_email(msg, template=template_prefix)
 
 
 @catch_all_exceptions
@@ -1,8 +1,18 @@
 from functools import wraps
 
-from rest_framework.filters import DjangoFilterBackend, SearchFilter
+from rest_framework.filters import DjangoFilterBackend
 
-DEFAULT_FILTER_BACKENDS = (DjangoFilterBackend, SearchFilter)
+from tunga_utils.search import SearchIndexFilter
+
+DEFAULT_FILTER_BACKENDS = (DjangoFilterBackend, SearchIndexFilter)
+
+
+def with_search_filter_last(*backends):
+    """
+    Default filter backends with the view's own backends ahead of SearchIndexFilter,
+    so indexed searches are ranked within the objects those backends allow
+    """
+    return (DjangoFilterBackend,) + backends + (SearchIndexFilter,)
 
 
 def dont_filter_staff_or_superuser(func):
@@ -0,0 +1,207 @@
+import datetime
+import json
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse
+from django.db import connection, transaction
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from tunga_auth.models import USER_TYPE_DEVELOPER, USER_TYPE_PROJECT_OWNER
+from tunga_messages.models import Message, Reception, Reply
+from tunga_profiles.models import Connection, UserProfile
+from tunga_tasks.models import Task, Participation
+from tunga_utils.testing import create_user, discard_cached_state
+
+SKILLS = [
+    'Django', 'Python', 'PHP', 'JavaScript', 'React.js', 'AngularJS', 'Node.js', 'Ruby on Rails',
+    'Android', 'iOS', 'MySQL', 'PostgreSQL', 'HTML5', 'CSS3', 'WordPress', 'Java'
+]
+
+# Endpoints as (name, url name, query params)
+ENDPOINTS = (
+    ('task', 'task-list', {}),
+    ('message', 'message-list', {}),
+    ('notification', 'user-notifications', {}),
+    ('user-relevant', 'tungauser-list', {'filter': 'relevant'}),
+    ('activity', 'action-list', {}),
+)
+
+
+def get_percentile(values, percentile):
+    """
+    Nearest rank percentile of a list of numbers
+    """
+    values = sorted(values)
+    rank = int(math.ceil(percentile / 100.0 * len(values)))
+    return values[max(rank, 1) - 1]
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, dest='users', help='Number of developers')
+        parser.add_argument('--project-owners', type=int, default=20, dest='project_owners')
+        parser.add_argument('--connections', type=int, default=10, dest='connections', help='Connections per developer')
+        parser.add_argument('--tasks', type=int, default=200, dest='tasks')
+        parser.add_argument('--participants', type=int, default=3, dest='participants', help='Participants per task')
+        parser.add_argument('--messages', type=int, default=100, dest='messages')
+        parser.add_argument('--replies', type=int, default=5, dest='replies', help='Replies per message')
+        parser.add_argument('--requests', type=int, default=20, dest='requests', help='Requests per endpoint')
+        parser.add_argument('--seed', type=int, default=1, dest='seed', help='Random seed for the synthetic data')
+        parser.add_argument('--output', dest='output', help='Save the results as a JSON baseline to this file')
+        parser.add_argument('--compare', dest='compare', help='Compare the results with a JSON baseline')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2, dest='tolerance',
+            help='Relative p50 latency increase reported as a regression'
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true', dest='fail_on_regression', default=False,
+            help='Exit with an error if any endpoint regressed'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Seeds synthetic users, connections, tasks, participation, messages and replies inside a transaction,
+        measures the core API endpoints with the test client and rolls the data back.
+        """
+        # command to run: python manage.py benchmark_api --output benchmarks.json
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (IOError, ValueError) as e:
+                raise CommandError('Failed to read baseline %s: %s' % (options['compare'], e))
+
+        self.random = random.Random(options['seed'])
+        user_ids = []
+        with transaction.atomic():
+            viewer = self.seed(options, user_ids)
+            with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+                results = self.run_requests(viewer, options['requests'])
+            transaction.set_rollback(True)
+        discard_cached_state(user_ids)
+
+        report = {
+            'created_at': datetime.datetime.now().isoformat(),
+            'options': dict([
+                (key, options[key]) for key in [
+                    'users', 'project_owners', 'connections', 'tasks', 'participants', 'messages', 'replies',
+                    'requests', 'seed'
+                ]
+            ]),
+            'endpoints': results
+        }
+
+        regressions = []
+        for name, url_name, params in ENDPOINTS:
+            result = results[name]
+            line = '%s: p50 %.1f ms, p99 %.1f ms, %s queries, %s bytes' % (
+                name, result['p50_ms'], result['p99_ms'], result['queries'], result['bytes']
+            )
+            previous = baseline and baseline.get('endpoints', {}).get(name, None)
+            if previous:
+                line += ' (baseline p50 %.1f ms, %s queries)' % (previous['p50_ms'], previous['queries'])
+                if result['p50_ms'] > previous['p50_ms'] * (1 + options['tolerance']) or \
+                        result['queries'] > previous['queries']:
+                    regressions.append(name)
+                    line += ' REGRESSION'
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2, sort_keys=True)
+            self.stdout.write('Results saved to %s' % options['output'])
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError('Regressions in %s' % ', '.join(regressions))
+
+    def get_skills(self):
+        return ', '.join(self.random.sample(SKILLS, self.random.randint(1, 4)))
+
+    def seed(self, options, user_ids):
+        prefix = 'benchmark%s' % int(time.time())
+
+        developers = []
+        for i in range(max(options['users'], 1)):
+            developer = create_user('%s_dev%s' % (prefix, i), USER_TYPE_DEVELOPER)
+            UserProfile.objects.create(user=developer, skills=self.get_skills())
+            developers.append(developer)
+        project_owners = [
+            create_user('%s_po%s' % (prefix, i), USER_TYPE_PROJECT_OWNER)
+            for i in range(max(options['project_owners'], 1))
+        ]
+        users = developers + project_owners
+        user_ids.extend([user.id for user in users])
+
+        connected = set()
+        for developer in developers:
+            for other in self.random.sample(users, min(options['connections'], len(users))):
+                pair = tuple(sorted([developer.id, other.id]))
+                if other.id != developer.id and pair not in connected:
+                    connected.add(pair)
+                    Connection.objects.create(from_user=developer, to_user=other, accepted=True, responded=True)
+
+        for i in range(options['tasks']):
+            task = Task.objects.create(
+                user=self.random.choice(project_owners), title='Task %s' % i,
+                description='<p>Benchmark task %s</p>' % i, skills=self.get_skills(), fee=self.random.randint(10, 500)
+            )
+            for developer in self.random.sample(developers, min(options['participants'], len(developers))):
+                Participation.objects.create(
+                    task=task, user=developer, accepted=True, responded=True, created_by=task.user
+                )
+
+        viewer = developers[0]
+        for i in range(options['messages']):
+            sender = self.random.choice(users)
+            message = Message.objects.create(user=sender, subject='Message %s' % i, body='Benchmark message %s' % i)
+            recipients = set(self.random.sample(users, min(3, len(users))))
+            if i % 2 == 0:
+                recipients.add(viewer)
+            for recipient in recipients:
+                if recipient.id != sender.id:
+                    Reception.objects.create(message=message, user=recipient)
+            for j in range(options['replies']):
+                Reply.objects.create(
+                    message=message, user=self.random.choice(list(recipients) + [sender]),
+                    body='Benchmark reply %s to message %s' % (j, i)
+                )
+        return viewer
+
+    def run_requests(self, viewer, requests):
+        client = Client()
+        client.force_login(viewer)
+
+        results = dict()
+        for name, url_name, params in ENDPOINTS:
+            url = reverse(url_name)
+            # Warm up caches so runs are comparable
+            client.get(url, params)
+
+            timings = []
+            queries = []
+            response = None
+            for i in range(max(requests, 1)):
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.time()
+                    response = client.get(url, params)
+                    timings.append((time.time() - start) * 1000)
+                queries.append(len(captured))
+                if response.status_code != 200:
+                    raise CommandError('%s returned %s' % (url, response.status_code))
+
+            results[name] = {
+                'url': url,
+                'p50_ms': round(get_percentile(timings, 50), 2),
+                'p99_ms': round(get_percentile(timings, 99), 2),
+                'queries': max(queries),
+                'bytes': len(response.content)
+            }
+        return results
@@ -0,0 +1,55 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from tunga_tasks.models import Task, Application, Participation
+from tunga_tasks.serializers import TaskSerializer, ApplicationSerializer, ParticipationSerializer
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, dest='rows')
+        parser.add_argument('--user', dest='username', help='User the serializers render for, defaults to a superuser')
+
+    def handle(self, *args, **options):
+        """
+        Measures the per row cost of serializing tasks, applications and participation.
+        Existing rows are repeated to fill the requested number of rows.
+        """
+        # command to run: python manage.py benchmark_serializers --rows 1000
+
+        user_queryset = get_user_model().objects.all()
+        if options['username']:
+            user_queryset = user_queryset.filter(username=options['username'])
+        else:
+            user_queryset = user_queryset.filter(is_superuser=True)
+        user = user_queryset.first()
+        if not user:
+            raise CommandError('No user to render for')
+
+        request = Request(RequestFactory().get('/'))
+        request.user = user
+        context = {'request': request}
+
+        for model, serializer_class in [
+            (Task, TaskSerializer), (Application, ApplicationSerializer), (Participation, ParticipationSerializer)
+        ]:
+            instances = list(model.objects.all()[:options['rows']])
+            if not instances:
+                self.stdout.write('%s: no rows' % model.__name__)
+                continue
+            rows = (instances * (options['rows'] // len(instances) + 1))[:options['rows']]
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.time()
+                serializer_class(rows, many=True, context=context).data
+                duration = time.time() - start
+            self.stdout.write('%s: %.3f ms per row, %.2f queries per row (%s rows)' % (
+                model.__name__, duration * 1000 / len(rows), float(len(queries)) / len(rows), len(rows)
+            ))
@@ -0,0 +1,34 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from tunga_utils.search import get_registered_models, reindex, is_registered
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', dest='model', help='Only index this model e.g tunga_tasks.Task')
+        parser.add_argument(
+            '--since-id', type=int, default=0, dest='since_id',
+            help='Only index objects with a greater id e.g to resume an interrupted rebuild'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Indexes all objects of searchable models, objects are reindexed in place so search keeps working.
+        """
+        # command to run: python manage.py rebuild_search_index
+
+        models = get_registered_models()
+        if options['model']:
+            try:
+                model = apps.get_model(options['model'])
+            except (LookupError, ValueError):
+                raise CommandError('Unknown model %s' % options['model'])
+            if not is_registered(model):
+                raise CommandError('%s is not searchable' % options['model'])
+            models = [model]
+
+        for model in models:
+            total = reindex(model, since_id=options['since_id'])
+            self.stdout.write("%s %s objects indexed" % (total, model._meta.label))
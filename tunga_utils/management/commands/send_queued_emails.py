@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from tunga_utils.outbox import send_queued_emails, get_outbox_metrics
+
+
+class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stats', action='store_true', dest='stats', default=False,
+            help='Print email counts by template and status instead of sending'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Sends emails queued in the outbox.
+        """
+        # command to run: python manage.py send_queued_emails
+
+        if options['stats']:
+            for template, counts in sorted(get_outbox_metrics().items()):
+                self.stdout.write('%s: %s' % (
+                    template, ', '.join(['%s %s' % (count, status) for status, count in sorted(counts.items())])
+                ))
+            return
+
+        sent, failed = send_queued_emails()
+        self.stdout.write("%s emails sent, %s failed" % (sent, failed))
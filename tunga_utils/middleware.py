@@ -0,0 +1,40 @@
+import json
+import logging
+import random
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from tunga.settings.base import TUNGA_PROFILING_SAMPLE_RATE
+from tunga_utils.profiling import instrument_serializers, start_profile, finish_profile, get_endpoint, record_stats
+
+logger = logging.getLogger('tunga_utils.profiling')
+
+
+class ProfilingMiddleware(object):
+    """
+    Records SQL queries, duplicate queries and serializer field times of a sample of requests.
+    Summaries are added as X-Profile-* response headers, logged as JSON and aggregated per endpoint
+    for the staff only profiling stats resource.
+    """
+
+    def __init__(self):
+        if TUNGA_PROFILING_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed()
+        instrument_serializers()
+
+    def process_request(self, request):
+        if random.random() < TUNGA_PROFILING_SAMPLE_RATE:
+            start_profile()
+
+    def process_response(self, request, response):
+        summary = finish_profile()
+        if summary:
+            endpoint = get_endpoint(request)
+            record_stats(endpoint, summary)
+            response['X-Profile-Time-Ms'] = summary['time_ms']
+            response['X-Profile-Query-Count'] = summary['query_count']
+            response['X-Profile-Query-Time-Ms'] = summary['query_time_ms']
+            response['X-Profile-Duplicate-Query-Count'] = summary['duplicate_query_count']
+            summary.update({'endpoint': endpoint, 'path': request.path, 'status': response.status_code})
+            logger.info(json.dumps(summary, sort_keys=True))
+        return response
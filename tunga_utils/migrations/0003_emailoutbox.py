@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-21 14:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tunga_utils', '0002_contactrequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('template', models.CharField(max_length=200)),
+                ('subject', models.CharField(max_length=255)),
+                ('from_email', models.CharField(max_length=254)),
+                ('to', models.TextField(blank=True, null=True)),
+                ('cc', models.TextField(blank=True, null=True)),
+                ('bcc', models.TextField(blank=True, null=True)),
+                ('body', models.TextField()),
+                ('html_body', models.TextField(blank=True, null=True)),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'Queued'), (2, 'Sending'), (3, 'Sent'), (4, 'Failed')], default=1)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'verbose_name_plural': 'email outbox',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='emailoutbox',
+            index_together=set([('status', 'next_attempt_at')]),
+        ),
+    ]
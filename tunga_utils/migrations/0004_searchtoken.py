@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-25 10:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('tunga_utils', '0003_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('token', models.CharField(max_length=50)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='searchtoken',
+            unique_together=set([('content_type', 'object_id', 'token')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='searchtoken',
+            index_together=set([('content_type', 'token')]),
+        ),
+    ]
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.6 on 2016-06-28 09:40
+from __future__ import unicode_literals
+
+import re
+from collections import defaultdict
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+BATCH_SIZE = 500
+
+# Tokenizer copied from tunga_utils.search as it was when this migration was written,
+# later changes there must not change what this migration writes
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 50
+MAX_TOKEN_WEIGHT = 1000
+
+
+def get_document_tokens(document):
+    weights = defaultdict(int)
+    for text, weight in document:
+        for token in TOKEN_RE.findall((text or '').lower()):
+            token = token[:MAX_TOKEN_LENGTH]
+            if len(token) >= MIN_TOKEN_LENGTH:
+                weights[token] = min(weights[token] + weight, MAX_TOKEN_WEIGHT)
+    return dict(weights)
+
+
+# Historical models don't carry the registered document functions, these mirror them with plain queries
+
+def get_task_document(apps, task):
+    return [
+        (task.title, 5),
+        (' '.join(task.skills.values_list('name', flat=True)), 3),
+        (strip_tags(task.description or ''), 1)
+    ]
+
+
+def get_user_document(apps, user):
+    through = apps.get_model('tunga_profiles', 'UserProfile')._meta.get_field('skills').rel.through
+    skills = through.objects.filter(userprofile__user_id=user.id).values_list('skill__name', flat=True)
+    return [
+        (user.username, 5),
+        (user.first_name, 5),
+        (user.last_name, 5),
+        (user.email, 3),
+        (' '.join(skills), 2)
+    ]
+
+
+def get_message_document(apps, message):
+    Reply = apps.get_model('tunga_messages', 'Reply')
+    document = [
+        (message.subject, 3),
+        (message.user.username, 3),
+        (message.body, 1)
+    ]
+    document.extend([(body, 1) for body in Reply.objects.filter(message_id=message.id).values_list('body', flat=True)])
+    return document
+
+
+SEARCH_DOCUMENTS = [
+    ('tunga_tasks', 'Task', get_task_document),
+    ('tunga_auth', 'TungaUser', get_user_document),
+    ('tunga_messages', 'Message', get_message_document),
+]
+
+
+def backfill_search_tokens(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    SearchToken = apps.get_model('tunga_utils', 'SearchToken')
+
+    for app_label, model_name, get_document in SEARCH_DOCUMENTS:
+        model = apps.get_model(app_label, model_name)
+        if not model.objects.exists():
+            continue
+        content_type, created = ContentType.objects.get_or_create(
+            app_label=app_label, model=model_name.lower()
+        )
+
+        last_id = 0
+        while True:
+            instances = list(model.objects.filter(id__gt=last_id).order_by('id')[:BATCH_SIZE])
+            if not instances:
+                break
+            last_id = instances[-1].id
+
+            # Objects saved since the index table was created are already indexed, they're rewritten the same way
+            SearchToken.objects.filter(
+                content_type=content_type, object_id__in=[instance.id for instance in instances]
+            ).delete()
+            tokens = []
+            for instance in instances:
+                tokens.extend([
+                    SearchToken(content_type=content_type, object_id=instance.id, token=token, weight=weight)
+                    for token, weight in get_document_tokens(get_document(apps, instance)).items()
+                ])
+            SearchToken.objects.bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('tunga_auth', '0006_backfill_avatar_urls'),
+        ('tunga_messages', '0010_auto_20160623_0912'),
+        ('tunga_profiles', '0010_auto_20160611_0938'),
+        ('tunga_tasks', '0020_auto_20160624_1630'),
+        ('tunga_utils', '0005_auto_20160627_0915'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_tokens, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,9 @@ from __future__ import unicode_literals
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.core.mail.message import EmailMultiAlternatives
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from dry_rest_permissions.generics import allow_staff_or_superuser
 
@@ -89,3 +91,79 @@ class ContactRequest(models.Model):
 
     def __unicode__(self):
         return '%s on %s' % (self.email, self.created_at)
+
+
+EMAIL_STATUS_QUEUED = 1
+EMAIL_STATUS_SENDING = 2
+EMAIL_STATUS_SENT = 3
+EMAIL_STATUS_FAILED = 4
+
+EMAIL_STATUS_CHOICES = (
+    (EMAIL_STATUS_QUEUED, 'Queued'),
+    (EMAIL_STATUS_SENDING, 'Sending'),
+    (EMAIL_STATUS_SENT, 'Sent'),
+    (EMAIL_STATUS_FAILED, 'Failed')
+)
+
+
+class EmailOutbox(models.Model):
+    template = models.CharField(max_length=200)
+    subject = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.TextField(blank=True, null=True)
+    cc = models.TextField(blank=True, null=True)
+    bcc = models.TextField(blank=True, null=True)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, null=True)
+    status = models.PositiveSmallIntegerField(choices=EMAIL_STATUS_CHOICES, default=EMAIL_STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __unicode__(self):
+        return '%s - %s' % (self.subject, self.get_status_display())
+
+    class Meta:
+        ordering = ['-created_at']
+        index_together = ('status', 'next_attempt_at')
+        verbose_name_plural = 'email outbox'
+
+    @staticmethod
+    def join_emails(emails):
+        return emails and '\n'.join(emails) or None
+
+    @staticmethod
+    def split_emails(emails):
+        return emails and emails.split('\n') or None
+
+    def get_message(self, connection=None):
+        msg = EmailMultiAlternatives(
+            self.subject, self.body, self.from_email, self.split_emails(self.to),
+            bcc=self.split_emails(self.bcc), cc=self.split_emails(self.cc), connection=connection
+        )
+        if self.html_body:
+            if self.body:
+                msg.attach_alternative(self.html_body, 'text/html')
+            else:
+                msg.body = self.html_body
+                msg.content_subtype = 'html'
+        return msg
+
+
+class SearchToken(models.Model):
+    """
+    Entry of the database search index, maintained by tunga_utils.search
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    token = models.CharField(max_length=50)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    def __unicode__(self):
+        return '%s - %s:%s' % (self.token, self.content_type, self.object_id)
+
+    class Meta:
+        unique_together = ('content_type', 'object_id', 'token')
+        index_together = ('content_type', 'token')
@@ -0,0 +1,105 @@
+import datetime
+import logging
+
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models.aggregates import Count
+from django.utils import timezone
+
+from tunga.settings.base import TUNGA_EMAIL_OUTBOX_BATCH_SIZE, TUNGA_EMAIL_OUTBOX_MAX_ATTEMPTS, \
+    TUNGA_EMAIL_OUTBOX_RETRY_DELAY, TUNGA_EMAIL_OUTBOX_CLAIM_TIMEOUT
+from tunga_utils.models import EmailOutbox, EMAIL_STATUS_QUEUED, EMAIL_STATUS_SENDING, EMAIL_STATUS_SENT, \
+    EMAIL_STATUS_FAILED
+
+
+def enqueue_email(msg, template=''):
+    """
+    Stores a rendered EmailMessage in the outbox
+    """
+    html_body = None
+    body = msg.body
+    if getattr(msg, 'content_subtype', None) == 'html':
+        html_body = body
+        body = ''
+    for content, mimetype in getattr(msg, 'alternatives', []):
+        if mimetype == 'text/html':
+            html_body = content
+    return EmailOutbox.objects.create(
+        template=template, subject=msg.subject, from_email=msg.from_email,
+        to=EmailOutbox.join_emails(msg.to), cc=EmailOutbox.join_emails(msg.cc),
+        bcc=EmailOutbox.join_emails(msg.bcc), body=body, html_body=html_body
+    )
+
+
+def get_retry_delay(attempts):
+    return datetime.timedelta(seconds=TUNGA_EMAIL_OUTBOX_RETRY_DELAY * 2 ** max(attempts - 1, 0))
+
+
+def claim_queued_emails(batch_size=TUNGA_EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Marks a batch of due emails as sending so that concurrent workers don't pick them up.
+    Emails left in the sending state by a worker that died are claimed again after the claim timeout.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        email_ids = list(
+            EmailOutbox.objects.select_for_update().filter(
+                status__in=[EMAIL_STATUS_QUEUED, EMAIL_STATUS_SENDING], next_attempt_at__lte=now
+            ).order_by('next_attempt_at').values_list('id', flat=True)[:batch_size]
+        )
+        if email_ids:
+            EmailOutbox.objects.filter(id__in=email_ids).update(
+                status=EMAIL_STATUS_SENDING,
+                next_attempt_at=now + datetime.timedelta(seconds=TUNGA_EMAIL_OUTBOX_CLAIM_TIMEOUT)
+            )
+    return EmailOutbox.objects.filter(id__in=email_ids)
+
+
+def send_queued_emails(batch_size=TUNGA_EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Drains the outbox in batches over a single connection, returns the number of sent and failed emails
+    """
+    sent = 0
+    failed = 0
+    connection = get_connection()
+    try:
+        while True:
+            emails = list(claim_queued_emails(batch_size=batch_size))
+            if not emails:
+                break
+            sent_ids = []
+            for email in emails:
+                try:
+                    email.get_message(connection=connection).send()
+                    sent_ids.append(email.id)
+                except Exception as e:
+                    logging.exception('Failed to send queued email %s' % email.id)
+                    email.attempts += 1
+                    email.last_error = str(e)
+                    if email.attempts >= TUNGA_EMAIL_OUTBOX_MAX_ATTEMPTS:
+                        email.status = EMAIL_STATUS_FAILED
+                        failed += 1
+                    else:
+                        email.status = EMAIL_STATUS_QUEUED
+                        email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
+                    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+            if sent_ids:
+                EmailOutbox.objects.filter(id__in=sent_ids).update(
+                    status=EMAIL_STATUS_SENT, sent_at=timezone.now()
+                )
+                sent += len(sent_ids)
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def get_outbox_metrics():
+    """
+    Returns email counts by template and status
+    """
+    metrics = dict()
+    for template, status, count in EmailOutbox.objects.values(
+            'template', 'status'
+    ).annotate(count=Count('id')).values_list('template', 'status', 'count').order_by():
+        metrics.setdefault(template, dict())[dict(EmailOutbox._meta.get_field('status').choices)[status]] = count
+    return metrics
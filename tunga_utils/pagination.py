@@ -0,0 +1,60 @@
+from django.utils import six
+from rest_framework.pagination import BasePagination, PageNumberPagination, CursorPagination
+
+PAGINATION_QUERY_PARAM = 'pagination'
+PAGINATION_PAGE_NUMBER = 'page'
+PAGINATION_CURSOR = 'cursor'
+
+
+class TungaCursorPagination(CursorPagination):
+    """
+    Keyset pagination, deep pages cost the same as the first one.
+    Views can set cursor_ordering to a unique ordering backed by an index, e.g. ('-created_at', '-id')
+    """
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering:
+            return tuple(ordering)
+        return super(TungaCursorPagination, self).get_ordering(request, queryset, view)
+
+    def _get_position_from_instance(self, instance, ordering):
+        # Also supports pages of .values() rows
+        field_name = ordering[0].lstrip('-')
+        if isinstance(instance, dict):
+            return six.text_type(instance[field_name])
+        return six.text_type(getattr(instance, field_name))
+
+
+class DefaultPagination(BasePagination):
+    """
+    Page number pagination unless the view sets pagination_mode = 'cursor'
+    or the client asks for it with ?pagination=cursor or a cursor parameter
+    """
+
+    def __init__(self):
+        self.paginator = PageNumberPagination()
+
+    def get_pagination_mode(self, request, view):
+        mode = request.query_params.get(PAGINATION_QUERY_PARAM, None)
+        if mode in [PAGINATION_PAGE_NUMBER, PAGINATION_CURSOR]:
+            return mode
+        if TungaCursorPagination.cursor_query_param in request.query_params:
+            return PAGINATION_CURSOR
+        return getattr(view, 'pagination_mode', PAGINATION_PAGE_NUMBER)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.get_pagination_mode(request, view) == PAGINATION_CURSOR:
+            self.paginator = TungaCursorPagination()
+        return self.paginator.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
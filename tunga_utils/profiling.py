@@ -0,0 +1,200 @@
+import re
+import threading
+import time
+from collections import defaultdict, Counter
+
+from django.db import connections
+from rest_framework import serializers
+
+FINGERPRINT_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+# Number of duplicate queries and serializer fields kept per request
+TOP_DUPLICATES = 5
+TOP_FIELDS = 10
+
+_local = threading.local()
+
+_stats_lock = threading.Lock()
+_stats = dict()
+
+
+def get_query_fingerprint(sql):
+    """
+    Strips literals from a query so that executions that only differ in their parameters look the same
+    """
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class RequestProfile(object):
+    """
+    Collects the queries and serializer field timings of one request
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.field_times = defaultdict(float)
+        self.field_calls = Counter()
+        self.query_log_positions = dict()
+        self.debug_cursors = dict()
+        for connection in connections.all():
+            self.query_log_positions[connection.alias] = len(connection.queries_log)
+            self.debug_cursors[connection.alias] = connection.force_debug_cursor
+            connection.force_debug_cursor = True
+
+    def add_field_time(self, key, duration):
+        self.field_times[key] += duration
+        self.field_calls[key] += 1
+
+    def finish(self):
+        """
+        Stops recording and returns a summary of the request
+        """
+        duration = time.time() - self.started_at
+        queries = []
+        for connection in connections.all():
+            if connection.alias in self.query_log_positions:
+                queries.extend(list(connection.queries_log)[self.query_log_positions[connection.alias]:])
+                connection.force_debug_cursor = self.debug_cursors[connection.alias]
+
+        fingerprints = Counter([get_query_fingerprint(query['sql']) for query in queries])
+        duplicates = [(sql, count) for sql, count in fingerprints.most_common(TOP_DUPLICATES) if count > 1]
+        fields = sorted(self.field_times.items(), key=lambda item: -item[1])[:TOP_FIELDS]
+        return {
+            'time_ms': round(duration * 1000, 2),
+            'query_count': len(queries),
+            'query_time_ms': round(sum([float(query['time']) for query in queries]) * 1000, 2),
+            'duplicate_query_count': sum([count - 1 for count in fingerprints.values()]),
+            'duplicate_queries': [{'sql': sql, 'count': count} for sql, count in duplicates],
+            'serializer_fields': [
+                {'field': key, 'time_ms': round(field_time * 1000, 2), 'calls': self.field_calls[key]}
+                for key, field_time in fields
+            ]
+        }
+
+
+def start_profile():
+    _local.profile = RequestProfile()
+    return _local.profile
+
+
+def get_current_profile():
+    return getattr(_local, 'profile', None)
+
+
+def finish_profile():
+    profile = get_current_profile()
+    _local.profile = None
+    if profile:
+        return profile.finish()
+    return None
+
+
+class TimedField(object):
+    """
+    Proxy of a bound serializer field that records the time spent reading and serializing its value.
+    Times of nested serializers include their own fields.
+    """
+
+    def __init__(self, field, profile, key):
+        self._field = field
+        self._profile = profile
+        self._key = key
+
+    def __getattr__(self, name):
+        return getattr(self._field, name)
+
+    def get_attribute(self, instance):
+        start = time.time()
+        try:
+            return self._field.get_attribute(instance)
+        finally:
+            self._profile.add_field_time(self._key, time.time() - start)
+
+    def to_representation(self, value):
+        start = time.time()
+        try:
+            return self._field.to_representation(value)
+        finally:
+            self._profile.add_field_time(self._key, time.time() - start)
+
+
+_readable_fields = None
+
+
+def instrument_serializers():
+    """
+    Wraps the fields serializers read from so that their time is recorded while a request is profiled
+    """
+    global _readable_fields
+    if _readable_fields is not None:
+        return
+    _readable_fields = serializers.Serializer.__dict__['_readable_fields']
+
+    def profiled_readable_fields(self):
+        fields = _readable_fields.__get__(self, type(self))
+        profile = get_current_profile()
+        if profile is None:
+            return fields
+        name = type(self).__name__
+        return [TimedField(field, profile, '%s.%s' % (name, field.field_name)) for field in fields]
+
+    serializers.Serializer._readable_fields = property(profiled_readable_fields)
+
+
+def get_endpoint(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    name = resolver_match and (resolver_match.view_name or resolver_match.url_name) or request.path
+    return '%s %s' % (request.method, name)
+
+
+def record_stats(endpoint, summary):
+    """
+    Adds a request summary to the aggregated stats of its endpoint
+    """
+    with _stats_lock:
+        stats = _stats.setdefault(endpoint, {
+            'requests': 0, 'time_ms': 0, 'query_count': 0, 'max_query_count': 0, 'query_time_ms': 0,
+            'duplicate_query_count': 0, 'serializer_fields': defaultdict(float)
+        })
+        stats['requests'] += 1
+        for key in ['time_ms', 'query_count', 'query_time_ms', 'duplicate_query_count']:
+            stats[key] += summary[key]
+        stats['max_query_count'] = max(stats['max_query_count'], summary['query_count'])
+        for field in summary['serializer_fields']:
+            stats['serializer_fields'][field['field']] += field['time_ms']
+
+
+def get_stats():
+    """
+    Returns per endpoint averages of the requests profiled by this process
+    """
+    with _stats_lock:
+        results = []
+        for endpoint, stats in _stats.items():
+            requests = stats['requests']
+            results.append({
+                'endpoint': endpoint,
+                'requests': requests,
+                'avg_time_ms': round(stats['time_ms'] / requests, 2),
+                'avg_query_count': round(float(stats['query_count']) / requests, 2),
+                'max_query_count': stats['max_query_count'],
+                'avg_query_time_ms': round(stats['query_time_ms'] / requests, 2),
+                'avg_duplicate_query_count': round(float(stats['duplicate_query_count']) / requests, 2),
+                'serializer_fields': [
+                    {'field': key, 'avg_time_ms': round(field_time / requests, 2)}
+                    for key, field_time in sorted(stats['serializer_fields'].items(), key=lambda item: -item[1])
+                ][:TOP_FIELDS]
+            })
+    return sorted(results, key=lambda item: -item['avg_query_count'])
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
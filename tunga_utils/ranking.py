@@ -0,0 +1,25 @@
+from collections import defaultdict
+
+from django.db.models.expressions import Case, When, Value
+from django.db.models.fields import FloatField
+
+
+def filter_by_rank(queryset, ranked, annotation):
+    """
+    Restricts the queryset to the objects in ranked, a list of (object_id, score) pairs, and annotates their score.
+    Objects are selected by primary key and scores are grouped by value so the query stays small
+    and doesn't need any joins.
+    """
+    if not ranked:
+        # Annotated anyway so callers can still order by the annotation
+        return queryset.none().annotate(**{annotation: Value(0, output_field=FloatField())})
+
+    object_ids_by_score = defaultdict(list)
+    for object_id, score in ranked:
+        object_ids_by_score[round(score, 4)].append(object_id)
+    return queryset.filter(id__in=[object_id for object_id, score in ranked]).annotate(**{
+        annotation: Case(
+            *[When(id__in=object_ids, then=Value(score)) for score, object_ids in object_ids_by_score.items()],
+            default=Value(0), output_field=FloatField()
+        )
+    })
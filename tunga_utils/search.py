@@ -0,0 +1,226 @@
+import re
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.aggregates import Sum
+from django.db.models.query_utils import Q
+from django.db.models.signals import post_save, post_delete
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+
+from tunga.settings.base import TUNGA_SEARCH_BACKEND, TUNGA_SEARCH_RESULT_LIMIT
+from tunga_utils.models import SearchToken
+from tunga_utils.ranking import filter_by_rank
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 50
+# Shorter terms only match whole tokens, so a term like "a" or "ab" can't match a large part of the index
+MIN_PREFIX_LENGTH = 3
+MAX_TOKEN_WEIGHT = 1000
+
+# Searchable models and the functions that return their documents as a list of (text, weight) pairs
+_registry = dict()
+
+_backend = None
+
+
+def tokenize(text):
+    """
+    Splits text into lower case tokens, in order and without duplicates
+    """
+    tokens = []
+    for token in TOKEN_RE.findall((text or '').lower()):
+        token = token[:MAX_TOKEN_LENGTH]
+        if len(token) >= MIN_TOKEN_LENGTH and token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def get_document_tokens(document):
+    """
+    Returns the weights of the tokens in a document keyed by token
+    """
+    weights = defaultdict(int)
+    for text, weight in document:
+        for token in TOKEN_RE.findall((text or '').lower()):
+            token = token[:MAX_TOKEN_LENGTH]
+            if len(token) >= MIN_TOKEN_LENGTH:
+                weights[token] = min(weights[token] + weight, MAX_TOKEN_WEIGHT)
+    return dict(weights)
+
+
+class SearchBackend(object):
+    """
+    Stores and queries token weights of searchable objects
+    """
+
+    def index(self, model, object_id, tokens):
+        raise NotImplementedError()
+
+    def remove(self, model, object_ids):
+        raise NotImplementedError()
+
+    def search(self, model, terms, limit=TUNGA_SEARCH_RESULT_LIMIT, object_ids=None):
+        """
+        Returns (object_id, score) pairs of objects that match all terms, best first.
+        object_ids restricts the search e.g to the ids of an already filtered queryset.
+        """
+        raise NotImplementedError()
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Inverted index in the SearchToken table, terms are matched as token prefixes
+    so lookups use the (content_type, token) index.
+    Matching, scoring and the limit all run in one query so no more than limit rows are loaded.
+    """
+
+    def index(self, model, object_id, tokens):
+        content_type = ContentType.objects.get_for_model(model)
+        with transaction.atomic():
+            indexed = dict(
+                SearchToken.objects.filter(
+                    content_type=content_type, object_id=object_id
+                ).values_list('token', 'weight')
+            )
+            stale = [token for token in indexed if token not in tokens]
+            if stale:
+                SearchToken.objects.filter(content_type=content_type, object_id=object_id, token__in=stale).delete()
+            for token, weight in tokens.items():
+                if token in indexed and indexed[token] != weight:
+                    SearchToken.objects.filter(
+                        content_type=content_type, object_id=object_id, token=token
+                    ).update(weight=weight)
+            SearchToken.objects.bulk_create([
+                SearchToken(content_type=content_type, object_id=object_id, token=token, weight=weight)
+                for token, weight in tokens.items() if token not in indexed
+            ])
+
+    def remove(self, model, object_ids):
+        SearchToken.objects.filter(
+            content_type=ContentType.objects.get_for_model(model), object_id__in=object_ids
+        ).delete()
+
+    def get_term_q(self, term):
+        if len(term) < MIN_PREFIX_LENGTH:
+            return Q(token=term)
+        return Q(token__startswith=term)
+
+    def search(self, model, terms, limit=TUNGA_SEARCH_RESULT_LIMIT, object_ids=None):
+        tokens = SearchToken.objects.filter(content_type=ContentType.objects.get_for_model(model))
+        if object_ids is not None:
+            tokens = tokens.filter(object_id__in=object_ids)
+
+        # Each term narrows the objects matched by the previous ones
+        matches = None
+        terms_q = Q()
+        for term in terms:
+            term_tokens = tokens.filter(self.get_term_q(term))
+            if matches is not None:
+                term_tokens = term_tokens.filter(object_id__in=matches)
+            matches = term_tokens.values('object_id')
+            terms_q |= self.get_term_q(term)
+        if matches is None:
+            return []
+
+        ranked = tokens.filter(terms_q, object_id__in=matches).values('object_id').annotate(
+            score=Sum('weight')
+        ).order_by('-score', '-object_id').values_list('object_id', 'score')
+        if limit:
+            ranked = ranked[:limit]
+        return list(ranked)
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(TUNGA_SEARCH_BACKEND)()
+    return _backend
+
+
+def is_registered(model):
+    return model in _registry
+
+
+def get_registered_models():
+    return list(_registry.keys())
+
+
+def register(model, get_document):
+    """
+    Makes a model searchable, its objects are reindexed when they're saved and removed when they're deleted.
+    Changes to related objects that are part of the document have to call index_object themselves.
+    """
+    _registry[model] = get_document
+    post_save.connect(search_handler_saved, sender=model, dispatch_uid='search_index_%s' % model._meta.label_lower)
+    post_delete.connect(search_handler_deleted, sender=model, dispatch_uid='search_index_%s' % model._meta.label_lower)
+
+
+def index_object(instance):
+    get_document = _registry.get(type(instance), None)
+    if get_document:
+        get_search_backend().index(type(instance), instance.id, get_document_tokens(get_document(instance)))
+
+
+def remove_object(instance):
+    get_search_backend().remove(type(instance), [instance.id])
+
+
+def reindex(model, batch_size=500, since_id=0):
+    """
+    Indexes all objects of a model with an id greater than since_id, returns the number of objects indexed
+    """
+    total = 0
+    last_id = since_id
+    while True:
+        instances = list(model.objects.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not instances:
+            break
+        for instance in instances:
+            index_object(instance)
+        total += len(instances)
+        last_id = instances[-1].id
+    return total
+
+
+def search(model, query, limit=TUNGA_SEARCH_RESULT_LIMIT, object_ids=None):
+    """
+    Returns (object_id, score) pairs of the objects that match the query, best first
+    or None if the query has no searchable terms
+    """
+    terms = tokenize(query)
+    if not terms:
+        return None
+    return get_search_backend().search(model, terms, limit=limit, object_ids=object_ids)
+
+
+def search_handler_saved(sender, instance, **kwargs):
+    if not kwargs.get('raw', False):
+        index_object(instance)
+
+
+def search_handler_deleted(sender, instance, **kwargs):
+    remove_object(instance)
+
+
+class SearchIndexFilter(SearchFilter):
+    """
+    Searches registered models through the search index and ranks results by relevance,
+    other models fall back to SearchFilter's LIKE queries on the view's search_fields
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not is_registered(queryset.model):
+            return super(SearchIndexFilter, self).filter_queryset(request, queryset, view)
+
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        # Only objects the queryset allows are ranked, so filtered out matches don't use up the result limit
+        ranked = search(queryset.model, ' '.join(search_terms), object_ids=queryset.values('id'))
+        if ranked is None:
+            return queryset
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        return filter_by_rank(queryset, ranked, 'search_rank').order_by('-search_rank', *ordering)
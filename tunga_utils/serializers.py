@@ -1,11 +1,17 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
 from django_countries.serializer_fields import CountryField
 from rest_framework import serializers
 from rest_framework.fields import SkipField
 
+from tunga_auth.avatars import get_avatar_url, resolve_avatar_urls
 from tunga_profiles.models import Skill, City, UserProfile, Education, Work
 from tunga_utils.models import GenericUpload, ContactRequest, Upload, AbstractExperience
+from tunga_utils.tags import prefetch_tags
 
 
 class CreateOnlyCurrentUserDefault(serializers.CurrentUserDefault):
@@ -21,26 +27,139 @@ class CreateOnlyCurrentUserDefault(serializers.CurrentUserDefault):
         return super(CreateOnlyCurrentUserDefault, self).__call__()
 
 
-class ContentTypeAnnotatedSerializer(serializers.ModelSerializer):
-    content_type = serializers.SerializerMethodField(read_only=True, required=False)
+class PreloadedListSerializer(serializers.ListSerializer):
+    """
+    Lets the child serializer and its fields load related data for all items in one go before they're serialized
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        items = list(iterable)
+        if items:
+            if hasattr(self.child, 'preload'):
+                self.child.preload(items)
+            for field in self.child.fields.values():
+                if not hasattr(field, 'preload'):
+                    continue
+                if isinstance(field, serializers.BaseSerializer):
+                    # Nested serializers preload the related objects they serialize, not the parent items
+                    field.preload(get_related_objects(field, items))
+                else:
+                    field.preload(items)
+        return [self.child.to_representation(item) for item in items]
+
+
+def get_related_objects(field, items):
+    related = []
+    for item in items:
+        try:
+            value = field.get_attribute(item)
+        except (AttributeError, KeyError, ObjectDoesNotExist, SkipField):
+            continue
+        if value is not None:
+            related.append(value)
+    return related
+
+
+def load_generic_related(model, instances):
+    """
+    Fetches objects of a model with a generic foreign key (e.g. GenericUpload subclasses) pointing to
+    any of the instances in one query per content type, returns them keyed by (content_type_id, object_id)
+    """
+    instance_ids = defaultdict(set)
+    for instance in instances:
+        instance_ids[ContentType.objects.get_for_model(instance).id].add(instance.id)
+
+    related = defaultdict(list)
+    for content_type_id, object_ids in instance_ids.items():
+        for obj in model.objects.filter(content_type_id=content_type_id, object_id__in=object_ids):
+            related[(content_type_id, obj.object_id)].append(obj)
+    return related
+
+
+class GenericUploadsField(serializers.Field):
+    """
+    Serializes the uploads or attachments of an object, batch loaded when used with PreloadedListSerializer
+    """
+
+    def __init__(self, model, serializer_class, **kwargs):
+        self.model = model
+        self.serializer_class = serializer_class
+        self._preloaded = None
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super(GenericUploadsField, self).__init__(**kwargs)
+
+    def preload(self, instances):
+        self._preloaded = (
+            set([(ContentType.objects.get_for_model(instance).id, instance.id) for instance in instances]),
+            load_generic_related(self.model, instances)
+        )
+
+    def to_representation(self, obj):
+        key = (ContentType.objects.get_for_model(obj).id, obj.id)
+        if self._preloaded and key in self._preloaded[0]:
+            related = self._preloaded[1].get(key, [])
+        else:
+            related = self.model.objects.filter(content_type_id=key[0], object_id=obj.id)
+        return self.serializer_class(related, many=True).data
+
+
+class ContentTypeField(serializers.Field):
+    """
+    Content type id of the parent serializer's model, resolved once when the field is bound
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super(ContentTypeField, self).__init__(**kwargs)
+        self.content_type_id = None
+
+    def bind(self, field_name, parent):
+        super(ContentTypeField, self).bind(field_name, parent)
+        self.content_type_id = ContentType.objects.get_for_model(parent.Meta.model).id
+
+    def to_representation(self, value):
+        return self.content_type_id
+
+
+class DetailsField(serializers.Field):
+    """
+    Serializes objects with the parent serializer's Meta.details_serializer, one instance is reused for all rows
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super(DetailsField, self).__init__(**kwargs)
+        self.details_serializer = None
+
+    def bind(self, field_name, parent):
+        super(DetailsField, self).bind(field_name, parent)
+        details_serializer = getattr(parent.Meta, 'details_serializer', None)
+        if details_serializer:
+            self.details_serializer = details_serializer()
+
+    def to_representation(self, value):
+        if self.details_serializer:
+            try:
+                return self.details_serializer.to_representation(value)
+            except AttributeError:
+                return None
+        return None
 
-    def get_content_type(self, obj):
-        return ContentType.objects.get_for_model(self.Meta.model).id
+
+class ContentTypeAnnotatedSerializer(serializers.ModelSerializer):
+    content_type = ContentTypeField(required=False)
 
 
 class DetailAnnotatedSerializer(serializers.ModelSerializer):
-    details = serializers.SerializerMethodField(read_only=True, required=False)
+    details = DetailsField(required=False)
 
     class Meta:
         details_serializer = None
 
-    def get_details(self, obj):
-        try:
-            if self.Meta.details_serializer:
-                return self.Meta.details_serializer(obj).data
-        except AttributeError:
-            return None
-
 
 class SkillSerializer(serializers.ModelSerializer):
     class Meta:
@@ -64,14 +183,16 @@ class SimpleUserSerializer(serializers.ModelSerializer):
             'id', 'username', 'email', 'first_name', 'last_name', 'display_name', 'type', 'image',
             'is_developer', 'is_project_owner', 'is_staff', 'verified', 'company', 'avatar_url'
         )
+        list_serializer_class = PreloadedListSerializer
+
+    def preload(self, users):
+        self._avatar_urls = resolve_avatar_urls(users)
 
     def get_avatar_url(self, obj):
-        if obj.image:
-            return obj.image.url
-        social_accounts = obj.socialaccount_set.all()
-        if social_accounts:
-            return social_accounts[0].get_avatar_url()
-        return None
+        avatar_urls = getattr(self, '_avatar_urls', None)
+        if avatar_urls and obj.id in avatar_urls:
+            return avatar_urls[obj.id]
+        return get_avatar_url(obj)
 
 
 class SimpleProfileSerializer(serializers.ModelSerializer):
@@ -84,6 +205,9 @@ class SimpleProfileSerializer(serializers.ModelSerializer):
         model = UserProfile
         exclude = ('user',)
 
+    def preload(self, profiles):
+        prefetch_tags(profiles, 'skills')
+
 
 class SimpleAbstractExperienceSerializer(serializers.ModelSerializer):
     start_month_display = serializers.CharField(read_only=True, required=False, source='get_start_month_display')
@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+
+def prefetch_tags(instances, field_name):
+    """
+    Loads the tags of a TagField for all instances in one query, like prefetch_related does for other m2m fields.
+    prefetch_related can't be used for tags since tagulous loads each instance's tags when its manager is created
+    and the prefetch creates the manager before it fills the cache.
+    """
+    instances = [
+        instance for instance in instances
+        if instance.pk and field_name not in getattr(instance, '_prefetched_objects_cache', {})
+    ]
+    if not instances:
+        return
+
+    field = type(instances[0])._meta.get_field(field_name)
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    ordering = [
+        order.startswith('-') and '-%s__%s' % (target, order[1:]) or '%s__%s' % (target, order)
+        for order in field.rel.to._meta.ordering
+    ]
+
+    tags = defaultdict(list)
+    for item in field.rel.through.objects.filter(
+            **{'%s__in' % source: [instance.pk for instance in instances]}
+    ).select_related(target).order_by(*ordering):
+        tags[getattr(item, '%s_id' % source)].append(getattr(item, target))
+
+    for instance in instances:
+        queryset = field.rel.to._default_manager.all()
+        queryset._result_cache = tags[instance.pk]
+        queryset._prefetch_done = True
+        if not hasattr(instance, '_prefetched_objects_cache'):
+            instance._prefetched_objects_cache = {}
+        instance._prefetched_objects_cache[field_name] = queryset
@@ -0,0 +1,8 @@
+from celery.decorators import periodic_task
+from celery.task.schedules import crontab
+
+
+@periodic_task(run_every=crontab())
+def send_queued_emails():
+    from tunga_utils import outbox
+    outbox.send_queued_emails()
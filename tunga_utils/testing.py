@@ -0,0 +1,179 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.urlresolvers import reverse
+from django.db import connection, transaction
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+
+from tunga_auth.activity import discard_activity
+from tunga_auth.models import USER_TYPE_DEVELOPER, USER_TYPE_PROJECT_OWNER
+from tunga_comments.models import Comment
+from tunga_messages.models import Message, Reception, Reply
+from tunga_profiles.connection_graph import invalidate_connections
+from tunga_profiles.models import Connection, UserProfile, SocialPlatform, SocialLink, Education, Work
+from tunga_profiles.notifications import invalidate_notifications
+from tunga_tasks.models import Task, Participation, Application, TaskRequest, SavedTask, TASK_REQUEST_CLOSE
+from tunga_tasks.skill_index import invalidate_skill_index, TASK_SKILL_INDEX, DEVELOPER_SKILL_INDEX
+
+QUERY_BUDGETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_budgets.json')
+
+# Set to record measured query counts to QUERY_BUDGETS_FILE instead of checking them
+RECORD_QUERY_BUDGETS_ENV = 'TUNGA_RECORD_QUERY_BUDGETS'
+
+# Endpoints that still query per row, their counts may grow with the fixture size until their lists are batched
+QUERY_GROWTH_ALLOWED = (
+    'application', 'comment', 'connection', 'me/education', 'me/social-link', 'me/work', 'milestones',
+    'participation', 'saved-task', 'task-request'
+)
+
+
+def discard_cached_state(user_ids):
+    """
+    Drops cached state of users whose rows were rolled back, their ids may be reused by new rows
+    """
+    invalidate_notifications(*user_ids)
+    invalidate_connections(*user_ids)
+    discard_activity(*user_ids)
+    invalidate_skill_index(TASK_SKILL_INDEX, DEVELOPER_SKILL_INDEX)
+
+
+def create_user(username, user_type):
+    user = get_user_model()(
+        username=username, email='%s@example.com' % username, first_name=username.title(), type=user_type
+    )
+    user.set_unusable_password()
+    user.save()
+    return user
+
+
+def seed_viewer_fixture(size):
+    """
+    Creates a developer with `size` rows in every list resource and returns it with the ids of all created users.
+    Lists stay within one page for sizes up to 7 so that their query counts reflect per row costs.
+    """
+    viewer = create_user('viewer', USER_TYPE_DEVELOPER)
+    UserProfile.objects.create(user=viewer, skills='Django, React.js')
+    developers = []
+    project_owners = []
+    for i in range(size):
+        developer = create_user('developer%s' % i, USER_TYPE_DEVELOPER)
+        UserProfile.objects.create(user=developer, skills='Django, PHP')
+        developers.append(developer)
+        project_owners.append(create_user('project_owner%s' % i, USER_TYPE_PROJECT_OWNER))
+        Connection.objects.create(from_user=viewer, to_user=developer, accepted=True, responded=True)
+
+    task_content_type = ContentType.objects.get_for_model(Task)
+    for i in range(size):
+        owner = project_owners[i]
+        task = Task.objects.create(
+            user=owner, title='Task %s' % i, description='Task %s' % i, skills='Django, React.js', fee=10
+        )
+        Participation.objects.create(task=task, user=viewer, accepted=True, responded=True, created_by=owner)
+        Participation.objects.create(task=task, user=developers[i], accepted=True, responded=True, created_by=owner)
+        Application.objects.create(task=task, user=viewer, pitch='Pitch %s' % i)
+        TaskRequest.objects.create(task=task, user=viewer, type=TASK_REQUEST_CLOSE)
+        SavedTask.objects.create(task=task, user=viewer)
+        Comment.objects.create(
+            user=viewer, content_type=task_content_type, object_id=task.id, body='Comment %s' % i
+        )
+
+        # Users have one link per platform
+        platform = SocialPlatform.objects.create(name='Platform %s' % i, created_by=viewer)
+        SocialLink.objects.create(user=viewer, platform=platform, username='viewer%s' % i)
+        Education.objects.create(user=viewer, institution='Institution %s' % i, award='Award', start_month=1, start_year=2010)
+        Work.objects.create(user=viewer, company='Company %s' % i, position='Developer', start_month=1, start_year=2010)
+
+        message = Message.objects.create(user=developers[i], subject='Message %s' % i, body='Message %s' % i)
+        Reception.objects.create(message=message, user=viewer)
+        Reply.objects.create(message=message, user=viewer, body='Reply %s' % i)
+    return viewer, [viewer.id] + [user.id for user in developers + project_owners]
+
+
+def get_router_endpoints():
+    """
+    Returns the list url of every viewset registered with the API router keyed by its prefix
+    """
+    from tunga.urls import router
+    return dict([(prefix, reverse('%s-list' % base_name)) for prefix, viewset, base_name in router.registry])
+
+
+def measure_query_counts(user, endpoints):
+    """
+    Counts the queries of one request to each endpoint after a warm up request
+    """
+    client = Client()
+    client.force_login(user)
+    counts = dict()
+    for name, url in endpoints.items():
+        client.get(url)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise AssertionError('%s returned %s' % (url, response.status_code))
+        counts[name] = len(captured)
+    return counts
+
+
+def measure_fixture_query_counts(sizes):
+    """
+    Seeds the viewer fixture at each size in a transaction that's rolled back
+    and returns the query counts of router endpoints keyed by size
+    """
+    endpoints = get_router_endpoints()
+    counts = dict()
+    for size in sizes:
+        with transaction.atomic():
+            viewer, user_ids = seed_viewer_fixture(size)
+            counts[str(size)] = measure_query_counts(viewer, endpoints)
+            transaction.set_rollback(True)
+        discard_cached_state(user_ids)
+    return counts
+
+
+def load_query_budgets():
+    with open(QUERY_BUDGETS_FILE) as budgets_file:
+        return json.load(budgets_file)
+
+
+def save_query_budgets(sizes, counts):
+    budgets = {
+        'sizes': sizes,
+        'endpoints': dict([
+            (name, dict([(str(size), counts[str(size)][name]) for size in sizes]))
+            for name in counts[str(sizes[0])]
+        ])
+    }
+    with open(QUERY_BUDGETS_FILE, 'w') as budgets_file:
+        json.dump(budgets, budgets_file, indent=2, sort_keys=True, separators=(',', ': '))
+        budgets_file.write('\n')
+
+
+def check_query_budgets(budgets, counts, growth_allowed=QUERY_GROWTH_ALLOWED):
+    """
+    Returns a description of every endpoint that's missing a budget or exceeds it at any size,
+    and of every endpoint outside growth_allowed that makes more queries for the largest size than for the smallest
+    """
+    errors = []
+    for size in budgets['sizes']:
+        for name, count in sorted(counts[str(size)].items()):
+            budget = budgets['endpoints'].get(name, {}).get(str(size), None)
+            if budget is None:
+                errors.append('%s has no query budget for size %s, %s queries' % (name, size, count))
+            elif count > budget:
+                errors.append('%s made %s queries for size %s, budget is %s' % (name, count, size, budget))
+
+    smallest, largest = min(budgets['sizes']), max(budgets['sizes'])
+    for name, count in sorted(counts[str(largest)].items()):
+        if name in growth_allowed:
+            continue
+        smallest_count = counts[str(smallest)].get(name, count)
+        if count > smallest_count:
+            errors.append(
+                '%s made %s queries for size %s and %s for size %s, queries grow with the number of rows' % (
+                    name, count, largest, smallest_count, smallest
+                )
+            )
+    return errors
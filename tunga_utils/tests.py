@@ -1,3 +1,91 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.message import EmailMultiAlternatives
 from django.test import TestCase
 
-# Create your tests here.
+from tunga_utils.models import EmailOutbox, EMAIL_STATUS_QUEUED, EMAIL_STATUS_SENT
+from tunga_utils.outbox import enqueue_email, send_queued_emails, get_outbox_metrics
+from tunga_utils.profiling import start_profile, finish_profile, instrument_serializers, get_query_fingerprint
+from tunga_utils.serializers import SimpleUserSerializer
+from tunga_utils.testing import load_query_budgets, measure_fixture_query_counts, save_query_budgets, \
+    check_query_budgets, RECORD_QUERY_BUDGETS_ENV
+
+
+class EmailOutboxTestCase(TestCase):
+
+    def test_send_queued_emails(self):
+        """
+        Queued emails are only delivered by the worker
+        """
+        for i in range(3):
+            msg = EmailMultiAlternatives('Subject %s' % i, 'Body', 'support@tunga.io', ['to@example.com'])
+            msg.attach_alternative('<p>Body</p>', 'text/html')
+            enqueue_email(msg, template='tunga/email/test')
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailOutbox.objects.filter(status=EMAIL_STATUS_QUEUED).count(), 3)
+
+        sent, failed = send_queued_emails(batch_size=2)
+        self.assertEqual((sent, failed), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives, [('<p>Body</p>', 'text/html')])
+        self.assertEqual(EmailOutbox.objects.filter(status=EMAIL_STATUS_SENT).count(), 3)
+        self.assertEqual(get_outbox_metrics(), {'tunga/email/test': {'Sent': 3}})
+
+        self.assertEqual(send_queued_emails(), (0, 0))
+
+
+class ProfilingTestCase(TestCase):
+
+    def test_request_profile(self):
+        """
+        Profiles count repeated queries and time serializer fields
+        """
+        self.assertEqual(
+            get_query_fingerprint("SELECT * FROM user WHERE id IN (1, 2, 3) AND username = 'admin'"),
+            'SELECT * FROM user WHERE id IN (?) AND username = ?'
+        )
+
+        users = [
+            get_user_model().objects.create_user('user%s' % i, 'user%s@example.com' % i, 'secret') for i in range(3)
+        ]
+        instrument_serializers()
+        start_profile()
+        for user in users:
+            get_user_model().objects.get(id=user.id)
+        SimpleUserSerializer(users[0]).data
+        summary = finish_profile()
+
+        self.assertGreaterEqual(summary['query_count'], 3)
+        self.assertGreaterEqual(summary['duplicate_query_count'], 2)
+        self.assertIn('SimpleUserSerializer.avatar_url', [field['field'] for field in summary['serializer_fields']])
+        self.assertIsNone(finish_profile())
+
+
+class QueryBudgetTestCase(TestCase):
+
+    def test_query_budgets(self):
+        """
+        Every router endpoint stays within its query budget at each fixture size so per row queries are caught.
+        Run with TUNGA_RECORD_QUERY_BUDGETS=1 to record the current counts as the new budgets.
+        """
+        budgets = load_query_budgets()
+        counts = measure_fixture_query_counts(budgets['sizes'])
+        if os.environ.get(RECORD_QUERY_BUDGETS_ENV, None):
+            save_query_budgets(budgets['sizes'], counts)
+            return
+        errors = check_query_budgets(budgets, counts)
+        self.assertFalse(errors, '\n'.join(errors))
+
+    def test_query_growth(self):
+        """
+        Endpoints whose query count grows with the number of rows fail unless they're allowed to
+        """
+        budgets = {'sizes': [2, 6], 'endpoints': {'task': {'2': 10, '6': 10}}}
+        self.assertEqual(check_query_budgets(budgets, {'2': {'task': 8}, '6': {'task': 8}}), [])
+
+        counts = {'2': {'task': 8}, '6': {'task': 10}}
+        self.assertEqual(len(check_query_budgets(budgets, counts)), 1)
+        self.assertEqual(check_query_budgets(budgets, counts, growth_allowed=('task',)), [])
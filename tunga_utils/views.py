@@ -1,10 +1,12 @@
 from django.http.response import HttpResponseRedirect
-from rest_framework import viewsets, generics
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework import viewsets, generics, views, status
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.response import Response
 from rest_framework_swagger.views import SwaggerUIView
 
 from tunga_profiles.models import Skill
 from tunga_utils.models import ContactRequest
+from tunga_utils.profiling import get_stats, reset_stats
 from tunga_utils.serializers import SkillSerializer, ContactRequestSerializer
 
 
@@ -27,5 +29,20 @@ class ContactRequestView(generics.CreateAPIView):
     permission_classes = [AllowAny]
 
 
+class ProfilingStatsView(views.APIView):
+    """
+    Profiling Stats Resource
+    Per endpoint averages of requests profiled by this process, DELETE resets them
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats())
+
+    def delete(self, request):
+        reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 def swagger_permission_denied_handler(request):
     return HttpResponseRedirect('%s://%s/api/login/?next=/api/docs/' % (request.scheme, request.get_host()))